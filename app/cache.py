@@ -0,0 +1,226 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from pydantic import TypeAdapter
+from app import clock
+from app.metrics import REGISTRY, Counter
+from app.models.records import Records
+
+# Backend for cached suggestion responses: memory (default), sqlite (shared by workers on one host) or off
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory").lower()
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db")
+
+REGISTRY.register("response_cache_requests_total", Counter, "Response cache lookups by endpoint and result.")
+REGISTRY.register("response_cache_evictions_total", Counter, "Entries evicted from the response cache by reason.")
+
+_adapters = {}
+
+
+def canonical_key(endpoint: str, payload: Any, *extra) -> str:
+    """
+    Hash of the validated request body. Validated models always dump their fields in declaration
+    order, so equal payloads hash equally however the client ordered its JSON keys; records hash the
+    fields they keep, all that the analyses read.
+    `extra` carries anything else the response depends on (query parameters, time windows).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(endpoint.encode())
+    digest.update(repr(extra).encode())
+    if isinstance(payload, Records):
+        payload.fingerprint(digest)
+        return digest.hexdigest()
+    is_list = isinstance(payload, list)
+    kind = (type(payload[0]) if payload else None) if is_list else type(payload)
+    adapter = _adapters.get((is_list, kind))
+    if adapter is None:
+        adapter = _adapters[(is_list, kind)] = TypeAdapter(list[kind] if is_list and kind else kind or list)
+    digest.update(adapter.dump_json(payload))
+    return digest.hexdigest()
+
+
+class CacheBackend:
+    """
+    Interface for response cache stores. Values are opaque bytes.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class InProcessCache(CacheBackend):
+    """
+    LRU + TTL cache bounded by the total size of the stored values.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                self._drop(key, "expired")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key, "replaced")
+            self._entries[key] = (time.time() + ttl, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)), "memory")
+
+    def _drop(self, key: str, reason: str) -> None:
+        _, value = self._entries.pop(key)
+        self.size -= len(value)
+        REGISTRY.get("response_cache_evictions_total", reason=reason).inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries), "bytes": self.size, "max_bytes": self.max_bytes}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Local stand-in for a shared store: a SQLite file every worker on the host can read and write.
+    Expired rows are skipped on read; least recently used rows are trimmed to stay under max_bytes.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        conn = self._connect()
+        row = conn.execute("SELECT value, expires FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            REGISTRY.get("response_cache_evictions_total", reason="expired").inc()
+            return None
+        conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value), now + ttl, now),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+        if total > self.max_bytes:
+            conn.execute("DELETE FROM response_cache WHERE expires < ?", (now,))
+            # Trim oldest-accessed rows until the running total fits
+            conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC) AS running FROM response_cache) "
+                "WHERE running > ?)",
+                (self.max_bytes,),
+            )
+            REGISTRY.get("response_cache_evictions_total", reason="memory").inc()
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM response_cache")
+
+    def stats(self) -> dict:
+        entries, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache").fetchone()
+        return {"backend": "sqlite", "path": self.path, "entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend], ttl: float = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get_or_compute(self, endpoint: str, payload: Any, compute: Callable[[], Awaitable[Any]], *extra):
+        """
+        Return the cached response for this endpoint and payload, or await compute() and cache its result.
+        Exceptions are never cached.
+        """
+        if self.backend is None:
+            return await compute()
+        key = canonical_key(endpoint, payload, *extra)
+        cached = self.backend.get(key)
+        if cached is not None:
+            REGISTRY.get("response_cache_requests_total", endpoint=endpoint, result="hit").inc()
+            return pickle.loads(cached)
+        REGISTRY.get("response_cache_requests_total", endpoint=endpoint, result="miss").inc()
+        result = await compute()
+        self.backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), self.ttl)
+        return result
+
+    async def get_or_compute_as_of(self, endpoint: str, payload: Any, compute: Callable[[], Awaitable[Any]], *extra):
+        """
+        As get_or_compute, for responses that depend on the exact as-of instant: cached under the pinned as-of,
+        and computed without caching on the live clock, where no key would ever repeat.
+        """
+        as_of = clock.pinned_as_of()
+        if as_of is None:
+            return await compute()
+        return await self.get_or_compute(endpoint, payload, compute, *extra, as_of.isoformat())
+
+    def stats(self) -> dict:
+        return self.backend.stats() if self.backend else {"backend": "off"}
+
+
+def _backend_from_env() -> Optional[CacheBackend]:
+    if RESPONSE_CACHE == "off":
+        return None
+    if RESPONSE_CACHE == "sqlite":
+        return SQLiteCache()
+    return InProcessCache()
+
+
+response_cache = ResponseCache(_backend_from_env())
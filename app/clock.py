@@ -0,0 +1,86 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+from urllib.parse import parse_qs
+from starlette.responses import JSONResponse
+from app.models.temporal import parse_timestamp
+
+# Requests can pin the instant services treat as "now" with this header or query parameter
+AS_OF_HEADER = "x-as-of"
+AS_OF_QUERY = "as_of"
+
+
+def parse_as_of(value: str) -> datetime:
+    """
+    ISO date or datetime as a naive datetime. Offsets are converted to UTC, matching how record timestamps are read.
+    """
+    return parse_timestamp(value.strip())
+
+
+# Server default as-of; unset means the live clock
+DEFAULT_AS_OF = parse_as_of(os.environ["APP_AS_OF"]) if os.getenv("APP_AS_OF") else None
+
+_as_of: ContextVar[Optional[datetime]] = ContextVar("as_of", default=None)
+
+
+def pinned_as_of() -> Optional[datetime]:
+    """
+    The fixed as-of instant for the current request (or the server default), or None on the live clock.
+    """
+    return _as_of.get() or DEFAULT_AS_OF
+
+
+def now() -> datetime:
+    """
+    The instant services evaluate data at: the pinned as-of if there is one, else the naive local time.
+    """
+    return pinned_as_of() or datetime.now()
+
+
+@contextmanager
+def pinned(instant: datetime) -> Iterator[datetime]:
+    token = _as_of.set(instant)
+    try:
+        yield instant
+    finally:
+        _as_of.reset(token)
+
+
+def call_as_of(instant: datetime, fn: Callable, *args):
+    """
+    fn(*args) with the clock pinned; used where the context does not follow the call (process workers).
+    """
+    with pinned(instant):
+        return fn(*args)
+
+
+class AsOfMiddleware:
+    """
+    Pins the clock for the whole request from the X-As-Of header or as_of query parameter.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = dict(scope["headers"]).get(AS_OF_HEADER.encode(), b"").decode()
+        if not raw:
+            raw = parse_qs(scope.get("query_string", b"").decode()).get(AS_OF_QUERY, [""])[0]
+        if not raw:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            instant = parse_as_of(raw)
+        except ValueError:
+            response = JSONResponse({"detail": f"Invalid as-of value: {raw!r}"}, status_code=400)
+            await response(scope, receive, send)
+            return
+        with pinned(instant):
+            await self.app(scope, receive, send)
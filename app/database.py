@@ -1,11 +1,58 @@
-# Placeholder for database integration
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import os
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./loans.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./loans.db")
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 
-Base = declarative_base()
\ No newline at end of file
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    # Pooled connections are handed between the request threads
+    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    pool_size=DATABASE_POOL_SIZE,
+    max_overflow=DATABASE_POOL_SIZE,
+)
+
+if _is_sqlite:
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, _record):
+        # WAL lets readers run alongside the single writer; NORMAL sync is durable across app crashes in WAL mode
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+# The feature store and job store upsert with INSERT ... ON CONFLICT (and RETURNING), which these dialects share
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+if engine.dialect.name not in _UPSERT_INSERTS:
+    raise RuntimeError(
+        f"DATABASE_URL uses the {engine.dialect.name} dialect; the feature store and job store need one of "
+        f"{', '.join(sorted(_UPSERT_INSERTS))} (INSERT ... ON CONFLICT)"
+    )
+insert = _UPSERT_INSERTS[engine.dialect.name]
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+Base = declarative_base()
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    A pooled session committed on success and rolled back on error.
+    """
+    session = SessionLocal()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,121 @@
+import asyncio
+import contextvars
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from app.metrics import REGISTRY, Counter, Summary
+from app import clock
+
+# Where CPU-bound analysis runs:
+#   thread  - a thread pool (default)
+#   process - a process pool; arguments and results must pickle
+#   inline  - on the event loop, as before (useful as a baseline)
+ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "thread").lower()
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Running plus queued calls allowed before new work is rejected with 503
+ANALYSIS_MAX_PENDING = int(os.getenv("ANALYSIS_MAX_PENDING", str(ANALYSIS_WORKERS * 4)))
+ANALYSIS_TIMEOUT = float(os.getenv("ANALYSIS_TIMEOUT", "30"))
+
+REGISTRY.register("executor_rejected_total", Counter, "Analysis calls rejected because the pool was saturated.")
+REGISTRY.register("executor_timeouts_total", Counter, "Analysis calls that exceeded their timeout.")
+REGISTRY.register("executor_wait_seconds", Summary, "Time analysis calls spent queued before a worker picked them up.")
+
+
+def _stamped(fn: Callable, args: tuple, submitted: float):
+    REGISTRY.get("executor_wait_seconds", service=getattr(fn, "__qualname__", "call")).observe(time.time() - submitted)
+    return fn(*args)
+
+
+class AnalysisPool:
+    """
+    Bounded worker pool for the synchronous service functions, so one heavy request cannot stall the event loop.
+    """
+
+    def __init__(self, kind: str = ANALYSIS_EXECUTOR, workers: int = ANALYSIS_WORKERS,
+                 max_pending: int = ANALYSIS_MAX_PENDING, timeout: float = ANALYSIS_TIMEOUT):
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown ANALYSIS_EXECUTOR: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        return self._executor
+
+    def _release(self, _future) -> None:
+        self.pending -= 1
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """
+        Run fn(*args) on the pool. Raises 503 when the pool is saturated and 504 when the call times out.
+        A timed-out call keeps its slot until the worker actually finishes it.
+        """
+        if self.kind == "inline":
+            return fn(*args)
+        if self.pending >= self.max_pending:
+            REGISTRY.get("executor_rejected_total", service=fn.__qualname__).inc()
+            raise HTTPException(status_code=503, detail="Analysis workers are busy. Please retry shortly.",
+                                headers={"Retry-After": "1"})
+
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            # Carry request context (metrics phases, as-of clock) into the worker thread
+            call = functools.partial(contextvars.copy_context().run, _stamped, fn, args, time.time())
+        else:
+            # Context does not cross process boundaries, so pin the clock explicitly
+            call = functools.partial(clock.call_as_of, clock.now(), fn, *args)
+        self.pending += 1
+        future = loop.run_in_executor(self._get_executor(), call)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            REGISTRY.get("executor_timeouts_total", service=fn.__qualname__).inc()
+            raise HTTPException(status_code=504, detail="Analysis timed out.")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pool = AnalysisPool()
+
+
+async def run_analysis(fn: Callable, *args, timeout: Optional[float] = None):
+    return await pool.run(fn, *args, timeout=timeout)
+
+
+def _run_lane(calls: Sequence[Tuple[Callable, tuple]]) -> list:
+    results = []
+    for fn, args in calls:
+        try:
+            results.append(fn(*args))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+async def run_concurrently(calls: Sequence[Tuple[Callable, tuple]], timeout: Optional[float] = None) -> List:
+    """
+    Run independent (fn, args) calls on the pool, spread over at most one slot per worker so a fan-out never
+    crowds out other requests. Results come back in call order; a call that raised yields its exception.
+    """
+    lanes = max(1, min(pool.workers, len(calls)))
+    outcomes = await asyncio.gather(*(run_analysis(_run_lane, calls[lane::lanes], timeout=timeout)
+                                      for lane in range(lanes)))
+    results = [None] * len(calls)
+    for lane, lane_results in enumerate(outcomes):
+        results[lane::lanes] = lane_results
+    return results
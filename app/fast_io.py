@@ -0,0 +1,127 @@
+import gc
+import json
+import os
+from typing import Annotated, Any, Callable, Optional, Tuple, get_args, get_origin
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.requests import Request
+from starlette.responses import Response
+from app.metrics import TimedRoute
+from app.models.records import Compact
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+# Optimized request/response path; FAST_IO=0 restores FastAPI's default validation and encoding
+FAST_IO = os.getenv("FAST_IO", "1") not in ("0", "false", "False")
+
+# Bodies at least this large are validated with the cyclic GC paused (see _validate_body)
+GC_PAUSE_BYTES = int(os.getenv("FAST_IO_GC_PAUSE_BYTES", str(1 << 20)))
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact JSON, as FastAPI's JSONResponse renders it; with orjson when installed and FAST_IO is on.
+    """
+    if FAST_IO and orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _model_shape(annotation) -> Optional[Tuple[bool, type]]:
+    """
+    (is_list, model) for `Model` or `List[Model]` annotations, else None.
+    """
+    if get_origin(annotation) is list:
+        args = get_args(annotation)
+        annotation, is_list = (args[0] if args else None), True
+    else:
+        is_list = False
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return is_list, annotation
+    return None
+
+
+def _validate_body(validate: Callable[[bytes], Any], body: bytes):
+    """
+    Validate a JSON body straight into models (or records). Every new model is a GC-tracked container, so on
+    large bodies the collector would run (and rescan the partial result) many times over; nothing built here is cyclic.
+    """
+    if len(body) < GC_PAUSE_BYTES or not gc.isenabled():
+        return validate(body)
+    gc.disable()
+    try:
+        return validate(body)
+    finally:
+        gc.enable()
+
+
+def _is_json(request: Request) -> bool:
+    # Same rule FastAPI uses to decide whether a body is JSON
+    content_type = request.headers.get("content-type")
+    if not content_type:
+        return True
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type == "application/json" or (media_type.startswith("application/") and media_type.endswith("+json"))
+
+
+class FastIORoute(TimedRoute):
+    """
+    Route with the optimized I/O path for `Model` / `List[Model]` bodies and responses:
+    - the body is parsed and validated in one pass by a prebuilt TypeAdapter (JSON straight to models),
+      and FastAPI's own validation then only sees already-built instances; bodies annotated with
+      app.models.records.Compact are validated a chunk at a time straight into records instead;
+    - a return value that is exactly the declared response model type skips response validation and is
+      encoded by the same adapter.
+    Invalid bodies fall through to FastAPI's default path, so error responses are unchanged.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        annotation, compact = self.body_field.field_info.annotation if self.body_field else None, None
+        if get_origin(annotation) is Annotated:
+            compact = next((m for m in annotation.__metadata__ if isinstance(m, Compact)), None)
+            annotation = get_args(annotation)[0]
+        body_shape = _model_shape(annotation)
+        self._body_adapter = TypeAdapter(annotation) if body_shape and not self._embed_body_fields else None
+        plain_response = not (
+            self.response_model_include or self.response_model_exclude or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults or self.response_model_exclude_none or not self.response_model_by_alias
+        )
+        self._response_shape = _model_shape(self.response_model) if plain_response else None
+        self._response_adapter = TypeAdapter(self.response_model) if self._response_shape else None
+        if self._body_adapter is None:
+            return handler
+
+        validate = compact.records.validate_json if compact else self._body_adapter.validate_json
+
+        async def fast_handler(request: Request) -> Response:
+            if FAST_IO and _is_json(request):
+                try:
+                    # Starlette caches the decoded body on the request; FastAPI reads it back from there
+                    request._json = _validate_body(validate, await request.body())
+                except ValueError:
+                    # A ValidationError, or a timestamp the records cannot hold: FastAPI's own validation reports it
+                    pass
+            return await handler(request)
+
+        return fast_handler
+
+    def render_result(self, result):
+        if not FAST_IO or self._response_adapter is None:
+            return result
+        is_list, model = self._response_shape
+        if is_list:
+            if type(result) is not list or not all(type(item) is model for item in result):
+                return result
+        elif type(result) is not model:
+            return result
+        return Response(self._response_adapter.dump_json(result), status_code=self.status_code or 200,
+                        media_type="application/json")
@@ -0,0 +1,496 @@
+"""
+Per-user feature store on the app.database engine.
+
+Ingestion folds new records into incrementally maintained aggregates, so suggestions can be computed from a
+user_id alone instead of the user's full history:
+- income: totals and counts by (month, source, category), and each user's income series, kept in memory
+  between requests and extended with new income rather than rebuilt
+- expenses: totals, counts and the largest expense by (month, category)
+- loans: the latest snapshot of each loan and its balance, i.e. its latest payment
+- savings goals: the latest snapshot of each goal and its entries, in ingestion order (the projections fit
+  trends on entry dates, so monthly totals would not do)
+
+Events that carry an id (expenses, loan payments, goal entries) are counted at most once per user, so clients
+can safely retry a batch. Incomes have no id and are always appended.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import Column, DateTime, Float, Integer, String, Text, and_, bindparam, case, or_, select, update
+from sqlalchemy.orm import Session
+from app.database import Base, engine, insert, session_scope
+from app.metrics import METRICS_ENABLED, REGISTRY, Summary
+from app.models.expense import Expense
+from app.models.income import Income
+from app.models.loan import Loan, LoanPayment
+from app.models.records import ExpenseRow, IncomeRecords, Labels
+from app.models.savings import GoalEntry, SavingsGoal
+from app.models.temporal import column
+from app.services.expense_clustering import SpendItems
+from app.services.expense_engine import ExpenseSummary
+from app.services.income import IncomeTotals, IncomeTrend, income_trend
+from app.services.income_series import IncomeSeries
+
+# Users whose income series are kept in memory, least recently used dropped first
+INCOME_SERIES_CACHE = int(os.getenv("INCOME_SERIES_CACHE", "10000"))
+
+REGISTRY.register("feature_store_seconds", Summary, "Time per feature store operation, database I/O included.")
+
+
+def _timed(operation: str):
+    """
+    Record an operation under feature_store_seconds; database time is kept out of the request's analysis phase.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.get("feature_store_seconds", operation=operation).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class IncomeMonthly(Base):
+    __tablename__ = "fs_income_monthly"
+
+    user_id = Column(Integer, primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    source = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+
+
+class IncomeIngested(Base):
+    __tablename__ = "fs_income_ingested"
+
+    user_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False)  # incomes ingested so far: the version of the user's income series
+
+
+class ExpenseMonthly(Base):
+    __tablename__ = "fs_expense_monthly"
+
+    user_id = Column(Integer, primary_key=True)
+    month = Column(String(7), primary_key=True)
+    category = Column(String, primary_key=True)
+    total = Column(Float, nullable=False)
+    count = Column(Integer, nullable=False)
+    top_amount = Column(Float, nullable=False)
+    top_expense = Column(Text, nullable=False)  # the first-ingested expense with top_amount, as JSON
+
+
+class LoanState(Base):
+    __tablename__ = "fs_loans"
+
+    user_id = Column(Integer, primary_key=True)
+    loan_id = Column(Integer, primary_key=True)
+    start_date = Column(DateTime, nullable=False, index=True)
+    snapshot = Column(Text, nullable=False)  # the loan without its payments, as JSON
+    balance = Column(Float)
+    balance_date = Column(DateTime)
+    last_payment = Column(Text)  # the payment the balance comes from, as JSON
+
+
+class GoalState(Base):
+    __tablename__ = "fs_goals"
+
+    user_id = Column(Integer, primary_key=True)
+    goal_id = Column(Integer, primary_key=True)
+    current_amount = Column(Float, nullable=False)
+    snapshot = Column(Text, nullable=False)  # the goal without its entries, as JSON
+
+
+class GoalEntryLog(Base):
+    __tablename__ = "fs_goal_entries"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)  # ingestion order
+    user_id = Column(Integer, nullable=False, index=True)
+    goal_id = Column(Integer, nullable=False)
+    entry = Column(Text, nullable=False)  # the entry as JSON
+
+
+class IngestedEvent(Base):
+    __tablename__ = "fs_ingested_events"
+
+    user_id = Column(Integer, primary_key=True)
+    domain = Column(String, primary_key=True)
+    event_id = Column(Integer, primary_key=True)
+
+
+def init_store() -> None:
+    Base.metadata.create_all(engine)
+
+
+def _months(records: Sequence, field: str) -> List[str]:
+    return column(records, field).astype("datetime64[M]").astype(str).tolist()
+
+
+def _accumulate(session: Session, model, rows: List[dict], sums: Iterable[str], **overrides) -> None:
+    """
+    Bulk upsert that adds the `sums` columns of each row to the stored ones (executemany).
+    `overrides` are extra SET expressions built from the statement, e.g. to keep a running maximum.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    stmt = insert(table)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in sums}
+    set_.update({name: build(table, stmt.excluded) for name, build in overrides.items()})
+    stmt = stmt.on_conflict_do_update(index_elements=[c.name for c in table.primary_key], set_=set_)
+    session.execute(stmt, rows)
+
+
+def _new_events(session: Session, user_id: int, domain: str, records: Sequence) -> list:
+    """
+    The records whose id this user has not ingested before, keeping the first of any repeats in the batch.
+    """
+    if not records:
+        return []
+    table = IngestedEvent.__table__
+    stmt = insert(table).on_conflict_do_nothing().returning(table.c.event_id)
+    fresh = set(session.scalars(stmt, [{"user_id": user_id, "domain": domain, "event_id": r.id} for r in records]))
+    new = []
+    for record in records:
+        if record.id in fresh:
+            fresh.discard(record.id)
+            new.append(record)
+    return new
+
+
+def _known_ids(session: Session, model, key, user_id: int, ids: Iterable[int]) -> set:
+    wanted = set(ids)
+    known = session.scalars(select(key).where(model.user_id == user_id)).all()
+    return wanted.intersection(known)
+
+
+@_timed("ingest_incomes")
+def ingest_incomes(user_id: int, incomes: List[Income]) -> int:
+    groups: Dict[Tuple[str, str, str], list] = {}
+    for month, income in zip(_months(incomes, "date"), incomes):
+        group = groups.setdefault((month, income.source, income.category), [0, 0])
+        group[0] += income.amount
+        group[1] += 1
+    rows = [{"user_id": user_id, "month": month, "source": source, "category": category, "total": total, "count": count}
+            for (month, source, category), (total, count) in groups.items()]
+    if not rows:
+        return 0
+    table = IncomeIngested.__table__
+    stmt = insert(table).values(user_id=user_id, count=len(incomes))
+    stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_={"count": table.c.count + len(incomes)})
+    with session_scope() as session:
+        _accumulate(session, IncomeMonthly, rows, ("total", "count"))
+        version = session.scalar(stmt.returning(table.c.count))
+    _extend_series(user_id, version - len(incomes), version, incomes)
+    return len(incomes)
+
+
+# user_id -> (version, series), least recently used first
+_income_series: "OrderedDict[int, Tuple[int, IncomeSeries]]" = OrderedDict()
+_income_series_lock = threading.Lock()
+
+
+def _extend_series(user_id: int, before: int, after: int, incomes: List[Income]) -> None:
+    """
+    Add newly ingested income to the user's kept series, if it holds exactly the income before it; a series
+    another worker's ingestion has overtaken is dropped and rebuilt on the next load.
+    """
+    with _income_series_lock:
+        kept = _income_series.pop(user_id, None)
+        if kept is not None and kept[0] == before:
+            _income_series[user_id] = (after, kept[1].extend_records(IncomeRecords.of(incomes)))
+
+
+def _series_trend(user_id: int, version: Optional[int], rows: Sequence, now: datetime) -> Optional[IncomeTrend]:
+    """
+    The monthly trend from the user's kept series if it is at `version`, else from a series built from `rows`
+    (the stored totals read together with `version`), which is then kept.
+    """
+    with _income_series_lock:
+        kept = _income_series.get(user_id)
+        if kept is not None and version is not None and kept[0] == version:
+            _income_series.move_to_end(user_id)
+            return income_trend(kept[1], now)
+    sources = Labels()
+    series = IncomeSeries().extend(
+        np.array([row.month for row in rows], dtype="datetime64[M]").astype(np.int64),
+        sources.encode([row.source for row in rows]), sources.values(), np.array([row.total for row in rows])
+    )
+    with _income_series_lock:
+        if version is not None and INCOME_SERIES_CACHE > 0:
+            _income_series[user_id] = (version, series)
+            _income_series.move_to_end(user_id)
+            while len(_income_series) > INCOME_SERIES_CACHE:
+                _income_series.popitem(last=False)
+        return income_trend(series, now)
+
+
+@_timed("ingest_expenses")
+def ingest_expenses(user_id: int, expenses: List[Expense]) -> int:
+    with session_scope() as session:
+        expenses = _new_events(session, user_id, "expense", expenses)
+        groups: Dict[Tuple[str, str], list] = {}
+        for month, expense in zip(_months(expenses, "date"), expenses):
+            group = groups.get((month, expense.category))
+            if group is None:
+                groups[(month, expense.category)] = [expense.amount, 1, expense]
+                continue
+            group[0] += expense.amount
+            group[1] += 1
+            if expense.amount > group[2].amount:
+                group[2] = expense
+        rows = [{"user_id": user_id, "month": month, "category": category, "total": total, "count": count,
+                 "top_amount": top.amount, "top_expense": top.model_dump_json()}
+                for (month, category), (total, count, top) in groups.items()]
+        # The stored top expense is only replaced by a strictly larger one, like max() over the full history
+        _accumulate(
+            session, ExpenseMonthly, rows, ("total", "count"),
+            top_amount=lambda t, new: case((new.top_amount > t.c.top_amount, new.top_amount), else_=t.c.top_amount),
+            top_expense=lambda t, new: case((new.top_amount > t.c.top_amount, new.top_expense), else_=t.c.top_expense),
+        )
+    return len(expenses)
+
+
+def _apply_payments(session: Session, user_id: int, payments: List[Tuple[int, LoanPayment]]) -> int:
+    fresh = {id(p) for p in _new_events(session, user_id, "loan_payment", [p for _, p in payments])}
+    latest: Dict[int, LoanPayment] = {}
+    for loan_id, payment in payments:
+        if id(payment) not in fresh:
+            continue
+        current = latest.get(loan_id)
+        if current is None or payment.payment_dt > current.payment_dt:
+            latest[loan_id] = payment
+    if latest:
+        table = LoanState.__table__
+        stmt = (
+            update(table)
+            .where(and_(table.c.user_id == bindparam("b_user_id"), table.c.loan_id == bindparam("b_loan_id"),
+                        or_(table.c.balance_date.is_(None), table.c.balance_date < bindparam("b_date"))))
+            .values(balance=bindparam("b_balance"), balance_date=bindparam("b_date"), last_payment=bindparam("b_payment"))
+        )
+        session.execute(stmt, [
+            {"b_user_id": user_id, "b_loan_id": loan_id, "b_balance": p.remaining_balance, "b_date": p.payment_dt,
+             "b_payment": p.model_dump_json()}
+            for loan_id, p in latest.items()
+        ])
+    return len(fresh)
+
+
+@_timed("ingest_loans")
+def ingest_loans(user_id: int, loans: List[Loan]) -> int:
+    """
+    Store loan snapshots (replacing earlier ones) and ingest their payments.
+    """
+    rows = [{"user_id": user_id, "loan_id": loan.id, "start_date": loan.start_dt,
+             "snapshot": loan.model_dump_json(exclude={"payments"})} for loan in loans]
+    table = LoanState.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "loan_id"],
+        set_={"start_date": stmt.excluded.start_date, "snapshot": stmt.excluded.snapshot},
+    )
+    with session_scope() as session:
+        if rows:
+            session.execute(stmt, rows)
+        _apply_payments(session, user_id, [(loan.id, p) for loan in loans for p in loan.payments or ()])
+    return len(loans)
+
+
+@_timed("ingest_loan_payments")
+def ingest_loan_payments(user_id: int, payments: List[LoanPayment]) -> int:
+    """
+    Ingest payments for stored loans. Raises ValueError for payments without a loan_id and KeyError for unknown loans.
+    """
+    if any(p.loan_id is None for p in payments):
+        raise ValueError("Every payment needs a loan_id")
+    with session_scope() as session:
+        loan_ids = {p.loan_id for p in payments}
+        unknown = loan_ids - _known_ids(session, LoanState, LoanState.loan_id, user_id, loan_ids)
+        if unknown:
+            raise KeyError(f"Unknown loan ids: {sorted(unknown)}")
+        return _apply_payments(session, user_id, [(p.loan_id, p) for p in payments])
+
+
+def _apply_entries(session: Session, user_id: int, entries: List[Tuple[int, GoalEntry]], deposit: bool) -> int:
+    fresh = {id(e) for e in _new_events(session, user_id, "goal_entry", [e for _, e in entries])}
+    entries = [(goal_id, e) for goal_id, e in entries if id(e) in fresh]
+    if entries:
+        session.execute(insert(GoalEntryLog.__table__), [
+            {"user_id": user_id, "goal_id": goal_id, "entry": entry.model_dump_json()} for goal_id, entry in entries
+        ])
+    if deposit and entries:
+        # New entries on their own are deposits on top of the stored balance
+        added = defaultdict(float)
+        for goal_id, entry in entries:
+            added[goal_id] += entry.amount
+        table = GoalState.__table__
+        stmt = (
+            update(table)
+            .where(and_(table.c.user_id == bindparam("b_user_id"), table.c.goal_id == bindparam("b_goal_id")))
+            .values(current_amount=table.c.current_amount + bindparam("b_added"))
+        )
+        session.execute(stmt, [{"b_user_id": user_id, "b_goal_id": goal_id, "b_added": amount}
+                               for goal_id, amount in added.items()])
+    return len(entries)
+
+
+@_timed("ingest_goals")
+def ingest_goals(user_id: int, goals: List[SavingsGoal]) -> int:
+    """
+    Store goal snapshots (replacing earlier ones, balance included) and ingest their entries.
+    """
+    rows = [{"user_id": user_id, "goal_id": goal.id, "current_amount": goal.current_amount,
+             "snapshot": goal.model_dump_json(exclude={"goal_entries"})} for goal in goals]
+    table = GoalState.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "goal_id"],
+        set_={"current_amount": stmt.excluded.current_amount, "snapshot": stmt.excluded.snapshot},
+    )
+    with session_scope() as session:
+        if rows:
+            session.execute(stmt, rows)
+        # The snapshot's balance already includes its own entries
+        _apply_entries(session, user_id, [(goal.id, e) for goal in goals for e in goal.goal_entries], deposit=False)
+    return len(goals)
+
+
+@_timed("ingest_goal_entries")
+def ingest_goal_entries(user_id: int, entries: List[GoalEntry]) -> int:
+    """
+    Ingest new entries for stored goals; each one raises its goal's balance. Raises KeyError for unknown goals.
+    """
+    with session_scope() as session:
+        goal_ids = {e.goal_id for e in entries}
+        unknown = goal_ids - _known_ids(session, GoalState, GoalState.goal_id, user_id, goal_ids)
+        if unknown:
+            raise KeyError(f"Unknown goal ids: {sorted(unknown)}")
+        return _apply_entries(session, user_id, [(e.goal_id, e) for e in entries], deposit=True)
+
+
+@_timed("load_income_totals")
+def load_income_totals(user_id: int, now: datetime) -> IncomeTotals:
+    """
+    Income totals with the monthly trend as of `now`, from the stored (month, source, category) totals and the
+    user's kept income series.
+    """
+    # Read with the rows in one statement, so the version names exactly the income they hold
+    version = select(IncomeIngested.count).where(IncomeIngested.user_id == user_id).scalar_subquery()
+    with session_scope() as session:
+        rows = session.execute(
+            select(IncomeMonthly.month, IncomeMonthly.source, IncomeMonthly.category, IncomeMonthly.total,
+                   version.label("version"))
+            .where(IncomeMonthly.user_id == user_id)
+            .order_by(IncomeMonthly.month, IncomeMonthly.source, IncomeMonthly.category)
+        ).all()
+    total, by_source, by_month, categories = 0, {}, {}, set()
+    for month, source, category, amount, _ in rows:
+        total += amount
+        by_source[source] = by_source.get(source, 0) + amount
+        key = int(np.datetime64(month, "M").astype(np.int64))
+        by_month[key] = by_month.get(key, 0) + amount
+        categories.add(category)
+    return IncomeTotals(total, by_source, by_month, categories,
+                        _series_trend(user_id, rows[0].version if rows else None, rows, now))
+
+
+@_timed("load_expense_summary")
+def load_expense_summary(user_id: int, cutoff: datetime) -> ExpenseSummary:
+    """
+    Expense statistics with expenses from `cutoff` on counted as recent; `cutoff` must be the start of a month.
+    """
+    recent_from = f"{cutoff:%Y-%m}"
+    with session_scope() as session:
+        rows = session.execute(
+            select(ExpenseMonthly.month, ExpenseMonthly.category, ExpenseMonthly.total, ExpenseMonthly.count,
+                   ExpenseMonthly.top_amount, ExpenseMonthly.top_expense)
+            .where(ExpenseMonthly.user_id == user_id)
+            .order_by(ExpenseMonthly.month, ExpenseMonthly.category)
+        ).all()
+    total, count, category_totals = 0, 0, {}
+    top_amount, top_expense = None, None
+    for month, category, amount, n, month_top, month_top_expense in rows:
+        total += amount
+        count += n
+        category_totals[category] = category_totals.get(category, 0) + amount
+        if month >= recent_from and (top_amount is None or month_top > top_amount):
+            top_amount, top_expense = month_top, month_top_expense
+    top_recent = None
+    if top_expense is not None:
+        expense = Expense.model_validate_json(top_expense)
+        top_recent = ExpenseRow(expense.title, expense.amount, expense.category)
+    return ExpenseSummary(total, count, category_totals, top_recent)
+
+
+@_timed("load_spend_items")
+def load_spend_items(user_id: int) -> Optional[SpendItems]:
+    """
+    The user's stored spending as one item per (month, category) total, or None without any.
+    """
+    with session_scope() as session:
+        rows = session.execute(
+            select(ExpenseMonthly.month, ExpenseMonthly.category, ExpenseMonthly.total)
+            .where(ExpenseMonthly.user_id == user_id)
+            .order_by(ExpenseMonthly.month, ExpenseMonthly.category)
+        ).all()
+    if not rows:
+        return None
+    months, categories, totals = zip(*rows)
+    labels = Labels()
+    codes = labels.encode(categories)
+    return SpendItems(np.array(totals, dtype=np.float64), codes, labels.values(),
+                      np.array(months, dtype="datetime64[M]").astype(np.int64))
+
+
+@_timed("load_loans")
+def load_loans(user_id: int, since: datetime) -> List[Loan]:
+    """
+    Stored loans starting at or after `since`, each with its latest payment as its payment history.
+    """
+    with session_scope() as session:
+        rows = session.execute(
+            select(LoanState.snapshot, LoanState.last_payment)
+            .where(LoanState.user_id == user_id, LoanState.start_date >= since)
+            .order_by(LoanState.loan_id)
+        ).all()
+    return [
+        Loan.model_validate({**json.loads(snapshot), "payments": [json.loads(payment)] if payment else None})
+        for snapshot, payment in rows
+    ]
+
+
+@_timed("load_goals")
+def load_goals(user_id: int) -> List[SavingsGoal]:
+    """
+    Stored goals with their entries in ingestion order, as they were sent.
+    """
+    with session_scope() as session:
+        goals = session.execute(
+            select(GoalState.goal_id, GoalState.current_amount, GoalState.snapshot)
+            .where(GoalState.user_id == user_id)
+            .order_by(GoalState.goal_id)
+        ).all()
+        logged = session.execute(
+            select(GoalEntryLog.goal_id, GoalEntryLog.entry)
+            .where(GoalEntryLog.user_id == user_id)
+            .order_by(GoalEntryLog.seq)
+        ).all()
+    entries = defaultdict(list)
+    for goal_id, entry in logged:
+        entries[goal_id].append(json.loads(entry))
+    return [
+        SavingsGoal.model_validate({**json.loads(snapshot), "current_amount": current_amount,
+                                    "goal_entries": entries.get(goal_id, [])})
+        for goal_id, current_amount, snapshot in goals
+    ]
@@ -0,0 +1,397 @@
+"""
+Background jobs for batch suggestion runs too large for one request.
+
+Submitting a batch stores it as chunks in the app.database engine and returns a job id at once. A scheduler on
+each worker process runs queued jobs in the background, at most JOB_CONCURRENCY at a time, one chunk after
+another on the analysis pool with the existing service functions. Every finished chunk commits its results and
+the job's progress in one transaction, so:
+- results can be paged while the job is still running;
+- cancelling takes effect at the next chunk boundary;
+- a job survives its worker: it is leased to one worker process, and once that lease lapses (released on
+  shutdown, or not renewed for JOB_LEASE_SECONDS after a crash) any worker resumes it from its first
+  unfinished chunk.
+Finished jobs (completed, failed or cancelled) are deleted with their chunks and results JOB_RETENTION_SECONDS
+after they last changed.
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, LargeBinary, String, Text, and_, delete, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from app import clock, fast_io
+from app.database import Base, engine, insert, session_scope
+from app.executor import run_analysis
+from app.metrics import REGISTRY, Counter, Summary
+from app.models.job import JobStatus
+from app.models.loan import Loan
+from app.models.savings import SavingsGoal
+from app.services.loan_batch import generate_payment_optimization_batch
+from app.services.savings import generate_savings_suggestions
+
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "1000"))
+# Jobs one worker process runs at once; their chunks still queue for the shared analysis pool
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+JOB_CHUNK_TIMEOUT = float(os.getenv("JOB_CHUNK_TIMEOUT", "300"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+# Least time between two purges of finished jobs on one worker
+JOB_PURGE_SECONDS = 60.0
+JOB_RESULTS_PAGE_MAX = 1000
+
+REGISTRY.register("job_chunks_total", Counter, "Job chunks processed, by kind and outcome.")
+REGISTRY.register("job_chunk_seconds", Summary, "Time to analyse and store one job chunk.")
+REGISTRY.register("job_scheduler_errors_total", Counter, "Scheduler database operations that failed and were retried.")
+
+
+class JobKind(NamedTuple):
+    model: type  # of the submitted records
+    run: Callable[[list], list]  # service function applied to each chunk
+
+
+JOB_KINDS = {
+    "loan/optimize-payments": JobKind(Loan, generate_payment_optimization_batch),
+    "savings/suggestions": JobKind(SavingsGoal, generate_savings_suggestions),
+}
+_adapters = {kind: TypeAdapter(List[spec.model]) for kind, spec in JOB_KINDS.items()}
+UNFINISHED = ("queued", "running")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, index=True)
+    as_of = Column(DateTime, nullable=False)
+    items = Column(Integer, nullable=False)
+    chunks = Column(Integer, nullable=False)
+    chunks_done = Column(Integer, nullable=False)
+    results = Column(Integer, nullable=False)
+    error = Column(Text)
+    owner = Column(String(32))  # the worker process holding the lease
+    lease_until = Column(Float)  # unix time
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class JobChunk(Base):
+    __tablename__ = "job_chunks"
+
+    job_id = Column(String(32), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    done = Column(Boolean, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # the chunk's records as a JSON array, emptied once done
+
+
+class JobResult(Base):
+    __tablename__ = "job_results"
+
+    job_id = Column(String(32), primary_key=True)
+    position = Column(Integer, primary_key=True)  # across the whole job, in chunk order
+    value = Column(LargeBinary, nullable=False)  # JSON
+
+
+def init_jobs() -> None:
+    Base.metadata.create_all(engine, tables=[Job.__table__, JobChunk.__table__, JobResult.__table__])
+
+
+def _describe(job: Job) -> JobStatus:
+    return JobStatus(
+        job_id=job.id, kind=job.kind, status=job.status, as_of=job.as_of.isoformat(), items=job.items,
+        chunks=job.chunks, chunks_done=job.chunks_done,
+        progress=round(job.chunks_done / job.chunks, 4) if job.chunks else 1.0,
+        results=job.results, error=job.error, created_at=job.created_at.isoformat(),
+        updated_at=job.updated_at.isoformat(),
+    )
+
+
+def _get(session, job_id: str) -> Job:
+    job = session.get(Job, job_id)
+    if job is None:
+        raise KeyError(f"Job {job_id} not found")
+    return job
+
+
+def submit_job(kind: str, records: Sequence, chunk_size: int = JOB_CHUNK_SIZE) -> JobStatus:
+    """
+    Store a batch as chunks of `chunk_size` records, to be evaluated at the current as-of instant.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    adapter = _adapters[kind]
+    chunks = [
+        {"seq": seq, "done": False, "payload": adapter.dump_json(records[start:start + chunk_size])}
+        for seq, start in enumerate(range(0, len(records), chunk_size))
+    ]
+    now = datetime.now()
+    job = Job(
+        id=uuid.uuid4().hex, kind=kind, status="queued" if chunks else "completed", as_of=clock.now(),
+        items=len(records), chunks=len(chunks), chunks_done=0, results=0, created_at=now, updated_at=now,
+    )
+    with session_scope() as session:
+        session.add(job)
+        if chunks:
+            session.execute(insert(JobChunk.__table__), [dict(chunk, job_id=job.id) for chunk in chunks])
+    return _describe(job)
+
+
+def job_status(job_id: str) -> JobStatus:
+    with session_scope() as session:
+        return _describe(_get(session, job_id))
+
+
+def job_results(job_id: str, offset: int, limit: int) -> bytes:
+    """
+    One page of a job's results as a JSON object; the stored values are spliced in without re-encoding.
+    """
+    with session_scope() as session:
+        job = _get(session, job_id)
+        values = session.scalars(
+            select(JobResult.value)
+            .where(JobResult.job_id == job_id, JobResult.position >= offset)
+            .order_by(JobResult.position)
+            .limit(limit)
+        ).all()
+    head = fast_io.dumps({"job_id": job.id, "status": job.status, "offset": offset, "limit": limit,
+                          "total": job.results})
+    return head[:-1] + b',"results":[' + b",".join(values) + b"]}"
+
+
+def cancel_job(job_id: str) -> JobStatus:
+    with session_scope() as session:
+        job = _get(session, job_id)
+        if job.status in UNFINISHED:
+            job.status = "cancelled"
+            job.updated_at = datetime.now()
+        return _describe(job)
+
+
+def run_chunk(kind: str, payload: bytes) -> List[bytes]:
+    """
+    Validate one chunk's records and run the job's service function on them; each result as JSON.
+    """
+    return [to_json(item) for item in JOB_KINDS[kind].run(_adapters[kind].validate_json(payload))]
+
+
+def _detail(e: Exception) -> str:
+    return str(getattr(e, "detail", e))
+
+
+class JobScheduler:
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, poll: float = JOB_POLL_SECONDS,
+                 lease: float = JOB_LEASE_SECONDS, retention: float = JOB_RETENTION_SECONDS):
+        self.worker_id = uuid.uuid4().hex
+        self.concurrency = concurrency
+        self.poll = poll
+        self.lease = lease
+        self.retention = retention
+        self._purged_at = 0.0
+        self.running: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        init_jobs()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop running jobs and release their leases, so any worker resumes them straight away.
+        """
+        tasks = list(self.running.values()) + ([self._task] if self._task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        await run_in_threadpool(self._release)
+
+    def wake(self) -> None:
+        """
+        Look for new work now rather than at the next poll; safe from any thread.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self._renew)
+                if time.monotonic() - self._purged_at >= JOB_PURGE_SECONDS:
+                    await run_in_threadpool(self._purge)
+                    self._purged_at = time.monotonic()
+                free = self.concurrency - len(self.running)
+                if free > 0:
+                    for job_id in await run_in_threadpool(self._claim, free):
+                        task = asyncio.create_task(self._run_job(job_id))
+                        task.add_done_callback(lambda _, job_id=job_id: self._finished(job_id))
+                        self.running[job_id] = task
+            except SQLAlchemyError:
+                # Usually another worker holding the write lock; the next pass retries
+                REGISTRY.get("job_scheduler_errors_total").inc()
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll)
+            except asyncio.TimeoutError:
+                pass
+
+    def _finished(self, job_id: str) -> None:
+        self.running.pop(job_id, None)
+        self._wake.set()
+
+    def _claimable(self, now: float):
+        return or_(Job.status == "queued", and_(Job.status == "running", Job.lease_until < now))
+
+    def _claim(self, limit: int) -> List[str]:
+        """
+        Take up to `limit` queued jobs, or running ones whose lease has lapsed, oldest first.
+        """
+        now = time.time()
+        claimed = []
+        with session_scope() as session:
+            candidates = session.scalars(
+                select(Job.id).where(self._claimable(now), Job.id.not_in(list(self.running)))
+                .order_by(Job.created_at).limit(limit)
+            ).all()
+            for job_id in candidates:
+                # Conditional, so two workers racing for one job cannot both win it
+                taken = session.execute(
+                    update(Job).where(Job.id == job_id, self._claimable(now))
+                    .values(status="running", owner=self.worker_id, lease_until=now + self.lease,
+                            updated_at=datetime.now())
+                )
+                if taken.rowcount:
+                    claimed.append(job_id)
+        return claimed
+
+    def _renew(self) -> None:
+        if not self.running:
+            return
+        with session_scope() as session:
+            session.execute(
+                update(Job).where(Job.owner == self.worker_id, Job.status == "running", Job.id.in_(list(self.running)))
+                .values(lease_until=time.time() + self.lease)
+            )
+
+    def _release(self) -> None:
+        with session_scope() as session:
+            session.execute(
+                update(Job).where(Job.owner == self.worker_id, Job.status == "running").values(lease_until=0.0)
+            )
+
+    def _purge(self) -> None:
+        """
+        Delete finished jobs, with their chunks and results, that have not changed for the retention period.
+        """
+        with session_scope() as session:
+            expired = select(Job.id).where(Job.status.not_in(UNFINISHED),
+                                           Job.updated_at < datetime.now() - timedelta(seconds=self.retention))
+            for table in (JobResult, JobChunk):
+                session.execute(delete(table).where(table.job_id.in_(expired)))
+            session.execute(delete(Job).where(Job.id.in_(expired)))
+
+    def _owned(self, session, job_id: str) -> Optional[Job]:
+        job = session.get(Job, job_id)
+        return job if job is not None and job.status == "running" and job.owner == self.worker_id else None
+
+    def _next_chunk(self, job_id: str):
+        """
+        (kind, as_of, seq, payload) of the job's first unfinished chunk; None once the job is complete or no
+        longer ours to run (cancelled, or taken over after our lease lapsed).
+        """
+        with session_scope() as session:
+            job = self._owned(session, job_id)
+            if job is None:
+                return None
+            chunk = session.execute(
+                select(JobChunk.seq, JobChunk.payload)
+                .where(JobChunk.job_id == job_id, JobChunk.done.is_(False))
+                .order_by(JobChunk.seq).limit(1)
+            ).first()
+            if chunk is None:
+                job.status = "completed"
+                job.updated_at = datetime.now()
+                return None
+            return job.kind, job.as_of, chunk.seq, chunk.payload
+
+    def _commit_chunk(self, job_id: str, seq: int, values: List[bytes]) -> bool:
+        """
+        Store a chunk's results and mark it done in one transaction; False if the job stopped being ours.
+        """
+        with session_scope() as session:
+            job = self._owned(session, job_id)
+            if job is None:
+                return False
+            if values:
+                session.execute(insert(JobResult.__table__), [
+                    {"job_id": job_id, "position": job.results + i, "value": value} for i, value in enumerate(values)
+                ])
+            session.execute(update(JobChunk).where(JobChunk.job_id == job_id, JobChunk.seq == seq)
+                            .values(done=True, payload=b""))
+            job.chunks_done += 1
+            job.results += len(values)
+            job.lease_until = time.time() + self.lease
+            job.updated_at = datetime.now()
+        return True
+
+    def _fail(self, job_id: str, error: str) -> None:
+        with session_scope() as session:
+            job = self._owned(session, job_id)
+            if job is not None:
+                job.status = "failed"
+                job.error = error
+                job.updated_at = datetime.now()
+
+    async def _analyse(self, kind: str, payload: bytes) -> List[bytes]:
+        while True:
+            try:
+                return await run_analysis(run_chunk, kind, payload, timeout=JOB_CHUNK_TIMEOUT)
+            except HTTPException as e:
+                if e.status_code != 503:
+                    raise
+                # The pool is saturated; interactive requests go first
+                await asyncio.sleep(self.poll)
+
+    async def _retry(self, call: Callable, *args):
+        """
+        Run a database call for a job in the threadpool until it succeeds; the lease stays renewed meanwhile.
+        """
+        while True:
+            try:
+                return await run_in_threadpool(call, *args)
+            except SQLAlchemyError:
+                # Usually another worker holding the write lock
+                REGISTRY.get("job_scheduler_errors_total").inc()
+                await asyncio.sleep(self.poll)
+
+    async def _run_job(self, job_id: str) -> None:
+        while True:
+            chunk = await self._retry(self._next_chunk, job_id)
+            if chunk is None:
+                return
+            kind, as_of, seq, payload = chunk
+            started = time.perf_counter()
+            try:
+                with clock.pinned(as_of):
+                    values = await self._analyse(kind, payload)
+            except Exception as e:
+                REGISTRY.get("job_chunks_total", kind=kind, outcome="failed").inc()
+                await self._retry(self._fail, job_id, f"Chunk {seq}: {_detail(e)}")
+                return
+            if not await self._retry(self._commit_chunk, job_id, seq, values):
+                return
+            REGISTRY.get("job_chunks_total", kind=kind, outcome="done").inc()
+            REGISTRY.get("job_chunk_seconds", kind=kind).observe(time.perf_counter() - started)
+
+
+scheduler = JobScheduler()
@@ -0,0 +1,227 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+from fastapi.routing import APIRoute
+from app import profiling
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "False")
+RESERVOIR_SIZE = 2048  # Recent observations kept per series for quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Per-request phase timestamps and analysis time, filled in by the route wrapper and service timers
+_request_phases: ContextVar[Optional[dict]] = ContextVar("request_phases", default=None)
+# Timed calls in progress on this context; only the outermost adds to the request's analysis time
+_timed_depth: ContextVar[int] = ContextVar("timed_depth", default=0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: str):
+        yield f"{name}{labels} {self.value:g}"
+
+
+class Summary:
+    """
+    Count, sum and p50/p95/p99 over a bounded reservoir of the most recent observations.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE):
+        self.count = 0
+        self.sum = 0.0
+        self._recent = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            recent = sorted(self._recent)
+        if not recent:
+            return {q: float("nan") for q in QUANTILES}
+        return {q: recent[min(int(q * len(recent)), len(recent) - 1)] for q in QUANTILES}
+
+    def samples(self, name: str, labels: str):
+        inner = labels[1:-1] + "," if labels else ""
+        for q, value in self.quantiles().items():
+            yield f'{name}{{{inner}quantile="{q}"}} {value:g}'
+        yield f"{name}_sum{labels} {self.sum:g}"
+        yield f"{name}_count{labels} {self.count:g}"
+
+
+class Registry:
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, type]] = {}
+        self._series: Dict[Tuple[str, Tuple], object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, kind: type, help_text: str) -> None:
+        self._families[name] = ("counter" if kind is Counter else "summary", help_text, kind)
+
+    def get(self, name: str, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._families[name][2]())
+        return series
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        with self._lock:
+            series = list(self._series.items())
+        for name, (kind, help_text, _) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (series_name, labels), metric in series:
+                if series_name != name:
+                    continue
+                rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.extend(metric.samples(name, f"{{{rendered}}}" if rendered else ""))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REGISTRY.register("http_requests_total", Counter, "HTTP requests by route, method and status.")
+REGISTRY.register("http_request_seconds", Summary, "End-to-end request latency.")
+REGISTRY.register("http_request_phase_seconds", Summary, "Time per request phase: validation, analysis, serialization.")
+REGISTRY.register("service_seconds", Summary, "Time spent inside each analysis service function.")
+REGISTRY.register("payload_items", Summary, "Number of records per request body list.")
+
+
+def timed(service: str) -> Callable:
+    """
+    Decorator recording a service function's duration and adding it to the current request's analysis time.
+    A timed call inside another is recorded under its own service but not added again.
+    In a profiled request (app.profiling) the call also gets a profile of its own.
+    """
+    def decorator(fn):
+        def measured(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return fn(*args, **kwargs)
+            depth = _timed_depth.set(_timed_depth.get() + 1)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                _timed_depth.reset(depth)
+                REGISTRY.get("service_seconds", service=service).observe(elapsed)
+                phases = _request_phases.get()
+                if phases is not None and not _timed_depth.get():
+                    phases["analysis"] = phases.get("analysis", 0.0) + elapsed
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = profiling.current()
+            if session is None:
+                return measured(*args, **kwargs)
+            return session.call(service, measured, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that stamps when the endpoint body starts and returns, splitting request time into
+    validation (before), handler and serialization (after). Also records list payload sizes.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        route_path = path
+
+        @functools.wraps(endpoint)
+        async def instrumented(*args, **kw):
+            phases = _request_phases.get()
+            session = profiling.current()
+            if phases is None and session is None:
+                result = endpoint(*args, **kw)
+                return self.render_result(await result if inspect.isawaitable(result) else result)
+            if session is not None:
+                session.enter("handler")
+            if phases is not None:
+                phases["handler_start"] = time.perf_counter()
+                for field, value in kw.items():
+                    if isinstance(value, list):
+                        REGISTRY.get("payload_items", route=route_path, field=field).observe(len(value))
+            try:
+                result = endpoint(*args, **kw)
+                result = await result if inspect.isawaitable(result) else result
+            finally:
+                if phases is not None:
+                    phases["handler_end"] = time.perf_counter()
+                if session is not None:
+                    session.enter("serialization")
+            return self.render_result(result)
+
+        super().__init__(path, instrumented, **kwargs)
+
+    def render_result(self, result):
+        """
+        Hook for subclasses to turn the endpoint's return value into a Response. Runs after the handler
+        timestamp, so its cost is counted as serialization.
+        """
+        return result
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request counts, latency and per-phase time for every HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        phases = {}
+        token = _request_phases.set(phases)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_phases.reset(token)
+            finished = time.perf_counter()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REGISTRY.get("http_requests_total", route=path, method=method, status=str(status["code"])).inc()
+            REGISTRY.get("http_request_seconds", route=path, method=method).observe(finished - started)
+            if "handler_start" in phases:
+                handler_end = phases.get("handler_end", finished)
+                analysis = phases.get("analysis", 0.0)
+                for phase, seconds in (
+                    ("validation", phases["handler_start"] - started),
+                    ("analysis", analysis),
+                    ("handler_other", max(handler_end - phases["handler_start"] - analysis, 0.0)),
+                    ("serialization", finished - handler_end),
+                ):
+                    REGISTRY.get("http_request_phase_seconds", route=path, phase=phase).observe(seconds)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+from app.models.temporal import timestamp
 
 class SubBudget(BaseModel):
     id: Optional[int] = None
@@ -10,6 +11,8 @@ class SubBudget(BaseModel):
     created_at: Optional[str] = None
     budget_id: Optional[int] = None
 
+    date_dt = timestamp("date")
+
 class Budget(BaseModel):
     id: Optional[int] = None
     title: str
@@ -23,6 +26,9 @@ class Budget(BaseModel):
     user_id: Optional[int] = None
     subEvents: List[SubBudget] = []
 
+    start_dt = timestamp("start_date")
+    end_dt = timestamp("end_date", required=False)
+
 class BudgetSuggestion(BaseModel):
     title: str
     description: str
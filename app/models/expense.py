@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from app.models.temporal import timestamp
 
 class Expense(BaseModel):
     id: int
@@ -11,6 +12,8 @@ class Expense(BaseModel):
     updated_at: str
     user_id: int
 
+    date_dt = timestamp("date")
+
     class Config:
         schema_extra = {
             "example": {
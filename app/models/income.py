@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Optional
+from app.models.temporal import timestamp
 
 class Income(BaseModel):
     amount: float
@@ -9,6 +10,8 @@ class Income(BaseModel):
     user_id: int
     notes: str | None = None
 
+    date_dt = timestamp("date")
+
 class IncomeSuggestionResponse(BaseModel):
     suggestion: str
     
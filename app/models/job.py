@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # queued, running, completed, failed or cancelled
+    as_of: str  # every chunk is evaluated at this instant
+    items: int
+    chunks: int
+    chunks_done: int
+    progress: float  # share of chunks done
+    results: int  # result items stored so far
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
+from app.models.temporal import timestamp
 
 # Enums
 class PaymentFrequency(str, Enum):
@@ -29,6 +30,8 @@ class LoanPayment(BaseModel):
     created_at: Optional[str] = None
     loan_id: Optional[int] = None
 
+    payment_dt = timestamp("payment_date")
+
 class Loan(BaseModel):
     id: int
     loan_type: str
@@ -51,6 +54,29 @@ class Loan(BaseModel):
     user_id: Optional[int] = None
     payments: Optional[List[LoanPayment]] = None
 
+    start_dt = timestamp("start_date")
+    end_dt = timestamp("end_date", required=False)
+    next_payment_dt = timestamp("next_payment_date", required=False)
+
+class PaymentScenario(BaseModel):
+    extra_percent: float
+    payment: float
+    periods: int
+    periods_saved: int
+    total_interest: float
+    interest_saved: float
+    efficiency: float  # interest saved per extra BDT paid each period
+
+class LoanScenarioRanking(BaseModel):
+    loan_id: int
+    lender_name: str
+    payment_frequency: PaymentFrequency
+    remaining_principal: float
+    baseline_payment: float
+    baseline_periods: int
+    baseline_interest: float
+    scenarios: List[PaymentScenario]
+
 class LoanSuggestion(BaseModel):
     loan_id: int
     lender_name: str
@@ -72,4 +98,35 @@ class LoanSuggestion(BaseModel):
                     {"text": "Pay off early", "type": "early"}
                 ]
             }
-        }
\ No newline at end of file
+        }
+class LoanPayoff(BaseModel):
+    loan_id: int
+    lender_name: str
+    payoff_month: int  # months from now, 1 being the first payment month
+    payoff_date: str  # YYYY-MM-DD
+    interest_paid: float
+
+class AllocationSegment(BaseModel):
+    # The same monthly payments from start_month through end_month; loan_ids and amounts are parallel
+    start_month: int
+    end_month: int
+    start_date: str
+    loan_ids: List[int]
+    amounts: List[float]
+
+class RepaymentStrategy(BaseModel):
+    strategy: str  # "avalanche", "snowball" or "optimal"
+    months: int
+    payoff_date: str
+    total_interest: float
+    total_paid: float
+    interest_saved: float  # against paying only the minimums
+    loans: List[LoanPayoff]
+    schedule: Optional[List[AllocationSegment]] = None
+
+class PortfolioPlan(BaseModel):
+    monthly_budget: float
+    minimum_payment: float  # sum of the loans' monthly minimums
+    minimum_only_interest: float
+    best_strategy: Optional[str] = None
+    strategies: List[RepaymentStrategy]
@@ -0,0 +1,249 @@
+"""
+Compact struct-of-arrays records for the analysis hot paths.
+
+A validated model keeps every field of the wire format (ids, the record's own created_at/updated_at, notes),
+about 1.2 kB per expense, while the analyses read three or four of them. Records keep just those, one array per
+field: amounts as float64, labels (categories, sources, titles) as int32 codes into the list of distinct labels in
+order of first appearance, and timestamps as int64 microseconds since 1970-01-01 (view them as datetime64[us]).
+
+Records are built from validated models (`from_models`), from uploaded columns (`from_columns`), or straight from
+a JSON body (`validate_json`), which validates CHUNK_BYTES of it at a time so the whole list of models never
+exists at once. An endpoint asks for records with a `Compact` body annotation, e.g. `CompactExpenses`.
+"""
+import json
+from operator import attrgetter
+from typing import Annotated, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import InitErrorDetails, PydanticCustomError, core_schema
+from app.models.expense import Expense
+from app.models.income import Income
+from app.models.temporal import column, parse_column, parse_timestamp
+
+# Label columns at least this long are encoded with pandas rather than a dict
+FACTORIZE_MIN = 1000
+# Body bytes validated at once by validate_json, and the cuts tried per chunk before taking the rest whole
+CHUNK_BYTES = 1 << 18
+CUT_ATTEMPTS = 4
+
+class Labels:
+    """
+    Interned labels: the distinct strings seen so far, in order of first appearance, numbered from 0.
+    """
+    __slots__ = ("index",)
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def encode(self, values: Sequence[str]) -> np.ndarray:
+        index = self.index
+        if len(values) < FACTORIZE_MIN:
+            return np.array([index.setdefault(value, len(index)) for value in values], dtype=np.int32)
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=False)
+        lookup = np.array([index.setdefault(value, len(index)) for value in uniques.tolist()], dtype=np.int32)
+        return lookup[codes]
+
+    def values(self) -> List[str]:
+        return list(self.index)
+
+
+def _validate_chunks(adapter: TypeAdapter, body: bytes) -> Iterator[list]:
+    """
+    Validate a JSON array of objects about CHUNK_BYTES of it at a time. Each chunk is cut after a "}," and
+    closed into an array of its own; a cut inside a string or a nested object leaves the chunk malformed, and
+    is moved on to the next "},". Raises ValidationError (locations relative to the chunk) for an invalid body.
+    """
+    start, opening = 0, b""
+    while True:
+        models, cut = None, body.find(b"},", start + CHUNK_BYTES)
+        for _ in range(CUT_ATTEMPTS):
+            if cut < 0:
+                break
+            try:
+                models = adapter.validate_json(opening + body[start:cut + 1] + b"]")
+                break
+            except ValidationError as e:
+                if e.errors(include_url=False)[0]["type"] != "json_invalid":
+                    raise
+                cut = body.find(b"},", cut + 2)
+        if models is None:
+            # The rest of the body as one chunk
+            yield adapter.validate_json(opening + body[start:])
+            return
+        yield models
+        start, opening = cut + 2, b"["
+
+
+class Records:
+    """
+    Records of one model: its FLOATS fields as float64 arrays, its LABELS fields as int32 codes (the labels
+    themselves in the attribute LABELS names) and its STAMPS fields as int64 microseconds.
+    """
+    __slots__ = ()
+    MODEL: Type[BaseModel]
+    FLOATS: Tuple[str, ...] = ()
+    LABELS: Dict[str, str] = {}
+    STAMPS: Tuple[str, ...] = ()
+    _adapter: TypeAdapter
+
+    def __len__(self) -> int:
+        return len(getattr(self, self.FLOATS[0]))
+
+    @classmethod
+    def _build(cls, parts: Iterable[Sequence[BaseModel]]) -> "Records":
+        labels = {field: Labels() for field in cls.LABELS}
+        columns = {field: [np.empty(0, np.float64)] for field in cls.FLOATS}
+        columns.update({field: [np.empty(0, np.int32)] for field in cls.LABELS})
+        columns.update({field: [np.empty(0, np.int64)] for field in cls.STAMPS})
+        for models in parts:
+            for field in cls.FLOATS:
+                columns[field].append(np.fromiter(map(attrgetter(field), models), np.float64, len(models)))
+            for field, interned in labels.items():
+                columns[field].append(interned.encode(list(map(attrgetter(field), models))))
+            for field in cls.STAMPS:
+                columns[field].append(column(models, field).view(np.int64))
+        records = cls.__new__(cls)
+        for field, arrays in columns.items():
+            setattr(records, field, np.concatenate(arrays))
+        for field, interned in labels.items():
+            setattr(records, cls.LABELS[field], interned.values())
+        return records
+
+    @classmethod
+    def from_models(cls, models: Sequence[BaseModel]) -> "Records":
+        return cls._build([models])
+
+    @classmethod
+    def of(cls, records: Union["Records", Sequence[BaseModel]]) -> "Records":
+        """
+        `records` as is, or the records of a list of models.
+        """
+        return records if isinstance(records, cls) else cls.from_models(records)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "Records":
+        """
+        Records of a table read column by column (see app.services.columnar).
+        """
+        records = cls.__new__(cls)
+        for field in cls.FLOATS:
+            setattr(records, field, np.asarray(columns[field], dtype=np.float64))
+        for field, attribute in cls.LABELS.items():
+            interned = Labels()
+            setattr(records, field, interned.encode(columns[field]))
+            setattr(records, attribute, interned.values())
+        for field in cls.STAMPS:
+            setattr(records, field, parse_column(columns[field].tolist()).view(np.int64))
+        return records
+
+    @classmethod
+    def validate_json(cls, body: bytes) -> "Records":
+        """
+        Validate a JSON array of MODEL a chunk of models at a time. Raises ValidationError for an invalid body,
+        with locations relative to the chunk.
+        """
+        if "_adapter" not in cls.__dict__:
+            cls._adapter = TypeAdapter(List[cls.MODEL])
+        return cls._build(_validate_chunks(cls._adapter, body))
+
+    def fingerprint(self, digest) -> None:
+        """
+        Feed every field into a hashlib digest; equal records feed equal bytes.
+        """
+        for name in (*self.FLOATS, *self.LABELS, *self.STAMPS):
+            digest.update(getattr(self, name).tobytes())
+        for name in self.LABELS.values():
+            digest.update(json.dumps(getattr(self, name)).encode())
+
+
+class ExpenseRow(NamedTuple):
+    title: str
+    amount: float
+    category: str
+
+
+class ExpenseRecords(Records):
+    __slots__ = ("amount", "category", "categories", "title", "titles", "date")
+    MODEL = Expense
+    FLOATS = ("amount",)
+    LABELS = {"category": "categories", "title": "titles"}
+    STAMPS = ("date",)
+
+    def row(self, index: int) -> ExpenseRow:
+        return ExpenseRow(self.titles[self.title[index]], float(self.amount[index]),
+                          self.categories[self.category[index]])
+
+
+class IncomeRecords(Records):
+    __slots__ = ("amount", "source", "sources", "category", "categories", "date")
+    MODEL = Income
+    FLOATS = ("amount",)
+    LABELS = {"source": "sources", "category": "categories"}
+    STAMPS = ("date",)
+
+
+class EntryRecords:
+    """
+    Entries nested in a list of parents (goal entries, loan payments) as parallel arrays: the row of the
+    owning parent, one amount field as float64 and one date field as int64 microseconds.
+    """
+    __slots__ = ("owner", "amount", "date")
+
+    def __init__(self, parents: Sequence[BaseModel], nested: str, amount: str, date: str):
+        owner, entries = [], []
+        for row, parent in enumerate(parents):
+            children = getattr(parent, nested)
+            if children:
+                owner.extend([row] * len(children))
+                entries.extend(children)
+        self.owner = np.array(owner, dtype=np.int64)
+        self.amount = np.fromiter(map(attrgetter(amount), entries), np.float64, len(entries))
+        self.date = column(entries, date).view(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.owner)
+
+
+class Compact:
+    """
+    Body annotation metadata, `Annotated[List[Model], Compact(Records)]`: the body is documented and validated
+    as the list of models, and the endpoint receives their records. app.fast_io validates large bodies with
+    Records.validate_json; this validator passes those through.
+    """
+
+    def __init__(self, records: Type[Records]):
+        self.records = records
+
+    def __get_pydantic_core_schema__(self, source, handler) -> core_schema.CoreSchema:
+        return core_schema.no_info_wrap_validator_function(self._validate, handler(source))
+
+    def _validate(self, value, handler) -> Records:
+        if isinstance(value, self.records):
+            return value
+        models = handler(value)
+        try:
+            return self.records.from_models(models)
+        except ValueError as e:
+            raise _date_error(models, self.records.STAMPS) or e
+
+
+def _date_error(models: Sequence[BaseModel], fields: Sequence[str]) -> Optional[ValidationError]:
+    """
+    A validation error at the first of `fields` in `models` that is not a valid timestamp, if any.
+    """
+    for row, model in enumerate(models):
+        for field in fields:
+            value = getattr(model, field)
+            try:
+                parse_timestamp(value)
+            except ValueError as e:
+                return ValidationError.from_exception_data(type(model).__name__, [InitErrorDetails(
+                    type=PydanticCustomError("value_error", "Value error, {error}", {"error": str(e)}),
+                    loc=(row, field), input=value,
+                )])
+    return None
+
+
+CompactExpenses = Annotated[List[Expense], Compact(ExpenseRecords)]
+CompactIncomes = Annotated[List[Income], Compact(IncomeRecords)]
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
+from app.models.expense import Expense
+from app.models.temporal import timestamp
 
 class GoalEntry(BaseModel):
     id: int
@@ -10,6 +12,8 @@ class GoalEntry(BaseModel):
     updated_at: str
     goal_id: int
 
+    entry_dt = timestamp("entry_date")
+
 class SavingsGoal(BaseModel):
     id: int
     title: str
@@ -18,4 +22,43 @@ class SavingsGoal(BaseModel):
     start_date: str
     end_date: str | None = None  # Allow null end_date
     status: str
-    goal_entries: List[GoalEntry]
\ No newline at end of file
+    goal_entries: List[GoalEntry]
+
+    start_dt = timestamp("start_date")
+    end_dt = timestamp("end_date", required=False)
+
+
+class SavingsSuggestionRequest(BaseModel):
+    """
+    Goals with the expenses whose clustering drives the expense cut suggestions.
+    """
+    goals: List[SavingsGoal]
+    expenses: List[Expense] = []
+
+
+class GoalProjection(BaseModel):
+    goal_id: int
+    title: str
+    remaining: float
+    days_left: Optional[int] = None
+    required_monthly: Optional[float] = None  # contribution per month that reaches the target by the end date
+    trend_monthly: Optional[float] = None  # fitted from the goal's entries
+    projected_completion: Optional[str] = None  # YYYY-MM-DD at the trend rate
+    shortfall: Optional[float] = None  # missing at the end date at the trend rate
+    on_track: Optional[bool] = None
+
+
+class CompletionPercentile(BaseModel):
+    percentile: float
+    date: Optional[str] = None  # YYYY-MM-DD by which this share of simulated paths reach the target; None if later than the horizon
+
+
+class GoalSimulation(BaseModel):
+    goal_id: int
+    title: str
+    remaining: float
+    paths: int  # 0 when the goal has no entries to estimate contributions from
+    monthly_mean: Optional[float] = None  # estimated from the goal's entries
+    monthly_std: Optional[float] = None
+    probability: Optional[float] = None  # share of paths reaching the target by the end date
+    completion: List[CompletionPercentile] = []
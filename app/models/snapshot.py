@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from app.models.income import Income, IncomeSuggestions
+from app.models.expense import Expense, ExpenseSuggestions
+from app.models.loan import Loan, LoanSuggestion
+from app.models.savings import SavingsGoal
+from app.models.budget import Budget, BudgetSuggestion
+
+class UserSnapshot(BaseModel):
+    user_id: Optional[int] = None  # when set, every record that carries a user_id must match it
+    incomes: List[Income] = []
+    expenses: List[Expense] = []
+    loans: List[Loan] = []
+    goals: List[SavingsGoal] = []
+    budgets: List[Budget] = []
+
+class SavingsSuggestions(BaseModel):
+    suggestions: List[str]
+
+class CrossDomainAdvice(BaseModel):
+    title: str
+    description: str
+    priority: str
+    domains: List[str]  # the domains whose data the advice is drawn from
+
+class AllSuggestions(BaseModel):
+    # Each domain holds what its own endpoint returns, or None when the snapshot has no records for it
+    income: Optional[IncomeSuggestions] = None
+    expense: Optional[ExpenseSuggestions] = None
+    loan: Optional[List[LoanSuggestion]] = None
+    savings: Optional[SavingsSuggestions] = None
+    budget: Optional[List[BudgetSuggestion]] = None
+    cross_domain: List[CrossDomainAdvice] = []
+    errors: Dict[str, str] = {}  # domain -> error detail, for domains that could not be analysed
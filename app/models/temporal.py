@@ -0,0 +1,106 @@
+"""
+Shared timestamp parsing for the request models.
+
+Date fields stay plain strings on the wire. Scalar code reads each model's `*_dt` property, parsed on first
+access and kept on the instance; array code asks `column()` for a datetime64[us] array, which reuses those
+parsed values or parses the whole column in one NumPy call. Both give naive datetimes with offsets converted
+to UTC, and accept every format clients send today: "2025-06-20", "2025-06-20 08:15:00",
+"2025-01-15T14:00:00Z", "2025-01-15T14:00:00.000Z" and explicit offsets.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# The "no end date" placeholder some clients store: midnight UTC on 1970-01-01 rendered at +06:00
+EPOCH_PLACEHOLDER_DATE = datetime(1970, 1, 1).date()
+
+_UNSET = object()
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 date or datetime into a naive datetime.
+    """
+    if value[-1:] == "Z":
+        # The common case; dropping the designator is the UTC conversion, and avoids building an aware datetime
+        return datetime.fromisoformat(value[:-1])
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def parsed_key(field: str) -> str:
+    return f"_parsed_{field}"
+
+
+def timestamp(field: str, required: bool = True) -> property:
+    """
+    Read-only property holding the parsed value of a string date field, computed on first access and kept in
+    the instance __dict__ (pydantic ignores non-field keys there).
+    Malformed required fields raise ValueError on access; optional fields that are missing or malformed read as None.
+    """
+    key = parsed_key(field)
+
+    def parsed(self) -> Optional[datetime]:
+        cache = self.__dict__
+        result = cache.get(key, _UNSET)
+        if result is not _UNSET:
+            return result
+        value = cache[field]
+        if required:
+            result = parse_timestamp(value)
+        else:
+            try:
+                result = parse_timestamp(value) if value else None
+            except ValueError:
+                result = None
+        cache[key] = result
+        return result
+
+    parsed.__doc__ = f"`{field}` parsed once (see app.models.temporal)."
+    return property(parsed)
+
+
+def datetime64(values: List[datetime]) -> np.ndarray:
+    """
+    datetime64[us] array from parsed timestamps; much faster than np.array on datetime objects.
+    """
+    return pd.DatetimeIndex(values).as_unit("us").to_numpy() if values else np.array([], dtype="datetime64[us]")
+
+
+def parse_column(values: List[str]) -> np.ndarray:
+    """
+    Parse ISO 8601 strings into a datetime64[us] array in one NumPy call.
+    Falls back to parse_timestamp per value for anything NumPy refuses (explicit offsets, malformed values).
+    """
+    if not values:
+        return np.array([], dtype="datetime64[us]")
+    cleaned = [v[:-1] if v[-1:] == "Z" else v for v in values]
+    # NumPy only warns on offsets (and warnings filters are process-wide), so rule them out up front:
+    # without offsets every value has no "+" and exactly the two dashes of its date
+    joined = "".join(cleaned)
+    if "+" not in joined and joined.count("-") == 2 * len(cleaned):
+        try:
+            return np.array(cleaned, dtype="datetime64[us]")
+        except ValueError:
+            pass
+    return datetime64([parse_timestamp(value) for value in values])
+
+
+def column(records: Sequence, field: str) -> np.ndarray:
+    """
+    datetime64[us] array of a required date field across records. Reuses the values already parsed by the
+    `*_dt` property when earlier code has read them, otherwise parses the raw strings as one column.
+    """
+    if not records:
+        return np.array([], dtype="datetime64[us]")
+    key = parsed_key(field)
+    if key in records[0].__dict__:
+        return datetime64([r.__dict__.get(key) or parse_timestamp(r.__dict__[field]) for r in records])
+    return parse_column([r.__dict__[field] for r in records])
+
+
+def is_epoch_placeholder(moment: Optional[datetime]) -> bool:
+    return moment is not None and moment.date() == EPOCH_PLACEHOLDER_DATE
@@ -0,0 +1,303 @@
+"""
+On-demand per-request profiling.
+
+A request is profiled when it carries the X-Profile-Token header matching PROFILE_TOKEN, or when it is picked
+by PROFILE_SAMPLE_RATE. A profiled request gets one cProfile per part of its work:
+- the phases on the event loop thread: validation (up to the endpoint), handler (the endpoint, including the
+  time it awaits services) and serialization (after it);
+- every @timed service function, wherever it runs (executor threads get the request context).
+
+Finished profiles are kept in a ring buffer of the latest PROFILE_BUFFER_SIZE and served by the /profiles
+endpoints as pstats dumps or collapsed stacks; the response carries X-Profile-Id. Loop-thread phases also
+record whatever other requests run on the loop meanwhile, and only one request at a time profiles them (the
+others keep phase timings and service profiles). Services on a process executor are not profiled.
+
+With no token sent and sampling off, the cost is a context variable read per service call.
+"""
+import cProfile
+import hmac
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+PROFILE_HEADER = "x-profile-token"
+PHASES = ("validation", "handler", "serialization")
+# Collapsed stacks are rebuilt from caller/callee edges; stop at this depth and below this many microseconds
+COLLAPSED_MAX_DEPTH = 64
+COLLAPSED_MIN_US = 1.0
+
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+_threads = threading.local()
+
+
+def current() -> Optional["ProfileSession"]:
+    return _session.get()
+
+
+def authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def _stack() -> List[cProfile.Profile]:
+    stack = getattr(_threads, "stack", None)
+    if stack is None:
+        stack = _threads.stack = []
+    return stack
+
+
+def _push(profile: cProfile.Profile) -> bool:
+    """
+    Make `profile` the thread's active profiler, pausing the one below it. False if it could not start
+    (Python 3.12+ allows one profiler per interpreter).
+    """
+    stack = _stack()
+    if stack:
+        stack[-1].disable()
+    try:
+        profile.enable()
+    except ValueError:
+        if stack:
+            stack[-1].enable()
+        return False
+    stack.append(profile)
+    return True
+
+
+def _pop(profile: cProfile.Profile) -> None:
+    stack = _stack()
+    profile.disable()
+    stack.remove(profile)
+    if stack:
+        stack[-1].enable()
+
+
+def _stats(profile: Optional[cProfile.Profile]) -> Optional[pstats.Stats]:
+    if profile is None:
+        return None
+    profile.create_stats()
+    return pstats.Stats(profile) if profile.stats else None
+
+
+def _label(func: tuple) -> str:
+    filename, line, name = func
+    where = "" if filename == "~" else f" ({os.path.basename(filename)}:{line})"
+    return f"{name}{where}".replace(";", ",")
+
+
+def collapsed_lines(prefix: str, stats: pstats.Stats, out: Dict[str, float]) -> None:
+    """
+    Add one profile's time to `out` as collapsed stacks (frame;frame;... -> microseconds). cProfile keeps only
+    caller/callee edges, so each call's time is split among its callers in proportion to the edge times.
+    """
+    entries = stats.stats
+    children = defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+
+    def walk(func: tuple, seconds: float, path: tuple, labels: str) -> None:
+        total = entries[func][3]
+        scale = seconds / total if total > 0 else 0.0
+        below = 0.0
+        if len(path) < COLLAPSED_MAX_DEPTH:
+            for callee, edge in children.get(func, ()):
+                share = edge * scale
+                below += share
+                # A recursive edge (nested awaits look like one) is walked from the callee's outer call instead
+                if callee not in path and share * 1e6 >= COLLAPSED_MIN_US:
+                    walk(callee, share, path + (callee,), f"{labels};{_label(callee)}")
+        if seconds - below > 0:
+            out[labels] += (seconds - below) * 1e6
+
+    for func, entry in entries.items():
+        if not entry[4]:
+            walk(func, entry[3], (func,), f"{prefix};{_label(func)}")
+
+
+class ProfileSession:
+    """
+    Profiles and wall times of one request, by phase and by service function.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now()
+        self.status: Optional[int] = None
+        self.seconds = 0.0
+        self.timings: Dict[str, List] = {}  # name -> [seconds, calls]
+        self.stats: Dict[str, pstats.Stats] = {}
+        self._lock = threading.Lock()
+        self._began = time.perf_counter()
+        self._phase = None  # (name, profile or None, started) on the loop thread
+
+    def enter(self, phase: str) -> None:
+        """
+        Switch the loop thread to the next phase.
+        """
+        self._end_phase()
+        profile = cProfile.Profile()
+        # Another profiled request owns the loop thread's profiler: keep timings only
+        if _stack() or not _push(profile):
+            profile = None
+        self._phase = (phase, profile, time.perf_counter())
+
+    def _end_phase(self) -> None:
+        if self._phase is None:
+            return
+        phase, profile, started = self._phase
+        self._phase = None
+        if profile is not None:
+            _pop(profile)
+        self._record(phase, profile, time.perf_counter() - started)
+
+    def call(self, service: str, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs) under a profile of its own, recorded under `service`.
+        """
+        profile = cProfile.Profile()
+        active = _push(profile)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            if active:
+                _pop(profile)
+            self._record(service, profile if active else None, elapsed)
+
+    def _record(self, name: str, profile: Optional[cProfile.Profile], seconds: float) -> None:
+        stats = _stats(profile)
+        with self._lock:
+            timing = self.timings.setdefault(name, [0.0, 0])
+            timing[0] += seconds
+            timing[1] += 1
+            if stats is not None:
+                if name in self.stats:
+                    self.stats[name].add(stats)
+                else:
+                    self.stats[name] = stats
+
+    def finish(self, status: int) -> None:
+        self._end_phase()
+        self.status = status
+        self.seconds = time.perf_counter() - self._began
+
+    def summary(self) -> dict:
+        def timing(name: str) -> dict:
+            seconds, calls = self.timings[name]
+            return {"seconds": round(seconds, 6), "calls": calls}
+
+        return {
+            "id": self.id, "method": self.method, "path": self.path, "status": self.status,
+            "started_at": self.started_at.isoformat(), "seconds": round(self.seconds, 6),
+            "phases": {name: timing(name) for name in PHASES if name in self.timings},
+            "services": {name: timing(name) for name in self.timings if name not in PHASES},
+        }
+
+    def _selected(self, part: Optional[str]) -> Dict[str, pstats.Stats]:
+        if part is None:
+            return dict(self.stats)
+        if part not in self.timings:
+            raise KeyError(f"Profile {self.id} has no part {part!r}")
+        return {part: self.stats[part]} if part in self.stats else {}
+
+    def pstats_dump(self, part: Optional[str] = None) -> bytes:
+        """
+        The profile (one phase or service, or all merged) in the format pstats.Stats loads from a file.
+        """
+        merged = pstats.Stats()
+        for stats in self._selected(part).values():
+            merged.add(stats)
+        return marshal.dumps(merged.stats)
+
+    def collapsed(self, part: Optional[str] = None) -> str:
+        """
+        Collapsed stacks (flamegraph.pl / speedscope input), each rooted at its phase or service name.
+        """
+        out = defaultdict(float)
+        for name, stats in self._selected(part).items():
+            collapsed_lines(name, stats, out)
+        return "".join(f"{stack} {round(us)}\n" for stack, us in out.items() if round(us) > 0)
+
+
+class ProfileStore:
+    """
+    Ring buffer of the most recent profiles.
+    """
+
+    def __init__(self, size: int = PROFILE_BUFFER_SIZE):
+        self._profiles: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._profiles.append(session)
+
+    def get(self, profile_id: str) -> ProfileSession:
+        with self._lock:
+            for session in self._profiles:
+                if session.id == profile_id:
+                    return session
+        raise KeyError(f"Profile {profile_id} not found")
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            sessions = list(self._profiles)
+        return [session.summary() for session in reversed(sessions)]
+
+
+store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests picked by token or sampling; everything else passes straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if scope["path"].startswith("/profiles"):
+            return False
+        if PROFILE_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode():
+                    return authorized(value.decode("latin-1"))
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"])
+        token = _session.set(session)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=[*message.get("headers", []), (b"x-profile-id", session.id.encode())])
+            await send(message)
+
+        session.enter("validation")
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.finish(status["code"])
+            _session.reset(token)
+            store.add(session)
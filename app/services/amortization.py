@@ -0,0 +1,168 @@
+import numpy as np
+from app.models.loan import Loan, LoanStatus, PaymentFrequency, PaymentScenario, LoanScenarioRanking
+from app.services.loan_batch import LoanBatch, PAYMENTS_PER_YEAR
+from typing import List, Optional
+from app.metrics import timed
+
+# Extra payment of +5% to +50% in 5% steps
+DEFAULT_EXTRA_PERCENTS = np.round(np.arange(0.05, 0.5001, 0.05), 2)
+
+
+def periodic_rate(annual_rate, payments_per_year):
+    """
+    Convert an annual percentage rate into the rate applied each payment period.
+    """
+    return np.asarray(annual_rate, dtype=np.float64) / 100 / np.asarray(payments_per_year, dtype=np.float64)
+
+
+def level_payment(principal, rate, periods):
+    """
+    Fixed payment per period that clears `principal` in `periods` payments at periodic `rate`.
+    """
+    principal, rate, periods = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(rate, dtype=np.float64), np.asarray(periods, dtype=np.float64)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortized = rate * principal / -np.expm1(-periods * np.log1p(rate))
+        return np.where(rate == 0, principal / periods, amortized)
+
+
+def balance_after(principal, rate, payment, periods):
+    """
+    Closed-form outstanding balance after `periods` payments of `payment`.
+    """
+    principal, rate, payment, periods = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(rate, dtype=np.float64),
+        np.asarray(payment, dtype=np.float64), np.asarray(periods, dtype=np.float64)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.exp(periods * np.log1p(rate))
+        amortized = principal * growth - payment * (growth - 1) / rate
+        return np.where(rate == 0, principal - payment * periods, amortized)
+
+
+def periods_to_payoff(principal, rate, payment):
+    """
+    Fractional number of periods needed to clear `principal`; inf when the payment never covers the interest.
+    """
+    principal, rate, payment = np.broadcast_arrays(
+        np.asarray(principal, dtype=np.float64), np.asarray(rate, dtype=np.float64), np.asarray(payment, dtype=np.float64)
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coverage = rate * principal / payment
+        amortized = -np.log1p(-coverage) / np.log1p(rate)
+        periods = np.where(rate == 0, principal / payment, amortized)
+        return np.where((payment <= 0) | (coverage >= 1), np.inf, np.maximum(periods, 0.0))
+
+
+def payoff_summary(principal, rate, payment):
+    """
+    Whole periods to payoff and total interest paid, accounting for a smaller final payment.
+    Returns (periods, total_interest) broadcast over the inputs.
+    """
+    fractional = periods_to_payoff(principal, rate, payment)
+    finite = np.isfinite(fractional)
+    # Round away float noise so an exact n-period payoff is not reported as n + 1
+    periods = np.where(finite, np.ceil(np.round(fractional, 9)), np.inf)
+    full_payments = np.where(finite, np.maximum(periods - 1, 0), 0)
+    remaining = balance_after(principal, rate, payment, full_payments)
+    final_payment = np.maximum(remaining, 0) * (1 + np.asarray(rate, dtype=np.float64))
+    total_paid = np.asarray(payment, dtype=np.float64) * full_payments + final_payment
+    total_interest = np.where(finite, total_paid - np.asarray(principal, dtype=np.float64), np.inf)
+    return periods, total_interest
+
+
+def amortization_schedule(principal: float, annual_rate: float, frequency: PaymentFrequency,
+                          periods: int, payment: Optional[float] = None) -> dict:
+    """
+    Period-by-period schedule for one loan. When `payment` is omitted the level payment over `periods` is used.
+    Returns parallel arrays keyed by period, payment, interest, principal and balance.
+    """
+    rate = float(periodic_rate(annual_rate, PAYMENTS_PER_YEAR[frequency]))
+    if payment is None:
+        payment = float(level_payment(principal, rate, periods))
+    total_periods, _ = payoff_summary(principal, rate, payment)
+    count = int(min(periods, total_periods)) if np.isfinite(total_periods) else periods
+    # Every period's opening balance in one closed-form evaluation
+    opening = balance_after(principal, rate, payment, np.arange(count))
+    interest = opening * rate
+    paid = np.minimum(payment, opening + interest)
+    return {
+        "period": np.arange(1, count + 1),
+        "payment": paid,
+        "interest": interest,
+        "principal": paid - interest,
+        "balance": np.maximum(opening + interest - paid, 0.0),
+    }
+
+
+def evaluate_extra_payment_scenarios(principal, rate, payment, extra_percents=DEFAULT_EXTRA_PERCENTS):
+    """
+    Evaluate every (loan, extra payment) pair in one array operation.
+    Inputs are per-loan vectors; outputs are (loans, scenarios) matrices of periods and total interest.
+    """
+    principal = np.asarray(principal, dtype=np.float64)[:, None]
+    rate = np.asarray(rate, dtype=np.float64)[:, None]
+    payment = np.asarray(payment, dtype=np.float64)[:, None] * (1 + np.asarray(extra_percents, dtype=np.float64))[None, :]
+    periods, total_interest = payoff_summary(principal, rate, payment)
+    return payment, periods, total_interest
+
+
+@timed("rank_payment_scenarios")
+def rank_payment_scenarios(loans: List[Loan], extra_percents=DEFAULT_EXTRA_PERCENTS,
+                           top: int = 3, rank_by: str = "interest_saved") -> List[LoanScenarioRanking]:
+    """
+    Rank extra-payment scenarios per active loan against the level-payment baseline.
+    rank_by is "interest_saved" (absolute) or "efficiency" (interest saved per extra BDT per period).
+    """
+    if rank_by not in ("interest_saved", "efficiency"):
+        raise ValueError(f"Unknown ranking: {rank_by}")
+
+    active = [loan for loan in loans if loan.status == LoanStatus.ACTIVE and loan.remaining_payments > 0]
+    if not active:
+        return []
+
+    batch = LoanBatch(active)
+    principal = batch.remaining_principal()
+    rate = periodic_rate(batch.interest_rate, batch.payments_per_year)
+    baseline_payment = level_payment(principal, rate, batch.remaining_payments)
+    baseline_periods, baseline_interest = payoff_summary(principal, rate, baseline_payment)
+
+    payment, periods, total_interest = evaluate_extra_payment_scenarios(principal, rate, baseline_payment, extra_percents)
+    interest_saved = baseline_interest[:, None] - total_interest
+    periods_saved = baseline_periods[:, None] - periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        efficiency = interest_saved / (payment - baseline_payment[:, None])
+    score = interest_saved if rank_by == "interest_saved" else efficiency
+    # Rank every loan's scenarios at once; ties favour the smaller extra payment
+    order = np.argsort(-score, axis=1, kind="stable")[:, :top]
+
+    rankings = []
+    for i, loan in enumerate(active):
+        if principal[i] <= 0:
+            continue
+        scenarios = [
+            PaymentScenario(
+                extra_percent=round(float(extra_percents[j]) * 100, 2),
+                payment=round(float(payment[i, j]), 2),
+                periods=int(periods[i, j]),
+                periods_saved=int(periods_saved[i, j]),
+                total_interest=round(float(total_interest[i, j]), 2),
+                interest_saved=round(float(interest_saved[i, j]), 2),
+                efficiency=round(float(efficiency[i, j]), 4),
+            )
+            for j in order[i].tolist()
+        ]
+        rankings.append(
+            LoanScenarioRanking(
+                loan_id=loan.id,
+                lender_name=loan.lender_name,
+                payment_frequency=loan.payment_frequency,
+                remaining_principal=round(float(principal[i]), 2),
+                baseline_payment=round(float(baseline_payment[i]), 2),
+                baseline_periods=int(baseline_periods[i]),
+                baseline_interest=round(float(baseline_interest[i]), 2),
+                scenarios=scenarios,
+            )
+        )
+    return rankings
@@ -1,36 +1,35 @@
-from typing import List
+from typing import Dict, List, Optional
 from app.models.budget import Budget, BudgetSuggestion
+from app.metrics import timed
+from app.services.budget_rules import BudgetFrame, engine
 
 class BudgetService:
     @staticmethod
     def analyze_budgeting_behavior(budgets: List[Budget]) -> List[BudgetSuggestion]:
-        suggestions = []
-        annual_end_date_issue = any(b.end_date == "1970-01-01 06:00:00" for b in budgets if b.type == "Annually")
-        if annual_end_date_issue:
-            suggestions.append(BudgetSuggestion(
-                title="Adjust Annual Budget End Dates",
-                description="Set realistic end dates for annual budgets to better track progress.",
-                priority="High"
-            ))
+        """
+        Every budget rule (app.services.budget_rules) over the request's budgets, highest priority first.
+        """
+        if not budgets:
+            return []
+        return BudgetService.suggestions_from_frame(BudgetFrame(budgets))
 
-        savings_utilization = [b for b in budgets if "Savings" in b.title and b.remaining > b.total_amount * 0.5]
-        if savings_utilization:
-            suggestions.append(BudgetSuggestion(
-                title="Increase Monthly Savings",
-                description="Boost monthly savings contributions to meet targets like the emergency fund more effectively.",
-                priority="Medium"
-            ))
-
-        recurring_expenses = [b for b in budgets if b.type == "Monthly" and b.remaining / b.total_amount < 0.5]
-        if recurring_expenses:
-            suggestions.append(BudgetSuggestion(
-                title="Create Monthly Expense Reserve",
-                description="Establish a reserve for recurring expenses to avoid overspending.",
-                priority="Medium"
-            ))
-
-        return suggestions[:3]  # Limit to 3 suggestions
+    @staticmethod
+    def suggestions_from_frame(frame: BudgetFrame) -> List[BudgetSuggestion]:
+        """
+        Suggestions for a frame of one user's budgets (built for this request or shared with other analyses).
+        """
+        return engine.evaluate(frame)[0] if frame.keys else []
 
     @staticmethod
+    @timed("BudgetService.get_budget_suggestions")
     def get_budget_suggestions(budgets: List[Budget]) -> List[BudgetSuggestion]:
-        return BudgetService.analyze_budgeting_behavior(budgets)
\ No newline at end of file
+        return BudgetService.analyze_budgeting_behavior(budgets)
+
+    @staticmethod
+    @timed("BudgetService.get_budget_suggestions_by_user")
+    def get_budget_suggestions_by_user(budgets: List[Budget]) -> Dict[Optional[int], List[BudgetSuggestion]]:
+        """
+        Suggestions for many users' budgets in one pass per rule, keyed by user_id.
+        """
+        frame = BudgetFrame(budgets, by_user=True)
+        return dict(zip(frame.keys, engine.evaluate(frame)))
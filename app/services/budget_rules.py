@@ -0,0 +1,372 @@
+"""
+Declarative budget rules evaluated over a columnar view of all budgets and their sub-budgets.
+
+A rule is data: clauses over named columns (ANDed), an aggregation over the matching budgets with the threshold
+that fires it, a priority and a suggestion template. Rules are compiled once: attribute columns are read in one
+pass, each later clause only tests the rows the earlier ones kept, and suggestions are built for fired groups
+alone. A single request's handful of budgets (up to SMALL_FRAME) runs the same clauses as plain Python, where
+NumPy's fixed cost per call would dominate. A new heuristic is a new BUDGET_RULES entry rather than another loop.
+"""
+import functools
+import math
+import operator
+import time
+from itertools import compress, repeat
+from string import Formatter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from pydantic import TypeAdapter
+from app import metrics
+from app.metrics import REGISTRY, Counter, Summary
+from app.models.budget import Budget, BudgetSuggestion
+from app.models.temporal import is_epoch_placeholder
+
+REGISTRY.register("budget_rule_seconds", Summary, "Time to evaluate each budget rule over a batch.")
+REGISTRY.register("budget_rule_fired_total", Counter, "Suggestions produced by each budget rule.")
+
+PRIORITY_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+TEMPLATE_FIELDS = ("count", "share", "total", "titles")
+# Largest single-group frame evaluated in plain Python rather than with NumPy (measured crossover)
+SMALL_FRAME = 256
+
+_suggestions = TypeAdapter(List[BudgetSuggestion])
+
+
+class Col(NamedTuple):
+    """
+    Another column as a clause operand, optionally scaled: Col("total_amount", 0.5).
+    """
+    name: str
+    times: float = 1.0
+
+
+class Clause(NamedTuple):
+    column: str
+    op: str  # eq, ne, lt, le, gt, ge, contains, in
+    value: Any  # a literal or a Col
+
+
+class Rule(NamedTuple):
+    name: str
+    title: str
+    template: str  # formatted with count, share, total and titles of the matching budgets
+    priority: str
+    where: Tuple[Clause, ...]
+    aggregate: str = "count"  # count, share (of the user's budgets) or sum (of `measure`)
+    at_least: float = 1  # the rule fires when the aggregate reaches this
+    measure: Optional[str] = None
+
+
+BUDGET_RULES: List[Rule] = [
+    Rule(
+        name="annual_end_date_placeholder",
+        title="Adjust Annual Budget End Dates",
+        template="Set realistic end dates for annual budgets to better track progress.",
+        priority="High",
+        where=(Clause("type", "eq", "Annually"), Clause("end_is_placeholder", "eq", True)),
+    ),
+    Rule(
+        name="underused_savings",
+        title="Increase Monthly Savings",
+        template="Boost monthly savings contributions to meet targets like the emergency fund more effectively.",
+        priority="Medium",
+        where=(Clause("title", "contains", "Savings"), Clause("remaining", "gt", Col("total_amount", 0.5))),
+    ),
+    Rule(
+        name="monthly_reserve",
+        title="Create Monthly Expense Reserve",
+        template="Establish a reserve for recurring expenses to avoid overspending.",
+        priority="Medium",
+        # remaining_share is NaN for zero-amount budgets, so they never match
+        where=(Clause("type", "eq", "Monthly"), Clause("remaining_share", "lt", 0.5)),
+    ),
+    Rule(
+        name="overspent_sub_budgets",
+        title="Rebalance Overspent Budgets",
+        template="Spending recorded against {titles} exceeds the budgeted amount. Move funds from other budgets or cut back.",
+        priority="High",
+        where=(Clause("spent_share", "gt", 1.0),),
+    ),
+    Rule(
+        name="zero_amount",
+        title="Set Budget Amounts",
+        template="{count} budget(s) have no amount set ({titles}). Give each a limit so it can be tracked.",
+        priority="Low",
+        where=(Clause("total_amount", "eq", 0.0),),
+    ),
+]
+
+
+_amount = operator.attrgetter("amount")
+
+
+def _share(part: np.ndarray, whole: np.ndarray) -> np.ndarray:
+    """
+    part / whole, NaN where whole is 0.
+    """
+    out = np.full(part.shape, np.nan)
+    np.divide(part, whole, out=out, where=whole != 0)
+    return out
+
+
+def _share_of(part: float, whole: float) -> float:
+    return part / whole if whole else math.nan
+
+
+class BudgetFrame:
+    """
+    Columnar view of budgets, built on first use. Budgets are grouped per request, or per user_id with
+    by_user=True; sub-budget columns are aggregated onto their budget's row.
+
+    The attribute columns are built together (with the user ids, for by_user frames) in one pass that touches
+    each budget once while it is in cache. Computed columns are filled in only for the budgets rules go on to
+    read, and column_of() gives a column's value for a single budget.
+    """
+
+    # Columns read off each budget: (value, dtype)
+    FIELDS: Dict[str, Tuple[Callable[[Budget], Any], Any]] = {
+        "title": (operator.attrgetter("title"), object),
+        "type": (operator.attrgetter("type"), object),
+        "total_amount": (operator.attrgetter("total_amount"), np.float64),
+        "remaining": (operator.attrgetter("remaining"), np.float64),
+        "end_is_placeholder": (lambda b: is_epoch_placeholder(b.end_dt), bool),
+        "sub_count": (lambda b: float(len(b.subEvents)), np.float64),
+        "spent": (lambda b: float(sum(map(_amount, b.subEvents))), np.float64),
+    }
+    # FIELDS that are plain model fields, built together by _read()
+    ATTRIBUTES = ("title", "type", "total_amount", "remaining")
+    # Columns computed from two others: (function of arrays, function of single values, *source columns)
+    DERIVED: Dict[str, Tuple[Callable, Callable, str, str]] = {
+        "remaining_share": (_share, _share_of, "remaining", "total_amount"),
+        "spent_share": (_share, _share_of, "spent", "total_amount"),
+    }
+
+    def __init__(self, budgets: Sequence[Budget], by_user: bool = False):
+        self.budgets = budgets
+        self.by_user = by_user
+        self._user_ids: Optional[Sequence] = None
+        self._columns: Dict[str, np.ndarray] = {}
+        self._partial: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # name -> (values, which rows are read)
+
+    def _read(self) -> None:
+        """
+        Build the attribute columns and read the user ids in one pass. Pydantic keeps field values in each
+        model's __dict__, and reading them from there skips the attribute lookup.
+        """
+        fields = ("user_id", *self.ATTRIBUTES)
+        values = list(zip(*map(operator.itemgetter(*fields), map(vars, self.budgets)))) or [()] * len(fields)
+        self._user_ids = values[0]
+        for name, column in zip(self.ATTRIBUTES, values[1:]):
+            self._columns[name] = np.fromiter(column, self.FIELDS[name][1], len(column))
+
+    @functools.cached_property
+    def keys(self) -> list:
+        if not self.by_user:
+            return [None] if self.budgets else []
+        if self._user_ids is None:
+            self._read()
+        return list(dict.fromkeys(self._user_ids))  # in order of first appearance
+
+    @functools.cached_property
+    def group(self) -> np.ndarray:
+        if not self.by_user:
+            return np.zeros(len(self.budgets), dtype=np.int64)
+        codes = {user_id: code for code, user_id in enumerate(self.keys)}
+        return np.fromiter(map(codes.__getitem__, self._user_ids), np.int64, len(self.budgets))
+
+    @functools.cached_property
+    def group_sizes(self) -> np.ndarray:
+        return np.bincount(self.group, minlength=len(self.keys))
+
+    @classmethod
+    def column_of(cls, name: str) -> Callable[[Budget], Any]:
+        if name in cls.FIELDS:
+            return cls.FIELDS[name][0]
+        if name in cls.DERIVED:
+            _, fn, first, second = cls.DERIVED[name]
+            get_first, get_second = cls.column_of(first), cls.column_of(second)
+            return lambda budget: fn(get_first(budget), get_second(budget))
+        raise ValueError(f"Unknown budget column: {name!r}")
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        values = self._columns.get(name)
+        if values is None:
+            if name in self.ATTRIBUTES:
+                self._read()
+                return self._columns[name]
+            if name in self.DERIVED:
+                fn, _, first, second = self.DERIVED[name]
+                values = fn(self[first], self[second])
+            else:
+                values = self.take(name, np.arange(len(self.budgets)))
+                self._partial.pop(name, None)
+            self._columns[name] = values
+        return values
+
+    def take(self, name: str, rows: np.ndarray) -> np.ndarray:
+        if name in self._columns or name in self.ATTRIBUTES:
+            return self[name][rows]
+        if name in self.DERIVED:
+            fn, _, first, second = self.DERIVED[name]
+            return fn(self.take(first, rows), self.take(second, rows))
+        get, dtype = self.FIELDS[name]
+        if name not in self._partial:
+            self._partial[name] = (np.empty(len(self.budgets), dtype), np.zeros(len(self.budgets), dtype=bool))
+        values, read = self._partial[name]
+        missing = rows[~read[rows]]
+        if missing.size:
+            budgets = self.budgets
+            values[missing] = np.fromiter(map(get, [budgets[row] for row in missing.tolist()]), dtype, missing.size)
+            read[missing] = True
+        return values[rows]
+
+
+# op -> (test of one value, test of an array); the operand is the clause's literal or the other column's values
+_OPERATORS: Dict[str, Tuple[Callable, Callable]] = {
+    **{op: (compare, compare) for op, compare in (
+        ("eq", operator.eq), ("ne", operator.ne), ("lt", operator.lt), ("le", operator.le), ("gt", operator.gt),
+        ("ge", operator.ge),
+    )},
+    "contains": (operator.contains,
+                 lambda values, operand: np.fromiter(map(operator.contains, values, repeat(operand)), bool, len(values))),
+    "in": (lambda value, operand: value in operand, lambda values, operand: np.isin(values, list(operand))),
+}
+
+
+class CompiledClause:
+    def __init__(self, clause: Clause):
+        self.column, self.value = clause.column, clause.value
+        self.other = clause.value if isinstance(clause.value, Col) else None
+        self.get = BudgetFrame.column_of(self.column)
+        self.get_other = BudgetFrame.column_of(self.other.name) if self.other else None
+        if clause.op not in _OPERATORS:
+            raise ValueError(f"Unknown operator: {clause.op!r}")
+        self.test, self.test_array = _OPERATORS[clause.op]
+
+    def mask(self, column: Callable[[str], np.ndarray]) -> np.ndarray:
+        """
+        Which of the rows `column` reads match.
+        """
+        operand = column(self.other.name) * self.other.times if self.other else self.value
+        return np.asarray(self.test_array(column(self.column), operand), dtype=bool)
+
+    def keep(self, budgets: List[Budget]) -> List[Budget]:
+        """
+        The budgets that match, tested one by one.
+        """
+        if self.other is None:
+            operands = repeat(self.value)
+        else:
+            operands = map(operator.mul, map(self.get_other, budgets), repeat(self.other.times))
+        return list(compress(budgets, map(self.test, map(self.get, budgets), operands)))
+
+
+class CompiledRule:
+    def __init__(self, rule: Rule):
+        if rule.priority not in PRIORITY_ORDER:
+            raise ValueError(f"Unknown priority: {rule.priority!r}")
+        if rule.aggregate not in ("count", "share", "sum") or (rule.aggregate == "sum" and rule.measure is None):
+            raise ValueError(f"Rule {rule.name!r}: aggregate must be count, share or sum (with a measure)")
+        self.fields = {name for _, name, _, _ in Formatter().parse(rule.template) if name}
+        if not self.fields <= set(TEMPLATE_FIELDS):
+            raise ValueError(f"Rule {rule.name!r}: templates may use {', '.join(TEMPLATE_FIELDS)}")
+        self.rule = rule
+        self.clauses = [CompiledClause(clause) for clause in rule.where]
+        self.measure = BudgetFrame.column_of(rule.measure) if rule.measure else None
+        self.seconds = REGISTRY.get("budget_rule_seconds", rule=rule.name)
+        self.fired_total = REGISTRY.get("budget_rule_fired_total", rule=rule.name)
+
+    def matches(self, frame: BudgetFrame) -> np.ndarray:
+        """
+        Rows matching every clause; each clause after the first reads only the rows still matching.
+        """
+        rows = np.arange(len(frame.budgets))
+        for i, clause in enumerate(self.clauses):
+            if not rows.size:
+                break
+            rows = rows[clause.mask(frame.__getitem__ if not i else functools.partial(frame.take, rows=rows))]
+        return rows
+
+    def fired(self, frame: BudgetFrame) -> List[Tuple[int, str]]:
+        """
+        (group, suggestion description) for every group where the rule fires.
+        """
+        rows = self.matches(frame)
+        groups = frame.group[rows]
+        count = np.bincount(groups, minlength=len(frame.keys))
+        total = (np.bincount(groups, weights=frame.take(self.rule.measure, rows), minlength=len(frame.keys))
+                 if self.rule.measure else np.zeros(len(frame.keys)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = count / frame.group_sizes
+        value = {"count": count, "share": share, "sum": total}[self.rule.aggregate]
+        hits = np.flatnonzero((count > 0) & (value >= self.rule.at_least)).tolist()
+        if not self.fields:
+            return [(g, self.rule.template) for g in hits]
+        titles = {}
+        if "titles" in self.fields and hits:
+            for group, row in zip(groups.tolist(), rows.tolist()):
+                titles.setdefault(group, []).append(frame.budgets[row].title)
+        return [
+            (g, self.rule.template.format(count=int(count[g]), share=float(share[g]), total=float(total[g]),
+                                          titles=", ".join(titles.get(g, []))))
+            for g in hits
+        ]
+
+    def fired_small(self, frame: BudgetFrame) -> List[Tuple[int, str]]:
+        """
+        fired() for a frame holding one group, in plain Python: for a handful of budgets NumPy's fixed cost per
+        call outweighs the work.
+        """
+        matched = frame.budgets
+        for clause in self.clauses:
+            matched = clause.keep(matched)
+            if not matched:
+                return []
+        rule = self.rule
+        count = len(matched)
+        share = count / len(frame.budgets)
+        total = 0.0
+        if rule.measure:
+            for value in map(self.measure, matched):
+                total += value
+        value = count if rule.aggregate == "count" else share if rule.aggregate == "share" else total
+        if not value >= rule.at_least:
+            return []
+        if not self.fields:
+            return [(0, rule.template)]
+        titles = ", ".join(budget.title for budget in matched) if "titles" in self.fields else ""
+        return [(0, rule.template.format(count=count, share=share, total=total, titles=titles))]
+
+
+class RuleEngine:
+    def __init__(self, rules: Sequence[Rule]):
+        # Stable sort: priority first, then declaration order
+        self.rules = sorted((CompiledRule(rule) for rule in rules), key=lambda c: PRIORITY_ORDER[c.rule.priority])
+
+    def evaluate(self, frame: BudgetFrame, limit: Optional[int] = None) -> List[List[BudgetSuggestion]]:
+        """
+        Suggestions per group of the frame (same order as frame.keys), highest priority first.
+        """
+        small = not frame.by_user and 0 < len(frame.budgets) <= SMALL_FRAME
+        groups, suggestions = [], []
+        for compiled in self.rules:
+            rule = compiled.rule
+            started = time.perf_counter()
+            fired = compiled.fired_small(frame) if small else compiled.fired(frame)
+            if metrics.METRICS_ENABLED:
+                compiled.seconds.observe(time.perf_counter() - started)
+                if fired:
+                    compiled.fired_total.inc(len(fired))
+            for group, description in fired:
+                groups.append(group)
+                suggestions.append({"title": rule.title, "description": description, "priority": rule.priority})
+        results: List[List[BudgetSuggestion]] = [[]] if small else [[] for _ in frame.keys]
+        # One validation call for every suggestion is cheaper than a model per suggestion
+        for group, suggestion in zip(groups, _suggestions.validate_python(suggestions)):
+            results[group].append(suggestion)
+        if limit is not None:
+            results = [suggestions[:limit] for suggestions in results]
+        return results
+
+
+engine = RuleEngine(BUDGET_RULES)
@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from app.models.income import Income
+from app.models.expense import Expense
+from app.models.budget import Budget
+from app.models.loan import Loan
+from app.services.income import IncomeService
+from app.services.expense import ExpenseService
+from app.services.budget import BudgetService
+from app.services.loan_batch import generate_payment_optimization_batch
+from app.executor import run_analysis
+from app import clock, fast_io
+
+# domain -> (record model, analysis function, result -> JSON-able)
+DOMAINS = {
+    "income": (Income, IncomeService.get_income_suggestions, lambda r: r.model_dump()["suggestions"]),
+    "expense": (Expense, ExpenseService.get_expense_suggestions, lambda r: r.model_dump()["suggestions"]),
+    "budget": (Budget, BudgetService.get_budget_suggestions, lambda r: [s.model_dump() for s in r]),
+    "loan": (Loan, generate_payment_optimization_batch, lambda r: [s.model_dump() for s in r]),
+}
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streams the response while the body iterator is still reading the request.
+    The stock StreamingResponse listens for disconnects on receive(), which would steal request body chunks.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a byte stream into lines without holding more than one partial line in memory.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def _line(payload: dict) -> bytes:
+    return fast_io.dumps(payload) + b"\n"
+
+
+async def _flush(user_id, groups: Dict[str, List], as_of: datetime) -> AsyncIterator[bytes]:
+    for domain, records in groups.items():
+        _, analyse, render = DOMAINS[domain]
+        try:
+            with clock.pinned(as_of):
+                result = await run_analysis(analyse, records)
+            yield _line({"user_id": user_id, "domain": domain, "records": len(records), "suggestions": render(result)})
+        except Exception as e:
+            detail = getattr(e, "detail", str(e))
+            yield _line({"user_id": user_id, "domain": domain, "records": len(records), "error": detail})
+
+
+async def stream_bulk_suggestions(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Consume NDJSON records (each a model object plus a "domain" field) and stream one result line per
+    (user_id, domain) group. Input must be grouped by user_id: a group is analysed and released as soon as the
+    next user's first record arrives, so peak memory is bounded by the largest single user's data. A record for
+a user whose group was already released is reported as an error line rather than analysed on its own.
+    Every group is evaluated at the same as-of instant, fixed when the stream starts.
+    """
+    as_of = clock.now()
+    user_id, groups = None, {}
+    flushed = set()
+    users = records = errors = 0
+    line_number = 0
+    async for raw in iter_lines(chunks):
+        line_number += 1
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError("Each line must be a JSON object")
+            domain = data.get("domain")
+            if domain not in DOMAINS:
+                raise ValueError(f"Unknown domain: {domain!r}")
+            record = DOMAINS[domain][0].model_validate(data)
+            if record.user_id in flushed:
+                raise ValueError(f"Records for user_id {record.user_id} must be contiguous; that user's group was "
+                                 "already analysed")
+        except (ValueError, ValidationError) as e:
+            errors += 1
+            yield _line({"line": line_number, "error": str(e)})
+            continue
+
+        if record.user_id != user_id and groups:
+            async for out in _flush(user_id, groups, as_of):
+                yield out
+            users += 1
+            flushed.add(user_id)
+            groups = {}
+        user_id = record.user_id
+        groups.setdefault(domain, []).append(record)
+        records += 1
+
+    if groups:
+        async for out in _flush(user_id, groups, as_of):
+            yield out
+        users += 1
+    yield _line({"summary": {"users": users, "records": records, "errors": errors, "as_of": as_of.isoformat()}})
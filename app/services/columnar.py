@@ -0,0 +1,372 @@
+"""
+Columnar bulk uploads: loans, loan payments and expenses as flat tables instead of nested JSON.
+
+An upload is one table (CSV, or Parquet / Arrow IPC when pyarrow is installed) or a zip archive of tables
+named loans.*, payments.* and expenses.*. Payments join loans on loan_id; loans and expenses carry user_id.
+Only the columns the analyses read are loaded: CSV in chunks of CSV_CHUNK_ROWS rows, Parquet and Arrow files
+memory-mapped. The loan optimizer and the expense summaries then run on the column arrays for every user at
+once, without building a model per row, and give the same results as /bulk/suggestions for the same records.
+"""
+import os
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from app.models.loan import PaymentFrequency
+from app.models.records import ExpenseRecords
+from app.models.temporal import parse_column
+from app.services.bulk import DOMAINS
+from app.services.expense import ExpenseService, recent_cutoff
+from app.services.expense_engine import ExpenseSummary
+from app.services.loan_batch import LoanBatch, PAYMENTS_PER_YEAR, payment_suggestions, recent_rows, zero_divisions
+from app.metrics import timed
+from app import clock, warmup
+
+CSV_CHUNK_ROWS = int(os.getenv("COLUMNAR_CSV_CHUNK_ROWS", "100000"))
+
+REQUIRED = object()
+# table -> column -> (kind, value when the column is absent; REQUIRED columns must be present)
+TABLES = {
+    "loans": {
+        "user_id": ("int", REQUIRED), "id": ("int", REQUIRED), "loan_type": ("str", REQUIRED),
+        "lender_name": ("str", REQUIRED), "principal_amount": ("float", REQUIRED), "total_paid": ("float", REQUIRED),
+        "due": ("float", REQUIRED), "interest_rate": ("float", REQUIRED), "remaining_payments": ("int", REQUIRED),
+        "start_date": ("str", REQUIRED), "end_date": ("str", ""), "payment_frequency": ("str", REQUIRED),
+    },
+    "payments": {
+        "loan_id": ("int", REQUIRED), "payment_date": ("str", REQUIRED), "remaining_balance": ("float", REQUIRED),
+    },
+    "expenses": {
+        "user_id": ("int", REQUIRED), "title": ("str", REQUIRED), "amount": ("float", REQUIRED),
+        "category": ("str", REQUIRED), "date": ("str", REQUIRED),
+    },
+}
+MEDIA_TYPES = {
+    "text/csv": "csv", "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet", "application/x-parquet": "parquet",
+    "application/vnd.apache.arrow.file": "arrow", "application/vnd.apache.arrow.stream": "arrow",
+    "application/zip": "zip", "application/x-zip-compressed": "zip",
+}
+EXTENSIONS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow"}
+_DTYPES = {"int": np.int64, "float": np.float64, "str": object}
+_FREQUENCIES = {frequency.value: frequency for frequency in PaymentFrequency}
+
+Table = Dict[str, np.ndarray]
+
+
+class UnsupportedFormat(ValueError):
+    """
+    The upload's format is unknown, or needs pyarrow and it is not installed.
+    """
+
+
+class LoanRow(NamedTuple):
+    # What the suggestion text and LoanSuggestion read from a loan
+    id: int
+    loan_type: str
+    lender_name: str
+    start_date: str
+    end_date: Optional[str]
+    payment_frequency: PaymentFrequency
+    remaining_payments: int
+
+
+async def spool(chunks: AsyncIterator[bytes]) -> str:
+    """
+    Write a request body to a temporary file and return its path; the caller removes it.
+    """
+    handle = tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+    try:
+        with handle:
+            async for chunk in chunks:
+                handle.write(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return handle.name
+
+
+def _present(table: str, names) -> List[str]:
+    spec = TABLES[table]
+    missing = [name for name, (_, default) in spec.items() if default is REQUIRED and name not in names]
+    if missing:
+        raise ValueError(f"The {table} table is missing columns: {', '.join(missing)}")
+    return [name for name in spec if name in names]
+
+
+def _read_csv(path: str, table: str) -> Table:
+    present = _present(table, set(pd.read_csv(path, nrows=0).columns))
+    spec = TABLES[table]
+    parts = {name: [] for name in present}
+    # Empty cells stay "" (optional dates) or fail to parse (numbers) instead of becoming NaN
+    chunks = pd.read_csv(path, usecols=present, dtype={name: _DTYPES[spec[name][0]] for name in present},
+                         keep_default_na=False, chunksize=CSV_CHUNK_ROWS, memory_map=True)
+    for chunk in chunks:
+        for name in present:
+            parts[name].append(chunk[name].to_numpy())
+    return {name: np.concatenate(values) if values else np.array([], dtype=_DTYPES[spec[name][0]])
+            for name, values in parts.items()}
+
+
+def _read_arrow(path: str, fmt: str, table: str) -> Table:
+    try:
+        pa = warmup.load("pyarrow")
+        if fmt == "parquet":
+            pq = warmup.load("pyarrow.parquet")
+    except ImportError:
+        raise UnsupportedFormat(f"{fmt.capitalize()} uploads need pyarrow, which is not installed; send CSV instead")
+    if fmt == "parquet":
+        present = _present(table, set(pq.read_schema(path, memory_map=True).names))
+        data = pq.read_table(path, columns=present, memory_map=True)
+    else:
+        # The mapping stays open for as long as the arrays read from it are referenced
+        source = pa.memory_map(path)
+        try:
+            data = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            data = pa.ipc.open_stream(source).read_all()
+        present = _present(table, set(data.column_names))
+    return {name: data.column(name).to_numpy() for name in present}
+
+
+def read_table(path: str, fmt: str, table: str) -> Table:
+    """
+    The analysed columns of one table, each cast to its kind; absent optional columns are filled in.
+    """
+    columns = _read_csv(path, table) if fmt == "csv" else _read_arrow(path, fmt, table)
+    rows = len(next(iter(columns.values())))
+    result = {}
+    for name, (kind, default) in TABLES[table].items():
+        if name in columns:
+            result[name] = columns[name].astype(_DTYPES[kind], copy=False)
+        else:
+            result[name] = np.full(rows, default, dtype=_DTYPES[kind])
+    return result
+
+
+def read_upload(path: str, media_type: str, table: Optional[str] = None) -> Dict[str, Table]:
+    """
+    Tables by name from an uploaded file: a single table named by `table`, or a zip archive of named tables.
+    """
+    fmt = MEDIA_TYPES.get(media_type.split(";")[0].strip().lower())
+    if fmt is None:
+        raise UnsupportedFormat(f"Unsupported content type {media_type!r}; expected one of {', '.join(MEDIA_TYPES)}")
+    if fmt != "zip":
+        if table not in TABLES:
+            raise ValueError(f"Name the uploaded table with ?table= ({', '.join(TABLES)}) or upload a zip archive")
+        return {table: read_table(path, fmt, table)}
+
+    tables = {}
+    try:
+        with zipfile.ZipFile(path) as archive, tempfile.TemporaryDirectory() as directory:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+                name, extension = os.path.splitext(os.path.basename(member.filename))
+                if name not in TABLES or extension.lower() not in EXTENSIONS:
+                    raise ValueError(f"Unexpected archive member {member.filename!r}; expected "
+                                     f"{', '.join(TABLES)} tables with a {', '.join(EXTENSIONS)} extension")
+                if name in tables:
+                    raise ValueError(f"More than one {name} table in the archive")
+                # Extracted to disk so Parquet and Arrow files can be memory-mapped
+                tables[name] = read_table(archive.extract(member, directory), EXTENSIONS[extension.lower()], name)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Invalid zip archive: {e}")
+    return tables
+
+
+def _payments_per_year(frequency: np.ndarray) -> tuple:
+    """
+    (payments per year, PaymentFrequency per distinct value, code per row) for a column of frequency names.
+    """
+    values, codes = np.unique(frequency, return_inverse=True)
+    unknown = [value for value in values.tolist() if value not in _FREQUENCIES]
+    if unknown:
+        raise ValueError(f"Unknown payment_frequency {unknown[0]!r}; expected one of {', '.join(_FREQUENCIES)}")
+    frequencies = [_FREQUENCIES[value] for value in values.tolist()]
+    per_year = np.array([PAYMENTS_PER_YEAR[frequency] for frequency in frequencies], dtype=np.float64)
+    return per_year[codes], frequencies, codes
+
+
+class LoanTable:
+    """
+    The loans table joined with its payments, ready to be cut into LoanBatch instances by row.
+    """
+
+    def __init__(self, loans: Table, payments: Optional[Table]):
+        self.columns = loans
+        self.count = len(loans["id"])
+        self.id_order = np.argsort(loans["id"], kind="stable")
+        sorted_ids = loans["id"][self.id_order]
+        duplicate = np.flatnonzero(sorted_ids[1:] == sorted_ids[:-1])
+        if duplicate.size:
+            raise ValueError(f"Duplicate loan id {int(sorted_ids[duplicate[0]])} in the loans table")
+        self.payments_per_year, self.frequencies, self.frequency_code = _payments_per_year(loans["payment_frequency"])
+        self.start_date = parse_column(loans["start_date"].tolist())
+
+        self.payment_owner = np.zeros(0, dtype=np.int64)
+        self.payment_date = np.array([], dtype="datetime64[us]")
+        self.payment_balance = np.zeros(0)
+        if payments is not None and len(payments["loan_id"]):
+            self.payment_owner = self.rows_of(payments["loan_id"])
+            self.payment_date = parse_column(payments["payment_date"].tolist())
+            self.payment_balance = payments["remaining_balance"]
+
+    def rows_of(self, loan_ids: np.ndarray) -> np.ndarray:
+        """
+        Loans table row of each loan id.
+        """
+        sorted_ids = self.columns["id"][self.id_order]
+        position = np.minimum(np.searchsorted(sorted_ids, loan_ids), max(self.count - 1, 0))
+        unknown = np.flatnonzero((sorted_ids[position] != loan_ids) if self.count else np.ones(len(loan_ids), bool))
+        if unknown.size:
+            raise ValueError(f"Payment for unknown loan id {int(loan_ids[unknown[0]])}")
+        return self.id_order[position]
+
+    def batch(self, rows: np.ndarray) -> LoanBatch:
+        """
+        LoanBatch over the given loan rows, in that order, with their payments.
+        """
+        columns = self.columns
+        position = np.full(self.count, -1, dtype=np.int64)
+        position[rows] = np.arange(len(rows))
+        owner = position[self.payment_owner]
+        paid = owner >= 0
+        return LoanBatch.from_columns({
+            "principal_amount": columns["principal_amount"][rows], "total_paid": columns["total_paid"][rows],
+            "due": columns["due"][rows], "interest_rate": columns["interest_rate"][rows],
+            "remaining_payments": columns["remaining_payments"][rows], "payments_per_year": self.payments_per_year[rows],
+            "payment_owner": owner[paid], "payment_date": self.payment_date[paid],
+            "payment_balance": self.payment_balance[paid],
+        })
+
+    def row(self, row: int) -> LoanRow:
+        columns = self.columns
+        return LoanRow(
+            int(columns["id"][row]), columns["loan_type"][row], columns["lender_name"][row], columns["start_date"][row],
+            columns["end_date"][row] or None, self.frequencies[self.frequency_code[row]],
+            int(columns["remaining_payments"][row]),
+        )
+
+
+class _Rows:
+    """
+    loans[i] for payment_suggestions: a LoanRow for batch row i, built only when it is read.
+    """
+
+    def __init__(self, table: LoanTable, rows: np.ndarray):
+        self.table, self.rows = table, rows
+
+    def __getitem__(self, i: int) -> LoanRow:
+        return self.table.row(int(self.rows[i]))
+
+
+def loan_suggestions(loans: Table, payments: Optional[Table], now: datetime) -> Dict[int, object]:
+    """
+    Payment optimization suggestions per user (a list of LoanSuggestion, or the exception that user's loans
+    raise in generate_payment_optimization_batch), for all users in one batch.
+    """
+    table = LoanTable(loans, payments)
+    users = loans["user_id"]
+    rows = recent_rows(table.start_date, now)
+    results = {user: [] for user in np.unique(users).tolist()}
+
+    # Users whose loans the optimizer rejects get that error, and the rest are analysed together
+    batch = table.batch(rows)
+    failing = np.unique(users[rows[zero_divisions(batch, batch.remaining_principal())]])
+    if failing.size:
+        for user in failing.tolist():
+            results[user] = ZeroDivisionError("float division by zero")
+        rows = rows[~np.isin(users[rows], failing)]
+        batch = table.batch(rows)
+    if rows.size:
+        suggestions = payment_suggestions(batch, _Rows(table, rows))
+        owners = users[table.rows_of(np.array([suggestion.loan_id for suggestion in suggestions], dtype=np.int64))]
+        for user, suggestion in zip(owners.tolist(), suggestions):
+            results[user].append(suggestion)
+    return results
+
+
+def expense_summaries(expenses: Table, cutoff: datetime) -> Dict[int, ExpenseSummary]:
+    """
+    The ExpenseSummary of every user's expenses, equal to summarize_expenses over that user's records.
+    """
+    if not len(expenses["user_id"]):
+        return {}
+    user_ids, user = np.unique(expenses["user_id"], return_inverse=True)
+    records = ExpenseRecords.from_columns(expenses)
+    amount, categories = records.amount, records.categories
+    # bincount adds in input order within each user, like the per-user cumsum
+    count = np.bincount(user)
+    total = np.bincount(user, weights=amount)
+
+    pair = user * len(categories) + records.category
+    pair_totals = np.bincount(pair, weights=amount)
+    pairs, first_seen = np.unique(pair, return_index=True)
+    # Each user's categories in order of first appearance
+    pairs = pairs[np.lexsort((first_seen, pairs // len(categories)))]
+    category_totals = [{} for _ in user_ids]
+    for pair_code, pair_user, pair_category in zip(pairs.tolist(), (pairs // len(categories)).tolist(),
+                                                    (pairs % len(categories)).tolist()):
+        category_totals[pair_user][categories[pair_category]] = float(pair_totals[pair_code])
+
+    # The first expense with the highest amount on or after the cutoff
+    recent = np.flatnonzero(records.date >= np.datetime64(cutoff, "us").astype(np.int64))
+    recent = recent[np.lexsort((recent, -amount[recent], user[recent]))]
+    top = {}
+    if recent.size:
+        first = recent[np.r_[True, user[recent][1:] != user[recent][:-1]]]
+        top = {int(user[row]): records.row(row) for row in first.tolist()}
+    return {
+        user_id: ExpenseSummary(float(total[code]), int(count[code]), category_totals[code], top.get(code))
+        for code, user_id in enumerate(user_ids.tolist())
+    }
+
+
+def _first_appearance(*columns: np.ndarray) -> List[int]:
+    users = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+    values, first = np.unique(users, return_index=True)
+    return values[np.argsort(first)].tolist()
+
+
+def _result(user: int, domain: str, records: int, result) -> dict:
+    if isinstance(result, Exception):
+        return {"user_id": user, "domain": domain, "records": records, "error": getattr(result, "detail", str(result))}
+    return {"user_id": user, "domain": domain, "records": records, "suggestions": DOMAINS[domain][2](result)}
+
+
+@timed("analyse_columnar_upload")
+def analyse_upload(path: str, media_type: str, table: Optional[str] = None) -> List[dict]:
+    """
+    Loan and expense suggestions per user for an uploaded file, as /bulk/suggestions result lines: for each user
+    in order of first appearance, a loan line and an expense line (for the tables they appear in), then a summary.
+    """
+    tables = read_upload(path, media_type, table)
+    if "payments" in tables and "loans" not in tables:
+        raise ValueError("A payments table needs its loans table in the same upload")
+    now = clock.now()
+    loans, expenses = tables.get("loans"), tables.get("expenses")
+    loan_results = loan_suggestions(loans, tables.get("payments"), now) if loans is not None else {}
+    summaries = expense_summaries(expenses, recent_cutoff(now)) if expenses is not None else {}
+    loan_counts = {}
+    if loans is not None:
+        ids, counts = np.unique(loans["user_id"], return_counts=True)
+        loan_counts = dict(zip(ids.tolist(), counts.tolist()))
+
+    lines = []
+    users = _first_appearance(*(t["user_id"] for t in (loans, expenses) if t is not None))
+    for user in users:
+        if user in loan_results:
+            lines.append(_result(user, "loan", int(loan_counts[user]), loan_results[user]))
+        if user in summaries:
+            try:
+                result = ExpenseService.suggestions_from_summary(summaries[user])
+            except Exception as e:
+                result = e
+            lines.append(_result(user, "expense", summaries[user].count, result))
+    rows = {name: len(next(iter(columns.values()))) for name, columns in tables.items()}
+    lines.append({"summary": {"users": len(users), "tables": rows, "as_of": now.isoformat()}})
+    return lines
@@ -0,0 +1,180 @@
+import numpy as np
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from typing import Dict, List
+from app.models.loan import Loan, LoanStatus, LoanPayoff, AllocationSegment, RepaymentStrategy, PortfolioPlan
+from app.services.loan_batch import LoanBatch
+from app.services.amortization import periodic_rate, level_payment, payoff_summary
+from app.metrics import timed
+from app import clock
+
+STRATEGIES = ("avalanche", "snowball", "optimal")
+BALANCE_EPSILON = 0.005  # below half a paisa a balance counts as paid off
+
+
+class DebtPortfolio:
+    """
+    A user's active loans on a common monthly timeline: balance, effective monthly rate and the monthly
+    minimum that clears each loan over its remaining term.
+    """
+
+    def __init__(self, loans: List[Loan]):
+        active = [loan for loan in loans if loan.status == LoanStatus.ACTIVE and loan.remaining_payments > 0]
+        batch = LoanBatch(active)
+        principal = batch.remaining_principal()
+        owing = np.flatnonzero(principal > BALANCE_EPSILON)
+        self.loans = [active[i] for i in owing.tolist()]
+        self.balance = principal[owing]
+        self.interest_rate = batch.interest_rate[owing]
+
+        # Weekly and biweekly loans compound several times a month; fold that into one monthly rate
+        payments_per_year = batch.payments_per_year[owing]
+        periods_per_month = payments_per_year / 12
+        self.monthly_rate = np.expm1(periods_per_month * np.log1p(periodic_rate(self.interest_rate, payments_per_year)))
+        self.minimum = level_payment(self.balance, self.monthly_rate, batch.remaining_payments[owing] / periods_per_month)
+        self.minimum_only_months, self.minimum_only_interest = payoff_summary(self.balance, self.monthly_rate, self.minimum)
+
+    def orders(self, strategies=STRATEGIES) -> np.ndarray:
+        """
+        Priority order of the loans for each strategy, one row per strategy:
+        - avalanche: highest stated interest rate first;
+        - snowball: smallest balance first;
+        - optimal: highest effective monthly rate first. With fixed rates and minimums, paying the extra
+          towards the loan with the highest marginal rate minimizes total interest (a greedy solution of the
+          allocation LP), and ranking on the monthly rate accounts for the compounding frequency.
+        """
+        keys = {
+            "avalanche": (self.balance, -self.interest_rate),
+            "snowball": (-self.interest_rate, self.balance),
+            "optimal": (self.balance, -self.monthly_rate),
+        }
+        unknown = [name for name in strategies if name not in keys]
+        if unknown:
+            raise ValueError(f"Unknown strategy: {unknown[0]}")
+        return np.array([np.lexsort(keys[name]) for name in strategies], dtype=np.int64).reshape(len(strategies), -1)
+
+
+def simulate_repayment(balance: np.ndarray, monthly_rate: np.ndarray, minimum: np.ndarray,
+                       monthly_budget: float, orders: np.ndarray, horizon: int) -> Dict[str, np.ndarray]:
+    """
+    Month-by-month repayment of every strategy at once. Each month interest accrues, every loan gets its
+    minimum (or what is left of it) and the rest of the budget, including minimums freed by paid-off loans,
+    cascades down the strategy's priority order. Stops once every loan is paid or after `horizon` months.
+    Returns payments (months, strategies, loans), interest (strategies, loans) and payoff_month (strategies, loans).
+    """
+    strategies, count = orders.shape
+    rows = np.arange(strategies)[:, None]
+    owed = np.broadcast_to(balance, (strategies, count)).copy()
+    interest = np.zeros((strategies, count))
+    payoff_month = np.zeros((strategies, count), dtype=np.int64)
+    payments = []
+    for month in range(1, horizon + 1):
+        accrued = owed * monthly_rate
+        interest += accrued
+        due = owed + accrued
+        paid = np.minimum(minimum, due)
+        extra = monthly_budget - paid.sum(axis=1)
+        left = (due - paid)[rows, orders]
+        # Each loan in priority order takes what the ones before it left of the extra, up to its balance
+        before = np.cumsum(left, axis=1) - left
+        paid[rows, orders] += np.clip(extra[:, None] - before, 0.0, left)
+        owed = due - paid
+        closed = owed <= BALANCE_EPSILON
+        payoff_month[closed & (payoff_month == 0)] = month
+        owed[closed] = 0.0
+        payments.append(paid)
+        if closed.all():
+            break
+    return {
+        "payments": np.array(payments).reshape(len(payments), strategies, count),
+        "interest": interest,
+        "payoff_month": payoff_month,
+    }
+
+
+def allocation_segments(payments: np.ndarray, loan_ids: np.ndarray, dates: List[str]) -> List[AllocationSegment]:
+    """
+    Run-length encode one strategy's (months, loans) payments into segments of identical monthly payments.
+    """
+    cents = np.round(payments, 2)
+    changes = np.flatnonzero(np.r_[True, np.any(cents[1:] != cents[:-1], axis=1)])
+    ends = np.r_[changes[1:], len(cents)]
+    segments = []
+    for start, end in zip(changes.tolist(), ends.tolist()):
+        paying = np.flatnonzero(cents[start])
+        segments.append(
+            AllocationSegment(
+                start_month=start + 1,
+                end_month=end,
+                start_date=dates[start + 1],
+                loan_ids=loan_ids[paying].tolist(),
+                amounts=cents[start, paying].tolist(),
+            )
+        )
+    return segments
+
+
+def month_dates(now: datetime, months: int) -> List[str]:
+    """
+    YYYY-MM-DD of each month offset from `now`, index 0 being today.
+    """
+    today = now.date()
+    return [(today + relativedelta(months=month)).isoformat() for month in range(months + 1)]
+
+
+@timed("plan_debt_repayment")
+def plan_debt_repayment(loans: List[Loan], monthly_budget: float, strategies=STRATEGIES,
+                        schedule: bool = True) -> PortfolioPlan:
+    """
+    Split `monthly_budget` across all of a user's active loans under each strategy and compare total
+    interest, payoff dates and (optionally) the month-by-month allocation.
+    """
+    portfolio = DebtPortfolio(loans)
+    orders = portfolio.orders(strategies)
+    minimum_payment = float(portfolio.minimum.sum())
+    if monthly_budget + BALANCE_EPSILON < minimum_payment:
+        raise ValueError(f"Monthly budget {monthly_budget:.2f} BDT does not cover the minimum payments of "
+                         f"{minimum_payment:.2f} BDT")
+    if not portfolio.loans:
+        return PortfolioPlan(monthly_budget=monthly_budget, minimum_payment=0.0, minimum_only_interest=0.0,
+                             strategies=[])
+    minimum_only_interest = float(portfolio.minimum_only_interest.sum())
+
+    # Minimums alone clear every loan within its remaining term, so no strategy takes longer
+    horizon = int(portfolio.minimum_only_months.max()) + 1
+    result = simulate_repayment(portfolio.balance, portfolio.monthly_rate, portfolio.minimum, monthly_budget,
+                                orders, horizon)
+    payments, interest, payoff_month = result["payments"], result["interest"], result["payoff_month"]
+    dates = month_dates(clock.now(), len(payments))
+    loan_ids = np.array([loan.id for loan in portfolio.loans], dtype=np.int64)
+    total_interest = interest.sum(axis=1)
+    total_paid = payments.sum(axis=(0, 2))
+    months = payoff_month.max(axis=1)
+
+    plans = []
+    for s, name in enumerate(strategies):
+        loan_months, loan_interest = payoff_month[s].tolist(), np.round(interest[s], 2).tolist()
+        plans.append(
+            RepaymentStrategy(
+                strategy=name,
+                months=int(months[s]),
+                payoff_date=dates[months[s]],
+                total_interest=round(float(total_interest[s]), 2),
+                total_paid=round(float(total_paid[s]), 2),
+                interest_saved=round(minimum_only_interest - float(total_interest[s]), 2),
+                loans=[
+                    LoanPayoff(loan_id=loan.id, lender_name=loan.lender_name, payoff_month=loan_months[i],
+                               payoff_date=dates[loan_months[i]], interest_paid=loan_interest[i])
+                    for i, loan in enumerate(portfolio.loans)
+                ],
+                schedule=allocation_segments(payments[:months[s], s], loan_ids, dates) if schedule else None,
+            )
+        )
+    best = min(range(len(plans)), key=lambda s: (plans[s].total_interest, plans[s].months))
+    return PortfolioPlan(
+        monthly_budget=monthly_budget,
+        minimum_payment=round(minimum_payment, 2),
+        minimum_only_interest=round(minimum_only_interest, 2),
+        best_strategy=plans[best].strategy,
+        strategies=plans,
+    )
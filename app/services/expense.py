@@ -1,11 +1,25 @@
 from app.models.expense import Expense, ExpenseSuggestions, ExpenseSuggestionResponse
 from fastapi import HTTPException
-from typing import List
+from typing import List, Union
 from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from app.metrics import timed
+from app import clock
+from app.models.records import ExpenseRecords
+from app.services.expense_engine import ExpenseSummary, summarize_expenses
+
+
+def recent_cutoff(now: datetime) -> datetime:
+    """
+    Start of the previous calendar month; expenses from then on count as recent.
+    """
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=1)
+
 
 class ExpenseService:
     @staticmethod
-    def get_expense_suggestions(expenses: List[Expense]) -> ExpenseSuggestions:
+    @timed("ExpenseService.get_expense_suggestions")
+    def get_expense_suggestions(expenses: Union[ExpenseRecords, List[Expense]]) -> ExpenseSuggestions:
         """
         Generate personalized expense suggestions based on user expense data.
         """
@@ -13,16 +27,31 @@ class ExpenseService:
             if not expenses:
                 return ExpenseSuggestions(suggestions=[ExpenseSuggestionResponse(suggestion="No expense data provided for analysis.")])
 
-            total_expenses = sum(expense.amount for expense in expenses)
+            # All statistics below come from a single aggregation pass
+            summary = summarize_expenses(expenses, recent_cutoff(clock.now()))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating expense suggestions: {str(e)}")
+        return ExpenseService.suggestions_from_summary(summary)
+
+    @staticmethod
+    @timed("ExpenseService.suggestions_from_summary")
+    def suggestions_from_summary(summary: ExpenseSummary) -> ExpenseSuggestions:
+        """
+        Expense suggestions from aggregated statistics (computed from a request or kept by the feature store).
+        """
+        try:
+            if not summary.count:
+                return ExpenseSuggestions(suggestions=[ExpenseSuggestionResponse(suggestion="No expense data provided for analysis.")])
+
+            total_expenses = summary.total
             if total_expenses == 0:
                 return ExpenseSuggestions(suggestions=[ExpenseSuggestionResponse(suggestion="Total expenses are zero. No analysis possible.")])
 
             suggestions = []
 
             # 1. Expense Optimization Suggestion
-            recent_expenses = [e for e in expenses if datetime.strptime(e.date, "%Y-%m-%d %H:%M:%S") >= datetime(2025, 6, 1)]
-            if recent_expenses:
-                high_expense = max(recent_expenses, key=lambda x: x.amount)
+            high_expense = summary.top_recent
+            if high_expense is not None:
                 if high_expense.amount > 5000:
                     suggestions.append(ExpenseSuggestionResponse(
                         suggestion=f"Your highest recent expense was BDT {high_expense.amount:.2f} on {high_expense.title} "
@@ -31,9 +60,7 @@ class ExpenseService:
                     ))
 
             # 2. Category Spending Review
-            category_totals = {}
-            for expense in expenses:
-                category_totals[expense.category] = category_totals.get(expense.category, 0) + expense.amount
+            category_totals = summary.category_totals
             dominant_category = max(category_totals.items(), key=lambda x: x[1])[0]
             if category_totals[dominant_category] / total_expenses > 0.3:  # 30% threshold
                 suggestions.append(ExpenseSuggestionResponse(
@@ -42,8 +69,8 @@ class ExpenseService:
                 ))
 
             # 3. Savings Opportunity Suggestion
-            utilities_total = sum(e.amount for e in expenses if e.category == "Utilities")
-            if utilities_total > 4000 and len(expenses) > 10:
+            utilities_total = category_totals.get("Utilities", 0)
+            if utilities_total > 4000 and summary.count > 10:
                 potential_savings = utilities_total * 0.15  # 15% savings potential
                 suggestions.append(ExpenseSuggestionResponse(
                     suggestion=f"Your utility expenses total BDT{utilities_total:.2f}. Consider energy-saving measures "
@@ -0,0 +1,158 @@
+import numpy as np
+from typing import List, NamedTuple, Optional, Union
+from app.models.expense import Expense
+from app.models.records import ExpenseRecords
+from app.metrics import timed
+from app import warmup
+
+# Spending tiers: low, middle, high
+TIERS = 3
+# Share of each tier's spending suggested as a cut, from the highest tier down; lower tiers are left alone
+CUT_RATES = (0.2, 0.1)
+MAX_CUT_SUGGESTIONS = 5
+# Inputs up to this size are clustered exactly; larger ones use MiniBatchKMeans
+EXACT_MAX = 200_000
+
+
+class SpendItems(NamedTuple):
+    """
+    Spending to cluster, one item per expense or per (month, category) total.
+    """
+    amounts: np.ndarray
+    categories: np.ndarray  # codes into labels
+    labels: List[str]
+    months: np.ndarray  # months since 1970-01
+
+
+def spend_items(expenses: Union[ExpenseRecords, List[Expense]]) -> SpendItems:
+    records = ExpenseRecords.of(expenses)
+    months = records.date.view("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+    return SpendItems(records.amount, records.category, records.categories, months)
+
+
+def _segment_argmin(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Offset of the first minimum within each segment of `values`, segments beginning at `starts`.
+    """
+    lengths = np.diff(np.r_[starts, values.size])
+    minima = np.repeat(np.minimum.reduceat(values, starts), lengths)
+    segment = np.repeat(np.arange(starts.size), lengths)
+    hits = np.flatnonzero(values <= minima)
+    _, first = np.unique(segment[hits], return_index=True)
+    return hits[first] - starts
+
+
+def natural_breaks(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Exact 1-D k-means (Jenks natural breaks): the split of sorted values into k contiguous groups with the least
+    total within-group sum of squares. Returns each value's group, 0 for the lowest.
+
+    Dynamic programme over the sorted values, D[m][i] = min_j D[m-1][j-1] + SSE(j..i). The best j never decreases
+    as i grows, so each layer is solved by divide and conquer, with every task of one recursion level evaluated
+    in a single array pass: O(k n log n) work in O(k log n) NumPy calls.
+    """
+    n = values.size
+    order = np.argsort(values, kind="stable")
+    x = values[order]
+    k = min(k, int(np.unique(x).size))
+    if k <= 1:
+        return np.zeros(n, dtype=np.int64)
+    # Centred, so the prefix sums lose less precision; SSE does not depend on the offset
+    centred = x - x.mean()
+    s1 = np.r_[0.0, np.cumsum(centred)]
+    s2 = np.r_[0.0, np.cumsum(centred * centred)]
+
+    def sse(j: np.ndarray, i: np.ndarray) -> np.ndarray:
+        count = i - j + 1
+        total = s1[i + 1] - s1[j]
+        return (s2[i + 1] - s2[j]) - total * total / count
+
+    index = np.arange(n)
+    cost = sse(np.zeros(n, dtype=np.int64), index)
+    starts_of = [np.zeros(n, dtype=np.int64)]
+    for m in range(1, k):
+        previous = np.r_[np.inf, cost]  # previous[j] = D[m-1][j-1]
+        layer = np.full(n, np.inf)
+        best = np.zeros(n, dtype=np.int64)
+        # Tasks: rows lo..hi whose best split lies within opt_lo..opt_hi
+        lo, hi = np.array([m]), np.array([n - 1])
+        opt_lo, opt_hi = np.array([m]), np.array([n - 1])
+        while lo.size:
+            mid = (lo + hi) // 2
+            first, last = np.maximum(opt_lo, m), np.minimum(opt_hi, mid)
+            lengths = last - first + 1
+            starts = np.r_[0, np.cumsum(lengths)[:-1]]
+            j = np.repeat(first - starts, lengths) + np.arange(lengths.sum())
+            i = np.repeat(mid, lengths)
+            candidates = previous[j] + sse(j, i)
+            pick = _segment_argmin(candidates, starts)
+            layer[mid] = candidates[starts + pick]
+            best[mid] = first + pick
+            left, right = lo <= mid - 1, mid + 1 <= hi
+            lo, hi, opt_lo, opt_hi = (
+                np.r_[lo[left], mid[right] + 1], np.r_[mid[left] - 1, hi[right]],
+                np.r_[opt_lo[left], best[mid][right]], np.r_[best[mid][left], opt_hi[right]],
+            )
+        cost = layer
+        starts_of.append(best)
+
+    # Walk the split points back from the last value
+    groups = np.empty(n, dtype=np.int64)
+    end = n - 1
+    for m in range(k - 1, -1, -1):
+        start = int(starts_of[m][end]) if m else 0
+        groups[start:end + 1] = m
+        end = start - 1
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = groups
+    return labels
+
+
+def _minibatch_tiers(values: np.ndarray, k: int) -> np.ndarray:
+    MiniBatchKMeans = warmup.load("sklearn.cluster").MiniBatchKMeans
+    model = MiniBatchKMeans(n_clusters=k, random_state=0, n_init=3, batch_size=8192).fit(values.reshape(-1, 1))
+    # Renumber clusters so 0 is the lowest centre
+    rank = np.argsort(np.argsort(model.cluster_centers_.ravel()))
+    return rank[model.labels_]
+
+
+def spending_tiers(values: np.ndarray, k: int = TIERS) -> np.ndarray:
+    """
+    Tier of each amount, 0 for the lowest; exact up to EXACT_MAX values, MiniBatchKMeans beyond.
+    """
+    if values.size > EXACT_MAX:
+        return _minibatch_tiers(values, min(k, int(np.unique(values).size)))
+    return natural_breaks(values, k)
+
+
+@timed("rank_expense_cuts")
+def rank_expense_cuts(items: Optional[SpendItems]) -> List[str]:
+    """
+    Cluster the user's spending into tiers and suggest monthly cuts per category, highest tier first and larger
+    savings first within a tier.
+    """
+    if items is None or not items.amounts.size:
+        return []
+    valid = np.isfinite(items.amounts) & (items.amounts > 0)
+    if not valid.any():
+        return []
+    amounts, months, categories = items.amounts[valid], items.months[valid], items.categories[valid]
+    tiers = spending_tiers(amounts)
+    top = int(tiers.max())
+    month_count = max(int(np.unique(months).size), 1)
+
+    # category -> [highest tier depth it reaches, monthly saving summed over the tiers it spends in]
+    cuts = {}
+    for depth, rate in enumerate(CUT_RATES):
+        tier = top - depth
+        if tier <= 0:
+            break
+        in_tier = tiers == tier
+        present, codes = np.unique(categories[in_tier], return_inverse=True)
+        monthly = np.bincount(codes, weights=amounts[in_tier], minlength=len(present)) / month_count
+        names = [items.labels[code] for code in present.tolist()]
+        # By name, so ties in the ranking below keep alphabetical order
+        for name, saving in sorted(zip(names, (monthly * rate).tolist())):
+            cuts.setdefault(name, [depth, 0.0])[1] += saving
+    ranked = sorted(cuts.items(), key=lambda item: (item[1][0], -item[1][1]))
+    return [f"Cut {name} by {saving:.2f} BDT" for name, (_, saving) in ranked[:MAX_CUT_SUGGESTIONS]]
@@ -0,0 +1,29 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Union
+from app.models.expense import Expense
+from app.models.records import ExpenseRecords, ExpenseRow
+
+
+class ExpenseSummary(NamedTuple):
+    total: float
+    count: int
+    category_totals: Dict[str, float]  # in order of first appearance
+    top_recent: Optional[ExpenseRow]  # first expense with the highest amount on or after the cutoff
+
+
+def summarize_expenses(expenses: Union[ExpenseRecords, List[Expense]], cutoff: datetime) -> ExpenseSummary:
+    """
+    Every statistic the expense suggestions need, from one set of array operations over the expense records.
+    """
+    records = ExpenseRecords.of(expenses)
+    amounts = records.amount
+    # bincount and cumsum add sequentially in input order, so totals match a Python loop bit for bit
+    category_totals = np.bincount(records.category, weights=amounts, minlength=len(records.categories))
+    total = float(np.cumsum(amounts)[-1]) if amounts.size else 0.0
+
+    recent = records.date >= np.datetime64(cutoff, "us").astype(np.int64)
+    top_recent = None
+    if recent.any():
+        top_recent = records.row(int(np.argmax(np.where(recent, amounts, -np.inf))))
+    return ExpenseSummary(total, len(records), dict(zip(records.categories, category_totals.tolist())), top_recent)
@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.models.savings import SavingsGoal
+from app.models.records import EntryRecords
+from app import warmup
+
+# Holt smoothing grid searched for every goal at once
+ALPHAS = np.array([0.2, 0.4, 0.6, 0.8, 0.95])
+BETAS = np.array([0.05, 0.1, 0.2, 0.4])
+GRID_ALPHA, GRID_BETA = (grid.ravel() for grid in np.meshgrid(ALPHAS, BETAS, indexing="ij"))
+DEFAULT_PARAMS = (0.6, 0.1)
+
+LONG_SERIES_MONTHS = 24  # Series at least this long are refit with statsmodels ARIMA
+CACHE_SIZE = 10000
+
+
+class MonthlySeries:
+    """
+    Month-end balances for a batch of goals, right-aligned in a (goals, months) matrix padded with NaN on the left.
+    Months without deposits carry the previous balance forward; goals without entries are a single point.
+    """
+
+    def __init__(self, goals: List[SavingsGoal]):
+        count = len(goals)
+        entries = EntryRecords(goals, "goal_entries", "amount", "entry_date")
+        rows, amounts = entries.owner, entries.amount
+        months = entries.date.view("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+
+        first = np.full(count, np.iinfo(np.int64).max)
+        last = np.full(count, np.iinfo(np.int64).min)
+        np.minimum.at(first, rows, months)
+        np.maximum.at(last, rows, months)
+        has_entries = np.bincount(rows, minlength=count) > 0
+        self.lengths = np.where(has_entries, last - first + 1, 1)
+
+        width = int(self.lengths.max()) if count else 0
+        offset = width - self.lengths
+        deposits = np.zeros((count, width))
+        if rows.size:
+            np.add.at(deposits, (rows, offset[rows] + months - first[rows]), amounts)
+        opening = np.array([goal.current_amount for goal in goals], dtype=np.float64) - deposits.sum(axis=1)
+        self.values = opening[:, None] + np.cumsum(deposits, axis=1)
+        self.values[np.arange(width)[None, :] < offset[:, None]] = np.nan
+
+    def row(self, index: int) -> np.ndarray:
+        return self.values[index, self.values.shape[1] - self.lengths[index]:]
+
+
+def _fingerprint(values: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).hexdigest()
+
+
+def fit_holt(values: np.ndarray, lengths: np.ndarray):
+    """
+    Fit Holt's linear trend model to every row of a right-aligned series matrix in one pass over time.
+    Each row tries the whole (alpha, beta) grid; the pair with the lowest one-step-ahead SSE wins.
+    Returns per-row (alpha, beta, level, trend).
+    """
+    rows, width = values.shape
+    start = width - lengths
+    alpha, beta = GRID_ALPHA[None, :], GRID_BETA[None, :]
+    level = np.zeros((rows, GRID_ALPHA.size))
+    trend = np.zeros_like(level)
+    sse = np.zeros_like(level)
+
+    for t in range(width):
+        y = values[:, t:t + 1]
+        first = (start == t)[:, None]
+        second = (start + 1 == t)[:, None]
+        later = (start + 1 < t)[:, None]
+
+        error = y - (level + trend)
+        sse = np.where(later, sse + error * error, sse)
+        smoothed = alpha * y + (1 - alpha) * (level + trend)
+        new_trend = np.where(later, beta * (smoothed - level) + (1 - beta) * trend, np.where(second, y - level, trend))
+        level = np.where(later, smoothed, np.where(first | second, y, level))
+        trend = np.where(first, 0.0, new_trend)
+
+    # Too short to score the grid: use the default smoothing pair
+    best = np.argmin(sse, axis=1)
+    best = np.where(lengths < 3, np.flatnonzero((GRID_ALPHA == DEFAULT_PARAMS[0]) & (GRID_BETA == DEFAULT_PARAMS[1]))[0], best)
+    pick = np.arange(rows)
+    return GRID_ALPHA[best], GRID_BETA[best], level[pick, best], trend[pick, best]
+
+
+def _fit_arima(series: np.ndarray) -> Optional[float]:
+    try:
+        ARIMA = warmup.load("statsmodels.tsa.arima.model").ARIMA
+        return float(ARIMA(series, order=(1, 1, 1)).fit().forecast(steps=1)[0])
+    except Exception:
+        return None
+
+
+class SavingsForecaster:
+    """
+    Batched one-month-ahead forecaster for goal balances with per-goal cached fits.
+    The cache is keyed by (owner, goal id), since goal ids are only unique per user, and an entry is
+    invalidated whenever that goal's series changes. Analyses on the thread pool share it under a lock.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[Optional[int], int], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: Tuple[Optional[int], int], fingerprint: str) -> Optional[float]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None or cached[0] != fingerprint:
+                return None
+            self._cache.move_to_end(key)
+            return cached[-1]
+
+    def _store(self, key: Tuple[Optional[int], int], fingerprint: str, params: tuple, forecast: float) -> None:
+        with self._lock:
+            self._cache[key] = (fingerprint, *params, forecast)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def params(self, goal_id: int, owner: Optional[int] = None) -> Optional[tuple]:
+        """
+        Cached (model, alpha, beta, level, trend) for a goal, if it has been fitted.
+        """
+        with self._lock:
+            cached = self._cache.get((owner, goal_id))
+        return cached[1:-1] if cached else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def forecast(self, goals: List[SavingsGoal], owner: Optional[int] = None) -> np.ndarray:
+        """
+        Next-month balance per goal of `owner` (None for goals sent without a user); NaN where the history
+        is too short to forecast (fewer than 2 months).
+        """
+        result = np.full(len(goals), np.nan)
+        if not goals:
+            return result
+        series = MonthlySeries(goals)
+        fingerprints = [_fingerprint(series.row(i)) for i in range(len(goals))]
+
+        misses = []
+        for i, goal in enumerate(goals):
+            if series.lengths[i] < 2:
+                continue
+            cached = self._lookup((owner, goal.id), fingerprints[i])
+            if cached is None:
+                misses.append(i)
+            else:
+                result[i] = cached
+        if not misses:
+            return result
+
+        misses = np.array(misses)
+        lengths = series.lengths[misses]
+        alpha, beta, level, trend = fit_holt(series.values[misses][:, -int(lengths.max()):], lengths)
+        for k, i in enumerate(misses.tolist()):
+            params = ("holt", float(alpha[k]), float(beta[k]), float(level[k]), float(trend[k]))
+            forecast = level[k] + trend[k]
+            if lengths[k] >= LONG_SERIES_MONTHS:
+                arima = _fit_arima(series.row(i))
+                if arima is not None:
+                    params, forecast = ("arima", None, None, None, None), arima
+            result[i] = forecast
+            self._store((owner, goals[i].id), fingerprints[i], params, float(forecast))
+        return result
+
+
+forecaster = SavingsForecaster()
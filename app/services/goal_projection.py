@@ -0,0 +1,121 @@
+import numpy as np
+from datetime import datetime
+from typing import List
+from app.models.savings import GoalProjection, SavingsGoal
+from app.models.records import EntryRecords
+from app.models.temporal import datetime64
+from app.metrics import timed
+
+AVG_DAYS_PER_MONTH = 365.2425 / 12
+# Goals with at least this many entries get a fitted contribution trend
+MIN_TREND_ENTRIES = 3
+# Completion dates further out than this are reported as never
+MAX_PROJECTION_DAYS = 100 * 365
+
+
+class GoalProjectionBatch:
+    """
+    Columnar projections for a batch of goals at one instant; every field is an array with one value per goal.
+
+    - remaining, days_left, required_monthly: what is left, the whole days until the end date (NaN without one)
+      and the monthly contribution that reaches the target by then
+    - trend_daily: slope of a least-squares line through each goal's cumulative entries (NaN when there are
+      fewer than MIN_TREND_ENTRIES entries, they all fall on one instant, or fit_trends is off)
+    - completion: when the goal is reached at that rate (NaT if never), shortfall: what is still missing at
+      the end date
+    """
+
+    def __init__(self, goals: List[SavingsGoal], now: datetime, fit_trends: bool = True):
+        self.goals = goals
+        count = len(goals)
+        now64 = np.datetime64(now, "us")
+        target = np.array([goal.target_amount for goal in goals], dtype=np.float64)
+        current = np.array([goal.current_amount for goal in goals], dtype=np.float64)
+        self.remaining = target - current
+        self.in_progress = np.array([goal.status == "In Progress" for goal in goals], dtype=bool)
+
+        end = datetime64([goal.end_dt for goal in goals]) if count else np.array([], dtype="datetime64[us]")
+        self.has_end = ~np.isnat(end)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Floor division, like timedelta.days
+            days = (end - now64) // np.timedelta64(1, "D")
+            self.days_left = np.where(self.has_end, days, np.nan)
+            self.required_monthly = np.where(
+                self.days_left > 0, np.maximum(self.remaining, 0) / (self.days_left / AVG_DAYS_PER_MONTH), np.nan
+            )
+
+        self.trend_daily = self._fit_trends(goals, count) if fit_trends else np.full(count, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            to_go = np.where(self.trend_daily > 0, np.maximum(self.remaining, 0) / self.trend_daily, np.nan)
+            to_go = np.where(to_go <= MAX_PROJECTION_DAYS, to_go, np.nan)
+            self.completion = np.where(np.isfinite(to_go), now64 + (to_go * 86_400e6).astype("timedelta64[us]"),
+                                       np.datetime64("NaT", "us"))
+            reachable = self.trend_daily * np.maximum(self.days_left, 0)
+            self.shortfall = np.where(np.isfinite(self.trend_daily) & self.has_end,
+                                      np.maximum(self.remaining - reachable, 0), np.nan)
+
+    @staticmethod
+    def _fit_trends(goals: List[SavingsGoal], count: int) -> np.ndarray:
+        """
+        Per-goal least squares of cumulative contributions on time, solved for every goal at once from
+        per-goal sums (n, Σt, Σy, Σt², Σty).
+        """
+        trend = np.full(count, np.nan)
+        entries = EntryRecords(goals, "goal_entries", "amount", "entry_date")
+        if not len(entries):
+            return trend
+        rows, amounts, dates = entries.owner, entries.amount, entries.date.view("datetime64[us]")
+
+        order = np.lexsort((dates, rows))
+        rows, amounts, dates = rows[order], amounts[order], dates[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        first = np.repeat(starts, np.diff(np.r_[starts, rows.size]))
+        # Cumulative contributions within each goal; time in days since the goal's first entry
+        running = np.cumsum(amounts)
+        y = running - running[first] + amounts[first]
+        t = (dates - dates[first]) / np.timedelta64(1, "D")
+
+        n = np.bincount(rows, minlength=count).astype(np.float64)
+        st = np.bincount(rows, weights=t, minlength=count)
+        sy = np.bincount(rows, weights=y, minlength=count)
+        stt = np.bincount(rows, weights=t * t, minlength=count)
+        sty = np.bincount(rows, weights=t * y, minlength=count)
+        denominator = n * stt - st * st
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (n * sty - st * sy) / denominator
+        fitted = (n >= MIN_TREND_ENTRIES) & (denominator > 1e-9 * np.maximum(n * stt, 1))
+        trend[fitted] = slope[fitted]
+        return trend
+
+    def projections(self, rows: np.ndarray) -> List[GoalProjection]:
+        """
+        GoalProjection models for the given rows; figures are rounded to cents and missing ones are None.
+        """
+        def values(array: np.ndarray) -> list:
+            picked = np.round(array[rows], 2)
+            return np.where(np.isfinite(picked), picked, None).tolist()
+
+        shortfall = values(self.shortfall)
+        completion = self.completion[rows]
+        dates = np.where(np.isnat(completion), None, np.datetime_as_string(completion, unit="D")).tolist()
+        days_left = np.where(self.has_end[rows], self.days_left[rows], None).tolist()
+        return [
+            GoalProjection(
+                goal_id=self.goals[row].id, title=self.goals[row].title, remaining=remaining,
+                days_left=None if days is None else int(days), required_monthly=required, trend_monthly=trend,
+                projected_completion=date, shortfall=short, on_track=None if short is None else short == 0,
+            )
+            for row, remaining, days, required, trend, date, short in zip(
+                rows.tolist(), np.round(self.remaining[rows], 2).tolist(), days_left, values(self.required_monthly),
+                values(self.trend_daily * AVG_DAYS_PER_MONTH), dates, shortfall,
+            )
+        ]
+
+
+@timed("project_goals")
+def project_goals(goals: List[SavingsGoal], now: datetime) -> List[GoalProjection]:
+    """
+    Projection for every in-progress goal.
+    """
+    batch = GoalProjectionBatch(goals, now)
+    return batch.projections(np.flatnonzero(batch.in_progress))
@@ -0,0 +1,154 @@
+import os
+import numpy as np
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+from app.models.savings import CompletionPercentile, GoalSimulation, SavingsGoal
+from app.models.records import EntryRecords
+from app.services.goal_projection import AVG_DAYS_PER_MONTH, MAX_PROJECTION_DAYS, GoalProjectionBatch
+from app.metrics import timed
+
+DEFAULT_PATHS = 10_000
+MAX_PATHS = 100_000
+DEFAULT_HORIZON_MONTHS = 120
+MAX_HORIZON_MONTHS = int(MAX_PROJECTION_DAYS / AVG_DAYS_PER_MONTH)
+DEFAULT_PERCENTILES = (10.0, 50.0, 90.0)
+MONTH_BLOCK = 12  # months simulated per step; paths that reached their target are not simulated further
+# Working memory per simulated path: a block of float64 running totals and "reached" flags, plus per-path state
+PATH_BYTES = MONTH_BLOCK * 9 + 48
+# Memory bound for the paths simulated at once; larger requests are simulated a chunk of goals at a time
+SIMULATION_CHUNK_BYTES = int(os.getenv("SIMULATION_CHUNK_BYTES", str(16 * 2**20)))
+
+
+def contribution_stats(goals: List[SavingsGoal], now: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and standard deviation of each goal's monthly contributions (NaN without past entries). Entries are
+    summed into months counted back from `now` up to the goal's first entry, so months without any count as zero.
+    """
+    count = len(goals)
+    mean, std = np.full(count, np.nan), np.full(count, np.nan)
+    entries = EntryRecords(goals, "goal_entries", "amount", "entry_date")
+    if not len(entries):
+        return mean, std
+    age = (np.datetime64(now, "us") - entries.date.view("datetime64[us]")) / np.timedelta64(1, "D") / AVG_DAYS_PER_MONTH
+    past = age >= 0
+    rows, amounts, month = entries.owner[past], entries.amount[past], age[past].astype(np.int64)
+
+    # One slot per goal and month of history, laid out goal after goal
+    months = np.zeros(count, dtype=np.int64)
+    np.maximum.at(months, rows, month + 1)
+    offset = np.cumsum(months) - months
+    totals = np.bincount(offset[rows] + month, weights=amounts, minlength=int(months.sum()))
+    owner = np.repeat(np.arange(count), months)
+    known = months > 0
+    total = np.bincount(owner, weights=totals, minlength=count)[known]
+    squares = np.bincount(owner, weights=totals * totals, minlength=count)[known]
+    mean[known] = total / months[known]
+    std[known] = np.sqrt(np.maximum(squares / months[known] - mean[known] ** 2, 0.0))
+    return mean, std
+
+
+def first_passage(mean: np.ndarray, std: np.ndarray, remaining: np.ndarray, paths: int, months: int,
+                  rng: np.random.Generator) -> np.ndarray:
+    """
+    Simulate `paths` paths of normal monthly contributions per goal and return, as a (goals, paths) array, the
+    fractional month at which each path's running total reaches `remaining` (inf if not within `months`).
+    All paths of all goals advance together, MONTH_BLOCK months at a time, and drop out once they reach the target.
+    """
+    alive = np.arange(len(mean) * paths)
+    passage = np.full(alive.size, np.inf)
+    total = np.zeros(alive.size)
+    for first in range(0, months, MONTH_BLOCK):
+        goal = alive // paths
+        running = rng.standard_normal((alive.size, min(MONTH_BLOCK, months - first)))
+        running *= std[goal, None]
+        running += mean[goal, None]
+        running[:, 0] += total
+        np.cumsum(running, axis=1, out=running)
+        target = remaining[goal]
+        reached = running >= target[:, None]
+        month = reached.argmax(axis=1)
+        index = np.arange(alive.size)
+        hit = reached[index, month]
+
+        rows, month = index[hit], month[hit]
+        after = running[rows, month]
+        before = np.where(month > 0, running[rows, month - 1], total[rows])
+        # Interpolate within the month in which the target is crossed
+        passage[alive[rows]] = first + month + (target[rows] - before) / (after - before)
+        alive, total = alive[~hit], running[~hit, -1]
+        if not alive.size:
+            break
+    return passage.reshape(len(mean), paths)
+
+
+@timed("simulate_goals")
+def simulate_goals(goals: List[SavingsGoal], now: datetime, paths: int = DEFAULT_PATHS, seed: Optional[int] = None,
+                   horizon_months: int = DEFAULT_HORIZON_MONTHS, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                   chunk_bytes: int = SIMULATION_CHUNK_BYTES) -> List[GoalSimulation]:
+    """
+    Monte Carlo attainment for every in-progress goal: the probability of reaching the target by the end
+    date and the dates by which the given percentiles of paths reach it. Contributions are drawn from a
+    normal distribution fitted to the goal's monthly history; with a `seed` the result is reproducible for
+    the same `chunk_bytes`. Every goal is simulated for at least `horizon_months`, or up to its end date if later.
+    """
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS}")
+    if not 1 <= horizon_months <= MAX_HORIZON_MONTHS:
+        raise ValueError(f"horizon_months must be between 1 and {MAX_HORIZON_MONTHS}")
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+
+    rows = np.flatnonzero(np.array([goal.status == "In Progress" for goal in goals], dtype=bool))
+    goals = [goals[i] for i in rows.tolist()]
+    batch = GoalProjectionBatch(goals, now, fit_trends=False)
+    mean, std = contribution_stats(goals, now)
+    months_to_end = batch.days_left / AVG_DAYS_PER_MONTH
+    simulated = np.flatnonzero((batch.remaining > 0) & np.isfinite(mean))
+    count = len(goals)
+
+    # Months until each percentile of paths completes; reached goals are done now, unknown ones stay NaN
+    completion = np.full((len(percentiles), count), np.nan)
+    probability = np.full(count, np.nan)
+    reached = batch.remaining <= 0
+    completion[:, reached] = 0.0
+    probability[reached] = 1.0
+    if simulated.size:
+        end = months_to_end[simulated]
+        months = int(min(max(horizon_months, np.ceil(np.nanmax(end, initial=0))), MAX_HORIZON_MONTHS))
+        rng = np.random.default_rng(seed)
+        # Whole goals per chunk, reduced to probabilities and percentiles before the next one is simulated
+        per_chunk = max(chunk_bytes // (paths * PATH_BYTES), 1)
+        for start in range(0, simulated.size, per_chunk):
+            rows, chunk_end = simulated[start:start + per_chunk], end[start:start + per_chunk]
+            passage = first_passage(mean[rows], std[rows], batch.remaining[rows], paths, months, rng)
+            by_end = (passage <= chunk_end[:, None]).mean(axis=1)
+            probability[rows] = np.where(np.isfinite(chunk_end), by_end, np.nan)
+            completion[:, rows] = np.percentile(passage, percentiles, axis=1, method="higher")
+    probability[~batch.has_end] = np.nan
+
+    now64 = np.datetime64(now, "us")
+    with np.errstate(invalid="ignore"):
+        finite = np.isfinite(completion)
+        offsets = np.where(finite, completion * AVG_DAYS_PER_MONTH * 86_400e6, 0).astype("timedelta64[us]")
+        dates = np.where(finite, np.datetime_as_string(now64 + offsets, unit="D"), None).tolist()
+    is_simulated = np.zeros(count, dtype=bool)
+    is_simulated[simulated] = True
+
+    def values(array: np.ndarray, digits: int) -> list:
+        rounded = np.round(array, digits)
+        return np.where(np.isfinite(rounded), rounded, None).tolist()
+
+    # Goals with no history to simulate get no completion percentiles
+    return [
+        GoalSimulation(
+            goal_id=goal.id, title=goal.title, remaining=remaining, paths=paths if sampled else 0,
+            monthly_mean=mean_, monthly_std=std_, probability=chance,
+            completion=[] if not (sampled or done) else [
+                CompletionPercentile(percentile=p, date=dates[j][i]) for j, p in enumerate(percentiles)
+            ],
+        )
+        for i, (goal, remaining, sampled, done, mean_, std_, chance) in enumerate(zip(
+            goals, np.round(batch.remaining, 2).tolist(), is_simulated.tolist(), reached.tolist(),
+            values(mean, 2), values(std, 2), values(probability, 4),
+        ))
+    ]
@@ -1,20 +1,98 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
 from fastapi import HTTPException
+from app import clock
 from app.models.income import Income, IncomeSuggestionResponse, IncomeSuggestions
-from typing import List
+from app.models.records import IncomeRecords
+from app.services.income_series import MIN_HISTORY, Anomaly, IncomeSeries, period_of
+from typing import Dict, List, NamedTuple, Optional, Set, Union
+from app.metrics import timed
+
+# Anomaly score at or below which a month counts as unusually low
+LOW_SCORE = -2.5
+# Rolling volatility above which income counts as irregular
+HIGH_VOLATILITY = 0.35
+# Monthly decline, as a fraction of the rolling mean, beyond which income counts as falling
+DECLINE = 0.02
+
+
+class IncomeTrend(NamedTuple):
+    history: int  # complete months in the series
+    window: int  # complete months in the rolling window
+    mean: float  # rolling statistics over the window ending at the last complete month
+    volatility: float
+    slope: float  # BDT per month
+    low: Optional[Anomaly]  # the lowest-scoring month in the window, if at or below LOW_SCORE
+
+
+class IncomeTotals(NamedTuple):
+    total: float
+    by_source: Dict[str, float]  # in order of first appearance
+    by_month: Dict[int, float]  # months since 1970-01, in order of first appearance
+    categories: Set[str]
+    trend: Optional[IncomeTrend] = None
+
+
+def income_trend(series: IncomeSeries, now: datetime) -> Optional[IncomeTrend]:
+    """
+    Rolling statistics of all sources together over the months before the one `now` falls in, which is
+    still incomplete; None without a complete month.
+    """
+    stop = min(period_of(now), series.end)
+    if stop <= series.start:
+        return None
+    stats = series.stats(stop - series.window, stop)
+    low = stats.lowest()
+    return IncomeTrend(stop - series.start, len(stats.periods), float(stats.mean[0, -1]),
+                       float(stats.volatility[0, -1]), float(stats.trend[0, -1]),
+                       low if low is not None and low.score <= LOW_SCORE and low.expected > 0 else None)
+
+
+def income_totals(incomes: Union[IncomeRecords, List[Income]], now: Optional[datetime] = None) -> IncomeTotals:
+    """
+    Totals by source and month, and the monthly trend as of `now` (the clock by default).
+    """
+    records = IncomeRecords.of(incomes)
+    amounts = records.amount
+    # bincount and cumsum add sequentially in input order, so totals match a Python loop bit for bit
+    total_income = float(np.cumsum(amounts)[-1]) if amounts.size else 0.0
+    by_source = np.bincount(records.source, weights=amounts, minlength=len(records.sources))
+    months = records.date.view("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+    month_codes, month_values = pd.factorize(months, sort=False)
+    by_month = np.bincount(month_codes, weights=amounts, minlength=len(month_values))
+    trend = income_trend(IncomeSeries.from_records(records), now or clock.now())
+    return IncomeTotals(total_income, dict(zip(records.sources, by_source.tolist())),
+                        dict(zip(month_values.tolist(), by_month.tolist())), set(records.categories), trend)
+
 
 class IncomeService:
     @staticmethod
-    def get_income_suggestions(incomes: List[Income]) -> IncomeSuggestions:
+    @timed("IncomeService.get_income_suggestions")
+    def get_income_suggestions(incomes: Union[IncomeRecords, List[Income]]) -> IncomeSuggestions:
         """
         Generate personalized financial suggestions based on income data.
         Returns a list of suggestions wrapped in IncomeSuggestions model.
         """
+        if not incomes:
+            return IncomeSuggestions(suggestions=[IncomeSuggestionResponse(suggestion="No income data provided for analysis.")])
+        try:
+            totals = income_totals(incomes)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating income suggestions: {str(e)}")
+        return IncomeService.suggestions_from_totals(totals)
+
+    @staticmethod
+    @timed("IncomeService.suggestions_from_totals")
+    def suggestions_from_totals(totals: IncomeTotals) -> IncomeSuggestions:
+        """
+        Income suggestions from per-source and per-month totals (computed from a request or kept by the feature store).
+        """
         try:
-            if not incomes:
+            if not totals.by_source:
                 return IncomeSuggestions(suggestions=[IncomeSuggestionResponse(suggestion="No income data provided for analysis.")])
 
-            # Calculate total income
-            total_income = sum(income.amount for income in incomes)
+            total_income = totals.total
             if total_income == 0:
                 return IncomeSuggestions(suggestions=[IncomeSuggestionResponse(suggestion="Total income is zero. No analysis possible.")])
 
@@ -22,10 +100,7 @@ class IncomeService:
             suggestions = []
 
             # 1. Diversification Suggestion
-            source_distribution = {}
-            for income in incomes:
-                source_distribution[income.source] = source_distribution.get(income.source, 0) + income.amount
-
+            source_distribution = totals.by_source
             threshold = 0.7  # 70% threshold for diversification
             for source, amount in source_distribution.items():
                 percentage = amount / total_income
@@ -53,32 +128,59 @@ class IncomeService:
             ))
 
             # 3. Income Boost Recommendation
-            monthly_income = {}
-            for income in incomes:
-                month = income.date.split(" ")[0][:7]  # Extract YYYY-MM
-                monthly_income[month] = monthly_income.get(month, 0) + income.amount
-
-            if monthly_income:
-                min_month = min(monthly_income, key=monthly_income.get)
-                min_amount = monthly_income[min_month]
-                avg_income = sum(monthly_income.values()) / len(monthly_income)
-
-                if min_amount < avg_income * 0.5:
-                    categories = set(income.category for income in incomes)
-                    suggestions_list = []
-                    if "Employment" in categories:
-                        suggestions_list.append("Negotiate a raise with your employer.")
-                    if "Self-Employment" in categories:
-                        suggestions_list.append("Take on additional freelance projects or upskill in a high-demand area like AI/ML.")
-                    suggestions_list.append("Explore side gigs such as tutoring or online content creation.")
+            trend = totals.trend
+            if trend is None or trend.history <= MIN_HISTORY:
+                # Too short a history to score months against: compare the lowest month with the average
+                monthly_income = totals.by_month
+                if monthly_income:
+                    min_month = min(monthly_income, key=monthly_income.get)
+                    min_amount = monthly_income[min_month]
+                    avg_income = sum(monthly_income.values()) / len(monthly_income)
+
+                    if min_amount < avg_income * 0.5:
+                        suggestions.append(IncomeSuggestionResponse(
+                            suggestion=f"Your income in {np.datetime64(min_month, 'M')} was low at BDT{min_amount:.2f}. "
+                            f"Consider {_boost_ideas(totals.categories)} to boost earnings."
+                        ))
+                    else:
+                        suggestions.append(IncomeSuggestionResponse(suggestion="Your income is stable across months. No immediate boost needed!"))
+            else:
+                stable = True
+                if trend.low is not None:
+                    low = trend.low
                     suggestions.append(IncomeSuggestionResponse(
-                        suggestion=f"Your income in {min_month} was low at BDT{min_amount:.2f}. "
-                        f"Consider {', '.join(suggestions_list[:-1])} or {suggestions_list[-1]} to boost earnings."
+                        suggestion=f"Your income in {np.datetime64(low.period, 'M')} was BDT{low.value:.2f}, "
+                        f"{(1 - low.value / low.expected) * 100:.0f}% below the BDT{low.expected:.2f} expected from your "
+                        f"income history. Consider {_boost_ideas(totals.categories)} to boost earnings."
                     ))
-                else:
+                    stable = False
+                if trend.slope < -DECLINE * trend.mean:
+                    suggestions.append(IncomeSuggestionResponse(
+                        suggestion=f"Your income has been falling by about BDT{-trend.slope:.2f} a month over the last "
+                        f"{trend.window} months. Check whether one of your sources is shrinking before it affects your savings."
+                    ))
+                    stable = False
+                if trend.volatility > HIGH_VOLATILITY:
+                    suggestions.append(IncomeSuggestionResponse(
+                        suggestion=f"Your monthly income varies by {trend.volatility * 100:.0f}% around its average of "
+                        f"BDT{trend.mean:.2f} over the last {trend.window} months. Keep a buffer of about "
+                        f"BDT{trend.mean * 3:.2f}, three months of income, to get through lean months."
+                    ))
+                    stable = False
+                if stable:
                     suggestions.append(IncomeSuggestionResponse(suggestion="Your income is stable across months. No immediate boost needed!"))
 
             return IncomeSuggestions(suggestions=suggestions)
 
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error generating income suggestions: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Error generating income suggestions: {str(e)}")
+
+
+def _boost_ideas(categories: Set[str]) -> str:
+    ideas = []
+    if "Employment" in categories:
+        ideas.append("Negotiate a raise with your employer.")
+    if "Self-Employment" in categories:
+        ideas.append("Take on additional freelance projects or upskill in a high-demand area like AI/ML.")
+    ideas.append("Explore side gigs such as tutoring or online content creation.")
+    return f"{', '.join(ideas[:-1])} or {ideas[-1]}"
@@ -0,0 +1,230 @@
+"""
+Dense income time series per source, with rolling statistics kept up to date as income arrives.
+
+Income is bucketed into periods (calendar months, or weeks starting on Monday) with bincount into a matrix of
+one row per source plus row 0 for all sources together, and one column per period from the first to the last
+(periods without income are zero). Next to it the series keeps running aggregates per row: prefix sums of y,
+y^2 and t*y, each period's residual against the mean of the periods before it, and the sum of the residuals of
+the same season (month of the year) in earlier years. From those, the rolling mean, volatility (standard
+deviation over mean) and least-squares trend of any window are O(1) per period, and an anomaly score compares
+each period with its trailing mean plus its seasonal offset, in trailing standard deviations.
+
+Extending the series updates the aggregates from the earliest period it touches, so appending a new period
+costs O(sources) however long the history is, and late income for an old period O(periods since).
+"""
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence
+import numpy as np
+from app.models.records import IncomeRecords, Labels
+
+# Periods in the rolling window and in a seasonal cycle, by frequency; weekly seasons are approximate
+WINDOW = {"M": 12, "W": 13}
+SEASON = {"M": 12, "W": 52}
+# Periods of history a period needs before it is scored, and earlier seasons before its seasonal offset counts
+MIN_HISTORY = 3
+MIN_SEASONS = 2
+# Smallest scale an anomaly score divides by, as a fraction of the trailing mean (a perfectly steady history
+# would otherwise score any change as infinite)
+SCALE_FLOOR = 0.05
+
+_DAY_US = 86_400 * 10**6
+_MONDAY_US = 3 * _DAY_US  # weeks count from Monday 1969-12-29
+
+
+def periods_of(stamps: np.ndarray, freq: str = "M") -> np.ndarray:
+    """
+    Period numbers of int64 microsecond timestamps: months since 1970-01, or weeks since 1969-12-29.
+    """
+    if freq == "M":
+        return stamps.view("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+    return (stamps + _MONDAY_US) // (7 * _DAY_US)
+
+
+def period_of(instant: datetime, freq: str = "M") -> int:
+    return int(periods_of(np.array([np.datetime64(instant, "us").astype(np.int64)]), freq)[0])
+
+
+def period_label(period: int, freq: str = "M") -> str:
+    """
+    YYYY-MM for a month, or the date of its Monday for a week.
+    """
+    if freq == "M":
+        return str(np.datetime64(period, "M"))
+    return str(np.datetime64(period * 7 - 3, "D"))
+
+
+class Anomaly(NamedTuple):
+    period: int
+    value: float
+    expected: float
+    score: float
+
+
+class SeriesStats(NamedTuple):
+    periods: np.ndarray  # period numbers
+    sources: List[str]  # rows 1 on; row 0 is all sources together
+    values: np.ndarray  # rows x periods
+    mean: np.ndarray  # rolling mean over the window ending at each period
+    volatility: np.ndarray  # rolling standard deviation over rolling mean
+    trend: np.ndarray  # least-squares slope over the window ending at each period, per period
+    expected: np.ndarray  # mean of the window before each period plus its seasonal offset, once MIN_SEASONS back
+    score: np.ndarray  # (value - expected) in trailing standard deviations; NaN before MIN_HISTORY periods
+
+    def lowest(self, row: int = 0) -> Optional[Anomaly]:
+        """
+        The period of `row` with the lowest score, if any is scored.
+        """
+        scores = self.score[row]
+        if np.isnan(scores).all():
+            return None
+        column = int(np.nanargmin(scores))
+        return Anomaly(int(self.periods[column]), float(self.values[row, column]),
+                       float(self.expected[row, column]), float(scores[column]))
+
+
+class IncomeSeries:
+    """
+    Income per source and period with running aggregates; see the module docstring.
+    """
+
+    def __init__(self, freq: str = "M", window: Optional[int] = None):
+        if freq not in SEASON:
+            raise ValueError(f"Unknown frequency {freq!r}; expected one of {sorted(SEASON)}")
+        self.freq = freq
+        self.window = window or WINDOW[freq]
+        if self.window < MIN_HISTORY:
+            raise ValueError(f"The window must be at least {MIN_HISTORY} periods")
+        self.season = SEASON[freq]
+        self.sources = Labels()
+        self.start = 0  # period number of column 0
+        self.length = 0
+        self.values = np.zeros((1, 0))
+        self.sums = np.zeros((3, 1, 1))  # prefix sums of y, y^2 and t*y: column t sums the periods before t
+        self.residual = np.zeros((1, 0))  # value minus trailing mean, 0 for unscored periods
+        self.seasonal = np.zeros((1, 0))  # residuals of the same season in earlier years, summed
+
+    @classmethod
+    def from_records(cls, records: IncomeRecords, freq: str = "M", window: Optional[int] = None) -> "IncomeSeries":
+        return cls(freq, window).extend_records(records)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def end(self) -> int:
+        """
+        Period number after the last one.
+        """
+        return self.start + self.length
+
+    def extend_records(self, records: IncomeRecords) -> "IncomeSeries":
+        return self.extend(periods_of(records.date, self.freq), records.source, records.sources, records.amount)
+
+    def extend(self, periods: np.ndarray, sources: np.ndarray, labels: Sequence[str],
+               amounts: np.ndarray) -> "IncomeSeries":
+        """
+        Add income: period numbers, source codes into `labels` and amounts, one entry each. Returns the series.
+        """
+        if not len(periods):
+            return self
+        rows = 1 + self.sources.encode(list(labels))[sources]
+        first, last = int(periods.min()), int(periods.max())
+        shift = self.start - first if self.length and first < self.start else 0
+        start = first if not self.length else min(first, self.start)
+        previous = self.length + shift
+        self._reserve(len(self.sources.index) + 1, max(previous, last - start + 1), shift)
+        self.start, self.length = start, max(previous, last - start + 1)
+
+        columns = periods - start
+        lo = first - start
+        width = self.length - lo
+        by_source = np.bincount(rows * width + (columns - lo), weights=amounts, minlength=self.values.shape[0] * width)
+        self.values[:, lo:self.length] += by_source.reshape(-1, width)
+        # The all-sources row adds each period's amounts in input order
+        self.values[0, lo:self.length] += np.bincount(columns - lo, weights=amounts, minlength=width)
+        self._refresh(0 if shift else min(lo, previous))
+        return self
+
+    def _reserve(self, rows: int, length: int, shift: int) -> None:
+        """
+        Room for `rows` rows and `length` columns, with the existing columns moved `shift` to the right.
+        Columns grow to twice what is needed, so appends stay amortized O(1).
+        """
+        have_rows, capacity = self.values.shape
+        if rows <= have_rows and length <= capacity and not shift:
+            return
+        shape = (max(rows, have_rows), capacity if length <= capacity else max(2 * length, 16))
+        used, moved = slice(0, self.length), slice(shift, shift + self.length)
+        values, residual, seasonal = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        sums = np.zeros((3, shape[0], shape[1] + 1))
+        values[:have_rows, moved] = self.values[:, used]
+        residual[:have_rows, moved] = self.residual[:, used]
+        seasonal[:have_rows, moved] = self.seasonal[:, used]
+        sums[:, :have_rows, shift:shift + self.length + 1] = self.sums[:, :, :self.length + 1]
+        self.values, self.residual, self.seasonal, self.sums = values, residual, seasonal, sums
+
+    def _refresh(self, first: int) -> None:
+        """
+        Recompute the aggregates of columns `first` on from the values and the aggregates before them.
+        """
+        n = self.length
+        y = self.values[:, first:n]
+        t = np.arange(first, n)
+        for sums, terms in zip(self.sums, (y, y * y, y * t)):
+            # One cumsum from the running total, so appending in pieces gives the same sums as one batch
+            sums[:, first:n + 1] = np.cumsum(np.concatenate([sums[:, first:first + 1], terms], axis=1), axis=1)
+        mean, _ = self._moments(t - np.minimum(self.window, t), t)
+        self.residual[:, first:n] = np.where(t >= MIN_HISTORY, y - mean, 0.0)
+        for block in range(first, n, self.season):
+            target = np.arange(block, min(block + self.season, n))
+            source = target - self.season
+            earlier = source >= 0
+            source = np.where(earlier, source, 0)
+            self.seasonal[:, target] = np.where(earlier, self.seasonal[:, source] + self.residual[:, source], 0.0)
+
+    def _moments(self, lo: np.ndarray, hi: np.ndarray):
+        """
+        Mean and standard deviation of columns lo..hi-1 per row; NaN for empty ranges.
+        """
+        count = hi - lo
+        s1, s2 = self.sums[0], self.sums[1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (s1[:, hi] - s1[:, lo]) / count
+            variance = (s2[:, hi] - s2[:, lo]) / count - mean * mean
+        return mean, np.sqrt(np.maximum(variance, 0.0))
+
+    def stats(self, start: Optional[int] = None, stop: Optional[int] = None) -> SeriesStats:
+        """
+        Rolling statistics for the periods from `start` up to `stop` (period numbers, clipped to the series);
+        O(rows) per period returned.
+        """
+        lo = max(self.start if start is None else start, self.start) - self.start
+        hi = min(self.end if stop is None else stop, self.end) - self.start
+        t = np.arange(lo, max(hi, lo))
+        y = self.values[:, t]
+
+        window_lo = np.maximum(t + 1 - self.window, 0)
+        mean, std = self._moments(window_lo, t + 1)
+        count = t + 1 - window_lo
+        sum_t = count * (window_lo + t) / 2
+        sum_tt = _square_sums(t + 1) - _square_sums(window_lo)
+        s1, s3 = self.sums[0], self.sums[2]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            volatility = std / mean
+            trend = ((count * (s3[:, t + 1] - s3[:, window_lo]) - sum_t * (s1[:, t + 1] - s1[:, window_lo]))
+                     / (count * sum_tt - sum_t * sum_t))
+
+        trailing_mean, trailing_std = self._moments(t - np.minimum(self.window, t), t)
+        seen = np.maximum((t - MIN_HISTORY) // self.season, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = trailing_mean + np.where(seen >= MIN_SEASONS, self.seasonal[:, t] / np.maximum(seen, 1), 0.0)
+            scale = np.maximum(trailing_std, SCALE_FLOOR * np.abs(trailing_mean))
+            score = np.where((t >= MIN_HISTORY) & (scale > 0), (y - expected) / scale, np.nan)
+        return SeriesStats(t + self.start, self.sources.values(), y, mean, volatility, trend, expected, score)
+
+
+def _square_sums(n: np.ndarray) -> np.ndarray:
+    """
+    0^2 + 1^2 + ... + (n - 1)^2.
+    """
+    return (n - 1) * n * (2 * n - 1) / 6
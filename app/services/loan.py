@@ -1,12 +1,14 @@
 from app.models.loan import Loan, LoanSuggestion, Suggestion, LoanPayment, PaymentFrequency
 from typing import List
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from app.metrics import timed
+from app import clock
 
+@timed("generate_payment_optimization")
 def generate_payment_optimization(loans: List[Loan]) -> List[LoanSuggestion]:
-    now = datetime.now().replace(tzinfo=None)  # Naive local time
+    now = clock.now()
     six_months_ago = now.replace(hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=6)
-    recent_loans = [loan for loan in loans if datetime.fromisoformat(loan.start_date.replace("Z", "").replace("+00:00", "")).replace(hour=0, minute=0, second=0, microsecond=0) >= six_months_ago]
+    recent_loans = [loan for loan in loans if loan.start_dt.replace(hour=0, minute=0, second=0, microsecond=0) >= six_months_ago]
 
     loan_suggestions = []
 
@@ -14,7 +16,7 @@ def generate_payment_optimization(loans: List[Loan]) -> List[LoanSuggestion]:
         suggestions = []
         remaining_principal = loan.due if loan.due else (loan.principal_amount - (loan.total_paid or 0.0))
         if loan.payments:
-            last_payment = max(loan.payments, key=lambda p: datetime.fromisoformat(p.payment_date.replace("Z", "").replace("+00:00", "")))
+            last_payment = max(loan.payments, key=lambda p: p.payment_dt)
             remaining_principal = last_payment.remaining_balance
 
         payments_per_year = 52 if loan.payment_frequency == PaymentFrequency.WEEKLY else 26 if loan.payment_frequency == PaymentFrequency.BIWEEKLY else 12
@@ -0,0 +1,197 @@
+from operator import attrgetter
+import numpy as np
+from app.models.loan import Loan, LoanSuggestion, Suggestion, PaymentFrequency
+from typing import Dict, List, Sequence
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from app.metrics import timed
+from app import clock
+from app.models.records import EntryRecords
+from app.models.temporal import column
+
+PAYMENTS_PER_YEAR = {
+    PaymentFrequency.WEEKLY: 52,
+    PaymentFrequency.BIWEEKLY: 26,
+    PaymentFrequency.MONTHLY: 12,
+}
+HIGH_INTEREST_THRESHOLD = 10.0
+
+_FLOAT_FIELDS = attrgetter("principal_amount", "total_paid", "due", "interest_rate")
+COLUMNS = ("principal_amount", "total_paid", "due", "interest_rate", "remaining_payments", "payments_per_year",
+           "payment_owner", "payment_date", "payment_balance")
+
+
+class LoanBatch:
+    """
+    Columnar view over a list of loans: one NumPy array per field used by the optimizer.
+    """
+
+    def __init__(self, loans: List[Loan]):
+        self.loans = loans
+        # One pass over the models, then split the (n, 4) float block into columns
+        numeric = np.array(list(map(_FLOAT_FIELDS, loans)), dtype=np.float64).reshape(len(loans), 4)
+        self.principal_amount, self.total_paid, self.due, self.interest_rate = numeric.T
+        self.remaining_payments = np.array([loan.remaining_payments for loan in loans], dtype=np.int64)
+        self.payments_per_year = np.array(
+            [PAYMENTS_PER_YEAR[loan.payment_frequency] for loan in loans], dtype=np.float64
+        )
+
+        # Every payment as parallel arrays keyed by the owning loan's row
+        payments = EntryRecords(loans, "payments", "remaining_balance", "payment_date")
+        self.payment_owner = payments.owner
+        self.payment_date = payments.date.view("datetime64[us]")
+        self.payment_balance = payments.amount
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "LoanBatch":
+        """
+        A batch over loans that arrive as column arrays (see app.services.columnar) instead of models;
+        `columns` holds one array per name in COLUMNS.
+        """
+        batch = cls.__new__(cls)
+        batch.loans = None
+        for name in COLUMNS:
+            setattr(batch, name, columns[name])
+        return batch
+
+    def remaining_principal(self) -> np.ndarray:
+        """
+        Remaining principal per loan: the balance of the latest payment if any, otherwise due / principal - paid.
+        """
+        remaining = np.where(self.due != 0, self.due, self.principal_amount - self.total_paid)
+        if self.payment_owner.size:
+            # Sort by loan, then date, then reverse position so the last row of each group is the
+            # earliest-listed payment among those with the latest date (same tie-break as max()).
+            position = np.arange(self.payment_owner.size)
+            order = np.lexsort((-position, self.payment_date, self.payment_owner))
+            owner_sorted = self.payment_owner[order]
+            group_end = np.flatnonzero(np.r_[owner_sorted[1:] != owner_sorted[:-1], True])
+            remaining[owner_sorted[group_end]] = self.payment_balance[order[group_end]]
+        return remaining
+
+
+def six_month_window_start(now: datetime) -> datetime:
+    """
+    Midnight six months before `now`; loans starting before this are not analysed.
+    """
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) - relativedelta(months=6)
+
+
+def recent_rows(start_dates: np.ndarray, now: datetime) -> np.ndarray:
+    """
+    Positions of the start dates (datetime64) on or after the six-month window's first day.
+    """
+    return np.flatnonzero(start_dates.astype("datetime64[D]") >= np.datetime64(six_month_window_start(now), "D"))
+
+
+def select_recent_loans(loans: List[Loan], now: datetime) -> List[Loan]:
+    if not loans:
+        return []
+    return [loans[i] for i in recent_rows(column(loans, "start_date"), now).tolist()]
+
+
+def zero_divisions(batch: LoanBatch, remaining_principal: np.ndarray) -> np.ndarray:
+    """
+    Rows on which the scalar optimizer divides by zero: no remaining payments, or a high-interest loan with
+    nothing left to pay (its increased payment is zero).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        increased_payment = remaining_principal / batch.remaining_payments * 1.2
+    return (batch.remaining_payments == 0) | ((batch.interest_rate > HIGH_INTEREST_THRESHOLD) & (increased_payment == 0))
+
+
+@timed("generate_payment_optimization_batch")
+def generate_payment_optimization_batch(loans: List[Loan]) -> List[LoanSuggestion]:
+    """
+    Vectorized equivalent of generate_payment_optimization: all figures are computed as
+    whole-batch array operations and suggestion text is only formatted at the end.
+    """
+    recent_loans = select_recent_loans(loans, clock.now())
+    if not recent_loans:
+        return []
+    return payment_suggestions(LoanBatch(recent_loans), recent_loans)
+
+
+def payment_suggestions(batch: LoanBatch, loans: Sequence) -> List[LoanSuggestion]:
+    """
+    Suggestions for every loan in `batch`. loans[i] describes row i for the suggestion text and is only read
+    for rows that get suggestions; a Loan or anything with the same attributes.
+    """
+    remaining_principal = batch.remaining_principal()
+    remaining_payments = batch.remaining_payments
+    payments_per_year = batch.payments_per_year
+    interest_rate = batch.interest_rate
+
+    # Keep the scalar path's failure mode instead of silently producing inf/nan
+    if np.any(zero_divisions(batch, remaining_principal)):
+        raise ZeroDivisionError("float division by zero")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current_payment = remaining_principal / remaining_payments
+        monthly_interest = (interest_rate / 100) * remaining_principal / 12
+        periods_per_month = payments_per_year / 12
+
+        # Suggestion 1: Increase Payment for High-Interest Loans
+        increase = interest_rate > HIGH_INTEREST_THRESHOLD
+        increased_payment = current_payment * 1.2
+        new_term = remaining_principal / increased_payment * (12 / payments_per_year)
+        interest_saved = (remaining_payments - new_term) * (monthly_interest / periods_per_month)
+
+        # Suggestion 2: Switch to Monthly Payments (if BiWeekly or Weekly)
+        monthly_payment = remaining_principal / (remaining_payments * periods_per_month)
+        new_term_monthly = remaining_principal / monthly_payment
+        interest_saved_monthly = (remaining_payments - new_term_monthly) * (monthly_interest / periods_per_month)
+        frequency = (payments_per_year != 12) & (remaining_principal > 0) & (interest_saved_monthly > 0)
+
+        # Suggestion 3: Early Payment if Few Remaining Payments
+        early = (remaining_payments <= 3) & (remaining_principal > 0)
+        total_to_pay = remaining_principal + (monthly_interest * remaining_payments / periods_per_month)
+
+    rows = np.flatnonzero(increase | frequency | early).tolist()
+    increase, frequency, early = increase.tolist(), frequency.tolist(), early.tolist()
+    increased_payment, interest_saved, new_term = increased_payment.tolist(), interest_saved.tolist(), new_term.tolist()
+    monthly_payment, interest_saved_monthly = monthly_payment.tolist(), interest_saved_monthly.tolist()
+    new_term_monthly, total_to_pay = new_term_monthly.tolist(), total_to_pay.tolist()
+
+    loan_suggestions = []
+    for i in rows:
+        loan = loans[i]
+        period = loan.payment_frequency.value.lower()
+        suggestions = []
+        if increase[i]:
+            suggestions.append(
+                Suggestion(
+                    text=f"Increase {period} payment for {loan.lender_name} loan by 20% to {increased_payment[i]:.2f} BDT. "
+                         f"This could save approximately {interest_saved[i]:.2f} BDT in interest and reduce the term by "
+                         f"{int(loan.remaining_payments - new_term[i])} {period} periods.",
+                    type="increase"
+                )
+            )
+        if frequency[i]:
+            suggestions.append(
+                Suggestion(
+                    text=f"Switch {loan.lender_name} loan to monthly payments of {monthly_payment[i]:.2f} BDT. "
+                         f"This could save {interest_saved_monthly[i]:.2f} BDT in interest and reduce the term by "
+                         f"{int(loan.remaining_payments - new_term_monthly[i])} months.",
+                    type="frequency"
+                )
+            )
+        if early[i]:
+            suggestions.append(
+                Suggestion(
+                    text=f"Pay off {loan.lender_name} loan early with {total_to_pay[i]:.2f} BDT to clear the remaining {loan.remaining_payments} {period} payments.",
+                    type="early"
+                )
+            )
+        loan_suggestions.append(
+            LoanSuggestion(
+                loan_id=loan.id,
+                lender_name=loan.lender_name,
+                loan_type=loan.loan_type,
+                start_date=loan.start_date,
+                end_date=loan.end_date,
+                suggestions=suggestions
+            )
+        )
+
+    return loan_suggestions
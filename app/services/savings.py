@@ -1,56 +1,63 @@
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.cluster import KMeans
-from statsmodels.tsa.arima.model import ARIMA
-from datetime import datetime
+from typing import Optional
+from app.services.expense_clustering import SpendItems, rank_expense_cuts, spend_items
+from app.services.forecasting import forecaster
+from app.services.goal_projection import GoalProjectionBatch
+from app.metrics import timed
+from app import clock
 
-def predict_monthly_savings(goals):
+@timed("predict_monthly_savings")
+def predict_monthly_savings(goals, batch: Optional[GoalProjectionBatch] = None):
+    if batch is None:
+        batch = GoalProjectionBatch(goals, clock.now(), fit_trends=False)
+    # The figure reported since the first release is remaining / 30
+    with np.errstate(invalid="ignore"):
+        monthly_savings = batch.remaining / 30
+        show = batch.in_progress & (batch.days_left > 0) & np.isfinite(monthly_savings) & (monthly_savings > 0)
+    return [
+        f"Increase monthly savings for {goals[i].title} by {monthly_savings[i]:.2f} BDT"
+        for i in np.flatnonzero(show).tolist()
+    ]
+
+@timed("suggest_expense_cuts")
+def suggest_expense_cuts(spending: Optional[SpendItems] = None):
+    # Cuts come from clustering the user's own spending; without any there is nothing to suggest
+    return rank_expense_cuts(spending)
+
+def suggest_expense_cuts_for(expenses):
+    """
+    Expense cuts from individual expenses rather than stored totals.
+    """
+    return suggest_expense_cuts(spend_items(expenses)) if expenses else []
+
+@timed("forecast_savings_growth")
+def forecast_savings_growth(goals, owner: Optional[int] = None):
     suggestions = []
-    current_date = datetime(2025, 7, 13, 14, 36)  # Updated to current date and time: 02:36 PM +06
-    for goal in goals:
-        if not goal.end_date or goal.status != "In Progress":
-            continue
-        remaining = goal.target_amount - goal.current_amount
-        try:
-            end_date = np.datetime64(goal.end_date)
-            days_left = (end_date - np.datetime64(current_date)).astype('timedelta64[D]').astype(int)
-            if days_left <= 0:
-                continue
-            X = np.array([[days_left]]).reshape(-1, 1)
-            y = np.array([remaining])
-            model = LinearRegression().fit(X, y)
-            monthly_savings = model.predict([[30]])[0] / 30
-            if monthly_savings > 0:
-                suggestions.append(f"Increase monthly savings for {goal.title} by {monthly_savings:.2f} BDT")
-        except ValueError:
+    in_progress = [goal for goal in goals if goal.status == "In Progress"]
+    # One batched fit for every goal; cached per owner and goal id until its entries change
+    forecasts = forecaster.forecast(in_progress, owner)
+    for goal, forecast in zip(in_progress, forecasts.tolist()):
+        if np.isnan(forecast):
             continue
+        automated_savings = forecast + 1000
+        if automated_savings > goal.current_amount:
+            suggestions.append(f"Automate {automated_savings - goal.current_amount:.2f} BDT monthly savings/side income for {goal.title}")
     return suggestions
 
-def suggest_expense_cuts(goals):
-    # Mock expense data with numeric amounts and categories
-    expenses = np.array([[700.0, "Leisure"], [3000.25, "Household"]], dtype=object)
-    kmeans = KMeans(n_clusters=2, random_state=0).fit(expenses[:, 0].reshape(-1, 1).astype(float))
-    labels = kmeans.labels_
+def generate_savings_suggestions(goals, spending: Optional[SpendItems] = None,
+                                 batch: Optional[GoalProjectionBatch] = None, owner: Optional[int] = None):
+    """
+    All savings suggestions for a request, in endpoint order: monthly savings, expense cuts, automation.
+    `owner` is the user the goals belong to, if known.
+    """
     suggestions = []
-    for i in range(len(labels)):
-        if labels[i] == 1:
-            amount = float(expenses[i][0])  # Ensure amount is treated as float
-            category = expenses[i][1]
-            suggestions.append(f"Cut {category} by {amount * 0.2:.2f} BDT")
+    suggestions.extend(predict_monthly_savings(goals, batch))
+    suggestions.extend(suggest_expense_cuts(spending))
+    suggestions.extend(forecast_savings_growth(goals, owner))
     return suggestions
 
-def forecast_savings_growth(goals):
-    suggestions = []
-    for goal in goals:
-        if goal.status != "In Progress":
-            continue
-        history = [goal.current_amount - sum(e.amount for e in goal.goal_entries)]
-        try:
-            model = ARIMA(history, order=(1, 1, 1))
-            model_fit = model.fit()
-            automated_savings = model_fit.forecast(steps=1)[0] + 1000
-            if automated_savings > goal.current_amount:
-                suggestions.append(f"Automate {automated_savings - goal.current_amount:.2f} BDT monthly savings/side income for {goal.title}")
-        except Exception:
-            continue
-    return suggestions
\ No newline at end of file
+def generate_savings_suggestions_for(goals, expenses, owner: Optional[int] = None):
+    """
+    All savings suggestions, with expense cuts clustered from individual expenses sent alongside the goals.
+    """
+    return generate_savings_suggestions(goals, spend_items(expenses) if expenses else None, None, owner)
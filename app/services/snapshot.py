@@ -0,0 +1,212 @@
+"""
+Every domain's suggestions for one user from a single request: the user's records are aggregated once into a
+FinancialSnapshot (dates parsed, monthly buckets and category totals built), then the income, expense, loan,
+savings and budget analyses and the cross-domain advice run concurrently against it.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+from app import clock
+from app.executor import run_analysis, run_concurrently
+from app.models.loan import Loan, LoanStatus
+from app.models.records import ExpenseRecords
+from app.models.snapshot import AllSuggestions, CrossDomainAdvice, SavingsSuggestions, UserSnapshot
+from app.services.budget import BudgetService
+from app.services.budget_rules import PRIORITY_ORDER, BudgetFrame
+from app.services.expense import ExpenseService, recent_cutoff
+from app.services.expense_clustering import spend_items
+from app.services.expense_engine import summarize_expenses
+from app.services.goal_projection import GoalProjectionBatch
+from app.services.income import IncomeService, income_totals
+from app.services.loan_batch import LoanBatch, generate_payment_optimization_batch
+from app.services.savings import generate_savings_suggestions
+
+# Annual return (%) assumed for money set aside for goals, against which loan rates are weighed
+SAVINGS_RETURN_RATE = 6.0
+
+
+class ActiveLoans(NamedTuple):
+    loans: List[Loan]
+    balance: np.ndarray  # remaining principal
+    rate: np.ndarray  # annual interest rate, %
+
+
+def _detail(e: Exception) -> str:
+    return str(getattr(e, "detail", e))
+
+
+class FinancialSnapshot:
+    """
+    One user's records aggregated once at one instant; the analyses only read it. A domain with no records is
+    None, and so is one whose records fail to aggregate, with the reason in `errors`.
+    """
+
+    def __init__(self, data: UserSnapshot, now: datetime):
+        self.data = data
+        self.now = now
+        self.errors: Dict[str, str] = {}
+        self.records = {
+            "income": data.incomes, "expense": data.expenses, "loan": data.loans,
+            "savings": data.goals, "budget": data.budgets,
+        }
+        self.income = self._aggregate("income", lambda: income_totals(data.incomes, now))
+        self.expense, self.spending, self.expense_months = self._aggregate("expense", self._expenses) or (None, None, 0)
+        self.loans = self._aggregate("loan", self._active_loans)
+        self.goals = self._aggregate("savings", lambda: GoalProjectionBatch(data.goals, now))
+        self.budgets = self._aggregate("budget", lambda: BudgetFrame(data.budgets))
+
+    def _aggregate(self, domain: str, build: Callable):
+        if not self.records[domain]:
+            return None
+        try:
+            return build()
+        except Exception as e:
+            self.errors[domain] = _detail(e)
+            return None
+
+    def _expenses(self):
+        # One set of records feeds both the summary and the monthly spending items
+        records = ExpenseRecords.from_models(self.data.expenses)
+        spending = spend_items(records)
+        summary = summarize_expenses(records, recent_cutoff(self.now))
+        return summary, spending, int(np.unique(spending.months).size)
+
+    def _active_loans(self) -> ActiveLoans:
+        active = [loan for loan in self.data.loans if loan.status == LoanStatus.ACTIVE]
+        batch = LoanBatch(active)
+        return ActiveLoans(active, batch.remaining_principal(), batch.interest_rate)
+
+    def available(self, domain: str) -> bool:
+        return bool(self.records[domain]) and domain not in self.errors
+
+    def monthly_income(self) -> Optional[float]:
+        if self.income is None or not self.income.by_month:
+            return None
+        return sum(self.income.by_month.values()) / len(self.income.by_month)
+
+    def monthly_spending(self) -> Optional[float]:
+        if self.expense is None or not self.expense_months:
+            return None
+        return self.expense.total / self.expense_months
+
+
+def _income(snapshot: FinancialSnapshot):
+    return IncomeService.suggestions_from_totals(snapshot.income)
+
+
+def _expense(snapshot: FinancialSnapshot):
+    return ExpenseService.suggestions_from_summary(snapshot.expense)
+
+
+def _loan(snapshot: FinancialSnapshot):
+    return generate_payment_optimization_batch(snapshot.data.loans)
+
+
+def _savings(snapshot: FinancialSnapshot):
+    # Expense cuts come from clustering the snapshot's own expenses
+    return SavingsSuggestions(
+        suggestions=generate_savings_suggestions(snapshot.data.goals, snapshot.spending, snapshot.goals,
+                                                 snapshot.data.user_id)
+    )
+
+
+def _budget(snapshot: FinancialSnapshot):
+    return BudgetService.suggestions_from_frame(snapshot.budgets)
+
+
+# Response field -> analysis over the snapshot
+DOMAIN_ANALYSES = {"income": _income, "expense": _expense, "loan": _loan, "savings": _savings, "budget": _budget}
+
+
+def cross_domain_advice(snapshot: FinancialSnapshot) -> List[CrossDomainAdvice]:
+    """
+    Advice no single domain can give: spending against income, goal contributions against the monthly surplus,
+    loan prepayment against saving, and monthly budgets against income.
+    """
+    advice = []
+    income, spending = snapshot.monthly_income(), snapshot.monthly_spending()
+    surplus = income - spending if income is not None and spending is not None else None
+
+    goal_need, goals_behind, has_goals = 0.0, 0, False
+    if snapshot.goals is not None:
+        in_progress = snapshot.goals.in_progress
+        has_goals = bool(in_progress.any())
+        goal_need = float(np.nansum(snapshot.goals.required_monthly[in_progress]))
+        goals_behind = int(np.count_nonzero(snapshot.goals.shortfall[in_progress] > 0))
+
+    if surplus is not None and surplus <= 0:
+        advice.append(CrossDomainAdvice(
+            title="Spending Exceeds Income",
+            description=f"Average monthly spending of {spending:.2f} BDT is above your average monthly income of "
+                        f"{income:.2f} BDT. Close the gap before committing money to goals or extra loan payments.",
+            priority="High", domains=["income", "expense"],
+        ))
+    elif surplus is not None and goal_need > surplus:
+        totals = snapshot.expense.category_totals
+        largest = max(totals, key=totals.get)
+        advice.append(CrossDomainAdvice(
+            title="Goals Need More Than Your Surplus",
+            description=f"Your goals need {goal_need:.2f} BDT a month to finish on time, but income exceeds spending "
+                        f"by only {surplus:.2f} BDT. Extend goal deadlines or trim {largest}, your largest spending category.",
+            priority="High", domains=["income", "expense", "savings"],
+        ))
+
+    loans = snapshot.loans
+    if loans is not None and np.any(loans.balance > 0):
+        row = int(np.argmax(np.where(loans.balance > 0, loans.rate, -np.inf)))
+        loan, rate, balance = loans.loans[row], float(loans.rate[row]), float(loans.balance[row])
+        spare = None if surplus is None else surplus - goal_need
+        if rate > SAVINGS_RETURN_RATE:
+            description = (f"{loan.lender_name} charges {rate:.2f}% a year on {balance:.2f} BDT, more than the "
+                           f"~{SAVINGS_RETURN_RATE:.0f}% savings earn: every 1000 BDT prepaid saves about "
+                           f"{rate * 10:.2f} BDT of interest a year.")
+            if spare is not None and spare > 0:
+                description += f" After funding your goals, put the spare {spare:.2f} BDT a month toward this loan."
+            elif has_goals:
+                description += " Fund goals with fixed deadlines first, then prepay this loan before adding to open-ended goals."
+            advice.append(CrossDomainAdvice(
+                title=f"Prepay {loan.lender_name} Before Extra Saving", description=description,
+                priority="Medium", domains=["loan", "savings"] if surplus is None else ["loan", "savings", "income", "expense"],
+            ))
+        elif has_goals:
+            behind = f" {goals_behind} of your goals are behind schedule." if goals_behind else ""
+            advice.append(CrossDomainAdvice(
+                title=f"Favor Savings Goals Over Prepaying {loan.lender_name}",
+                description=f"{loan.lender_name} charges only {rate:.2f}% a year, below the ~{SAVINGS_RETURN_RATE:.0f}% "
+                            f"savings earn. Keep to its scheduled payments and put extra money toward your goals.{behind}",
+                priority="Low", domains=["loan", "savings"],
+            ))
+
+    if snapshot.budgets is not None and income is not None:
+        monthly = snapshot.budgets["type"] == "Monthly"
+        planned = float(snapshot.budgets["total_amount"][monthly].sum())
+        if planned > income:
+            advice.append(CrossDomainAdvice(
+                title="Monthly Budgets Exceed Income",
+                description=f"Your monthly budgets add up to {planned:.2f} BDT against an average monthly income of "
+                            f"{income:.2f} BDT. Lower some budgets so they can all be met.",
+                priority="Medium", domains=["budget", "income"],
+            ))
+
+    advice.sort(key=lambda item: PRIORITY_ORDER[item.priority])
+    return advice
+
+
+async def suggest_all(data: UserSnapshot, now: datetime) -> AllSuggestions:
+    """
+    Build the snapshot once, then run every domain's analysis and the cross-domain advice on it concurrently.
+    A failing domain is reported under `errors` without failing the others.
+    """
+    with clock.pinned(now):
+        snapshot = await run_analysis(FinancialSnapshot, data, now)
+        domains = [domain for domain in DOMAIN_ANALYSES if snapshot.available(domain)]
+        calls = [(DOMAIN_ANALYSES[domain], (snapshot,)) for domain in domains]
+        results = await run_concurrently(calls + [(cross_domain_advice, (snapshot,))])
+
+    response = AllSuggestions(errors=dict(snapshot.errors))
+    for field, result in zip(domains + ["cross_domain"], results):
+        if isinstance(result, Exception):
+            response.errors[field] = _detail(result)
+        else:
+            setattr(response, field, result)
+    return response
@@ -0,0 +1,91 @@
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# How the scientific stack is loaded:
+#   eager      - import everything before the server accepts requests
+#   lazy       - import on the first call that needs it (default)
+#   background - lazy, plus a background thread pre-warms once the server is ready
+STARTUP_MODE = os.getenv("SCIENTIFIC_STACK_MODE", "lazy").lower()
+
+HEAVY_MODULES = (
+    "sklearn.cluster",
+    "statsmodels.tsa.arima.model",
+)
+
+PROCESS_STARTED = time.time()
+# Most routes whose first request is recorded; keys are route templates, so this only guards against surprises
+FIRST_REQUEST_ROUTES_MAX = 256
+
+_lock = threading.Lock()
+_import_seconds: Dict[str, dict] = {}
+_first_request_seconds: Dict[str, float] = {}
+_ready_at: Optional[float] = None
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def load(module_name: str, trigger: str = "request"):
+    """
+    Import a heavy module on first use and record how long it took and what triggered it.
+    """
+    # import_module (not a bare sys.modules lookup) waits for a half-finished import on another thread
+    already_loaded = module_name in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if not already_loaded:
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _import_seconds.setdefault(module_name, {"seconds": round(elapsed, 6), "trigger": trigger})
+    return module
+
+
+def warm_up(trigger: str = "background") -> None:
+    for module_name in HEAVY_MODULES:
+        load(module_name, trigger=trigger)
+
+
+def start_background_warmup() -> threading.Thread:
+    global _warmup_thread
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="scientific-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def on_startup() -> None:
+    """
+    Apply STARTUP_MODE. Called from the application lifespan before requests are served.
+    """
+    global _ready_at
+    if STARTUP_MODE == "eager":
+        warm_up(trigger="startup")
+    elif STARTUP_MODE == "background":
+        start_background_warmup()
+    _ready_at = time.time()
+
+
+def record_request(route: str, seconds: float) -> None:
+    """
+    Record the first request to `route`, a method and route template such as "GET /jobs/{job_id}".
+    """
+    if route in _first_request_seconds:
+        return
+    with _lock:
+        if len(_first_request_seconds) < FIRST_REQUEST_ROUTES_MAX:
+            _first_request_seconds.setdefault(route, round(seconds, 6))
+
+
+def startup_metrics() -> dict:
+    with _lock:
+        return {
+            "mode": STARTUP_MODE,
+            "ready_seconds": round(_ready_at - PROCESS_STARTED, 6) if _ready_at else None,
+            "warmup_running": bool(_warmup_thread and _warmup_thread.is_alive()),
+            "imports": dict(_import_seconds),
+            "pending_imports": [m for m in HEAVY_MODULES if m not in sys.modules],
+            "first_request_seconds": dict(_first_request_seconds),
+        }
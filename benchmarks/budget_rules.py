@@ -0,0 +1,92 @@
+"""
+Budget rules over many users: the former per-user Python scans, the rule engine called once per user, and one
+engine pass over every user's budgets (BudgetService.get_budget_suggestions_by_user). A second table scales the
+rule count by repeating the built-in rules.
+
+Usage: python -m benchmarks.budget_rules [--users 100 1000 10000] [--budgets-per-user 6] [--json PATH]
+"""
+import argparse
+import gc
+import time
+from app import metrics
+from app.models.budget import Budget, BudgetSuggestion
+from app.models.temporal import is_epoch_placeholder
+from app.services.budget import BudgetService
+from app.services.budget_rules import BUDGET_RULES, BudgetFrame, RuleEngine
+from benchmarks.generators import make_budgets
+from benchmarks.results import write_results
+
+
+def legacy_analyze(budgets):
+    """
+    analyze_budgeting_behavior as it was (three list scans, truncated to 3).
+    """
+    suggestions = []
+    if any(is_epoch_placeholder(b.end_dt) for b in budgets if b.type == "Annually"):
+        suggestions.append(BudgetSuggestion(title="Adjust Annual Budget End Dates", description="...", priority="High"))
+    if [b for b in budgets if "Savings" in b.title and b.remaining > b.total_amount * 0.5]:
+        suggestions.append(BudgetSuggestion(title="Increase Monthly Savings", description="...", priority="Medium"))
+    if [b for b in budgets if b.type == "Monthly" and b.remaining / b.total_amount < 0.5]:
+        suggestions.append(BudgetSuggestion(title="Create Monthly Expense Reserve", description="...", priority="Medium"))
+    return suggestions[:3]
+
+
+def make_users(users: int, per_user: int) -> dict:
+    by_user = {}
+    for user in range(users):
+        by_user[user] = [Budget.model_validate(b) for b in make_budgets(per_user, user_id=user, seed=user)]
+        for budget in by_user[user]:
+            budget.end_dt  # parse up front, so every case starts from the same warm models
+    return by_user
+
+
+def timed_run(fn) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main(user_counts: list[int], per_user: int, output: str) -> None:
+    metrics.METRICS_ENABLED = False  # time the rules, not the metric updates
+    results = []
+    print(f"{'case':<30} {'users':>7} {'budgets':>8} {'rules':>6} {'best (s)':>10} {'budgets/s':>12}")
+
+    def record(name, users, budgets, rules, fn):
+        best = min(timed_run(fn) for _ in range(3))
+        results.append({"name": f"{name}/{users}/{rules}", "case": name, "users": users, "budgets": budgets,
+                        "rules": rules, "best_s": best, "budgets_per_s": budgets / best})
+        print(f"{name:<30} {users:>7} {budgets:>8} {rules:>6} {best:>10.4f} {budgets / best:>12.0f}")
+
+    for users in user_counts:
+        by_user = make_users(users, per_user)
+        everything = [b for budgets in by_user.values() for b in budgets]
+        core = RuleEngine(BUDGET_RULES[:3])
+        record("legacy per user (3 rules)", users, len(everything), 3,
+               lambda: [legacy_analyze(budgets) for budgets in by_user.values()])
+        record("engine per user (3 rules)", users, len(everything), 3,
+               lambda: [core.evaluate(BudgetFrame(budgets))[0] for budgets in by_user.values()])
+        record("engine per user", users, len(everything), len(BUDGET_RULES),
+               lambda: [BudgetService.get_budget_suggestions(budgets) for budgets in by_user.values()])
+        record("engine one pass (3 rules)", users, len(everything), 3,
+               lambda: core.evaluate(BudgetFrame(everything, by_user=True)))
+        record("engine one pass", users, len(everything), len(BUDGET_RULES),
+               lambda: BudgetService.get_budget_suggestions_by_user(everything))
+
+    users = user_counts[-1]
+    everything = [b for budgets in make_users(users, per_user).values() for b in budgets]
+    for copies in (2, 6, 10):
+        rules = [rule._replace(name=f"{rule.name}_{i}") for i in range(copies) for rule in BUDGET_RULES]
+        many = RuleEngine(rules)
+        record("engine one pass (more rules)", users, len(everything), len(rules),
+               lambda: many.evaluate(BudgetFrame(everything, by_user=True)))
+    write_results("budget_rules", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--budgets-per-user", type=int, default=6)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.users, args.budgets_per_user, args.output)
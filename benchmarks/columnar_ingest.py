@@ -0,0 +1,120 @@
+"""
+Columnar uploads against nested JSON for bulk loan and expense analysis: the same users' loans (with their
+payments) and expenses sent as NDJSON to /bulk/suggestions and as a zip of flat tables to /columnar/suggestions
+(CSV, plus Parquet when pyarrow is installed), end to end in process. Results are checked to be identical.
+
+Usage: python -m benchmarks.columnar_ingest [--users 10 100 1000] [--loans 8] [--expenses 300] [--repeat 3] [--json PATH]
+"""
+import argparse
+import asyncio
+import gc
+import io
+import json
+import random
+import time
+import zipfile
+from typing import List
+import httpx
+import pandas as pd
+from app.cache import response_cache
+from benchmarks.generators import AS_OF, make_expenses, make_loans
+from benchmarks.results import write_results
+
+HEADERS = {"x-as-of": AS_OF.isoformat()}
+
+
+def make_users(users: int, loans_per_user: int, expenses_per_user: int, seed: int = 0):
+    """
+    Loans (with payments, loan ids unique across users) and expenses for `users` users.
+    """
+    rng = random.Random(seed)
+    loans, expenses = [], []
+    for user in range(1, users + 1):
+        for loan in make_loans(rng.randint(1, loans_per_user), user_id=user, seed=seed + user):
+            loan["id"] = len(loans) + 1
+            for payment in loan["payments"] or []:
+                payment["loan_id"] = loan["id"]
+            loans.append(loan)
+        expenses += make_expenses(rng.randint(1, expenses_per_user), user_id=user, seed=seed + user)
+    return loans, expenses
+
+
+def ndjson_body(loans: List[dict], expenses: List[dict]) -> bytes:
+    records = [{**loan, "domain": "loan"} for loan in loans] + [{**expense, "domain": "expense"} for expense in expenses]
+    records.sort(key=lambda record: record["user_id"])  # stable: each user's loans, then expenses
+    return "\n".join(map(json.dumps, records)).encode()
+
+
+def zip_body(loans: List[dict], expenses: List[dict], fmt: str) -> bytes:
+    tables = {
+        "loans": pd.DataFrame([{k: v for k, v in loan.items() if k != "payments"} for loan in loans]),
+        "payments": pd.DataFrame([payment for loan in loans for payment in loan["payments"] or []]),
+        "expenses": pd.DataFrame(expenses),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, frame in tables.items():
+            if fmt == "csv":
+                archive.writestr(f"{name}.csv", frame.to_csv(index=False))
+            else:
+                archive.writestr(f"{name}.parquet", frame.to_parquet(index=False))
+    return buffer.getvalue()
+
+
+def results(text: str) -> dict:
+    lines = [json.loads(line) for line in text.splitlines()]
+    return {(line["user_id"], line["domain"]): line for line in lines if "summary" not in line}
+
+
+async def timed_post(client: httpx.AsyncClient, path: str, body: bytes, content_type: str, repeat: int):
+    best, response = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        response = await client.post(path, content=body, headers={**HEADERS, "content-type": content_type})
+        response.raise_for_status()
+        best = min(best, time.perf_counter() - started)
+    return best, response.text
+
+
+async def run(users_list: List[int], loans_per_user: int, expenses_per_user: int, repeat: int) -> List[dict]:
+    from main import app
+    response_cache.backend = None
+    try:
+        import pyarrow  # noqa: F401
+        formats = ["csv", "parquet"]
+    except ImportError:
+        formats = ["csv"]
+    rows = []
+    print(f"{'users':>6} {'records':>8} {'format':>8} {'MB':>7} {'seconds':>8} {'speedup':>8}")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            for users in users_list:
+                loans, expenses = make_users(users, loans_per_user, expenses_per_user, seed=users)
+                records = len(loans) + sum(len(loan["payments"] or []) for loan in loans) + len(expenses)
+                body = ndjson_body(loans, expenses)
+                json_s, json_text = await timed_post(client, "/bulk/suggestions", body, "application/x-ndjson", repeat)
+                rows.append({"name": f"columnar_ingest/{users}/json", "users": users, "records": records,
+                             "format": "json", "bytes": len(body), "seconds": json_s})
+                print(f"{users:>6} {records:>8} {'json':>8} {len(body) / 2**20:>7.2f} {json_s:>8.3f} {'1.00x':>8}")
+                for fmt in formats:
+                    upload = zip_body(loans, expenses, fmt)
+                    seconds, text = await timed_post(client, "/columnar/suggestions", upload, "application/zip", repeat)
+                    assert results(text) == results(json_text), f"{fmt} results differ from the JSON path"
+                    rows.append({"name": f"columnar_ingest/{users}/{fmt}", "users": users, "records": records,
+                                 "format": fmt, "bytes": len(upload), "seconds": seconds, "speedup": json_s / seconds})
+                    print(f"{users:>6} {records:>8} {fmt:>8} {len(upload) / 2**20:>7.2f} {seconds:>8.3f} "
+                          f"{json_s / seconds:>7.2f}x")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--loans", type=int, default=8, help="most loans per user")
+    parser.add_argument("--expenses", type=int, default=300, help="most expenses per user")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    write_results("columnar_ingest", asyncio.run(run(args.users, args.loans, args.expenses, args.repeat)), args.output)
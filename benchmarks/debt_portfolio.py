@@ -0,0 +1,97 @@
+"""
+Portfolio debt plan latency against loan count and horizon: plan_debt_repayment for the avalanche, snowball
+and optimal strategies together (with and without the allocation schedule), and a scalar month-by-month
+loop for one strategy as a reference.
+
+Usage: python -m benchmarks.debt_portfolio [--sizes 10 100 500 1000] [--years 30] [--budget-factor 1.02]
+       [--scalar-max 100] [--json PATH]
+"""
+import argparse
+import gc
+import random
+import time
+from app import clock
+from app.models.loan import Loan
+from app.services.loan_batch import PAYMENTS_PER_YEAR
+from app.services.debt_portfolio import DebtPortfolio, plan_debt_repayment, BALANCE_EPSILON
+from benchmarks.generators import AS_OF, make_loans
+from benchmarks.results import write_results
+
+def make_portfolio(count: int, years: int, seed: int = 0) -> list:
+    """
+    `count` active loans with remaining terms of one year up to `years`.
+    """
+    rng = random.Random(seed)
+    loans = [Loan(**loan) for loan in make_loans(count, seed=seed)]
+    for loan in loans:
+        loan.status = "Active"
+        loan.remaining_payments = rng.randint(1, years) * PAYMENTS_PER_YEAR[loan.payment_frequency]
+        loan.number_of_payments = max(loan.number_of_payments, loan.remaining_payments)
+    return loans
+
+
+def scalar_avalanche(portfolio: DebtPortfolio, budget: float) -> float:
+    """
+    Avalanche as a plain loop over months and loans; returns total interest.
+    """
+    order = sorted(range(len(portfolio.loans)), key=lambda i: (-portfolio.interest_rate[i], portfolio.balance[i]))
+    owed, rate, minimum = portfolio.balance.tolist(), portfolio.monthly_rate.tolist(), portfolio.minimum.tolist()
+    total = 0.0
+    while any(balance > 0 for balance in owed):
+        extra = budget
+        for i in range(len(owed)):
+            if owed[i] > 0:
+                interest = owed[i] * rate[i]
+                total += interest
+                owed[i] += interest
+                paid = min(minimum[i], owed[i])
+                owed[i] -= paid
+                extra -= paid
+        for i in order:
+            paid = min(max(extra, 0.0), owed[i])
+            owed[i] -= paid
+            extra -= paid
+            if owed[i] <= BALANCE_EPSILON:
+                owed[i] = 0.0
+    return total
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(sizes, years: int, budget_factor: float, scalar_max: int, output: str) -> None:
+    results = []
+    print(f"{'loans':>6} {'months':>7} {'plan (s)':>9} {'no schedule (s)':>16} {'scalar 1 strategy (s)':>22}")
+    with clock.pinned(AS_OF):
+        for size in sizes:
+            loans = make_portfolio(size, years, seed=size)
+            portfolio = DebtPortfolio(loans)
+            budget = float(portfolio.minimum.sum()) * budget_factor
+            plan = plan_debt_repayment(loans, budget)
+            months = max(strategy.months for strategy in plan.strategies)
+            full = best_of(plan_debt_repayment, loans, budget)
+            bare = best_of(plan_debt_repayment, loans, budget, ("avalanche", "snowball", "optimal"), False)
+            scalar = best_of(scalar_avalanche, portfolio, budget, repeat=1) if size <= scalar_max else None
+            results.append({"name": f"debt_portfolio/{size}", "loans": size, "months": months, "plan_s": full,
+                            "no_schedule_s": bare, "scalar_avalanche_s": scalar})
+            scalar_text = f"{scalar:>22.4f}" if scalar is not None else f"{'-':>22}"
+            print(f"{size:>6} {months:>7} {full:>9.4f} {bare:>16.4f} {scalar_text}")
+    write_results("debt_portfolio", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1_000])
+    parser.add_argument("--years", type=int, default=30, help="longest remaining loan term")
+    parser.add_argument("--budget-factor", type=float, default=1.02, help="monthly budget over the minimum payments")
+    parser.add_argument("--scalar-max", type=int, default=100, help="largest portfolio for the scalar reference")
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.sizes, args.years, args.budget_factor, args.scalar_max, args.output)
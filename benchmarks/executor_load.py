@@ -0,0 +1,63 @@
+"""
+Load test: tail latency of /health while heavy /savings/suggestions/ requests saturate the analysis pool.
+
+Usage: python -m benchmarks.executor_load [inline|thread|process ...]
+"""
+import asyncio
+import sys
+import time
+import httpx
+from app import executor
+from main import app
+
+GOALS = [
+    {
+        "id": i, "title": f"Goal {i}", "target_amount": 100000, "current_amount": 1000 + i,
+        "start_date": "2025-01-01", "end_date": "2026-12-31", "status": "In Progress", "goal_entries": [],
+    }
+    for i in range(400)
+]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+async def heavy_loop(client: httpx.AsyncClient, stop: asyncio.Event, statuses: list) -> None:
+    while not stop.is_set():
+        response = await client.post("/savings/suggestions/", json=GOALS)
+        statuses.append(response.status_code)
+        if response.status_code == 503:
+            await asyncio.sleep(0.05)  # honour backpressure like a real client would
+
+
+async def run(kind: str, heavy_clients: int = 8, probes: int = 200) -> None:
+    executor.pool = executor.AnalysisPool(kind=kind, workers=2, max_pending=4)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=120) as client:
+        await client.post("/savings/suggestions/", json=GOALS[:1])  # load sklearn outside the measurement
+        stop, statuses = asyncio.Event(), []
+        heavy = [asyncio.create_task(heavy_loop(client, stop, statuses)) for _ in range(heavy_clients)]
+        # Latency is measured from each probe's scheduled send time, so time spent waiting
+        # for a blocked event loop counts against it (no coordinated omission)
+        latencies = []
+        interval = 0.01
+        first = time.perf_counter()
+        for k in range(probes):
+            scheduled = first + k * interval
+            await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+            await client.get("/health")
+            latencies.append(time.perf_counter() - scheduled)
+        stop.set()
+        await asyncio.gather(*heavy)
+    executor.pool.shutdown()
+    rejected = sum(1 for s in statuses if s == 503)
+    print(f"{kind:>8}  /health p50 {percentile(latencies, 0.5) * 1000:8.2f} ms  "
+          f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms  "
+          f"savings ok {statuses.count(200):4d}  rejected(503) {rejected:4d}")
+
+
+if __name__ == "__main__":
+    for kind in sys.argv[1:] or ["inline", "thread", "process"]:
+        asyncio.run(run(kind))
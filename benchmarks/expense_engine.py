@@ -0,0 +1,107 @@
+"""
+Compare expense suggestion generation against the previous multi-pass implementation.
+
+Usage: python -m benchmarks.expense_engine [sizes...]
+"""
+import gc
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from app import clock
+from app.models.expense import Expense, ExpenseSuggestions, ExpenseSuggestionResponse
+from app.models.records import ExpenseRecords
+from app.services.expense import ExpenseService
+from app.services import expense_engine
+
+CATEGORIES = ["Food", "Travel", "Utilities", "Household", "Leisure", "Health", "Education"]
+
+
+def make_expenses(count: int, seed: int = 7) -> list[Expense]:
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [
+        Expense(
+            id=i,
+            title=f"Expense {i % 50}",
+            amount=round(rng.lognormvariate(6, 1.2), 2),
+            category=rng.choice(CATEGORIES),
+            date=(start + timedelta(minutes=rng.randint(0, 60 * 24 * 600))).strftime("%Y-%m-%d %H:%M:%S"),
+            created_at="2025-05-04 01:03:05",
+            updated_at="2025-05-04 01:03:05",
+            user_id=1,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_suggestions(expenses):
+    """The pre-engine implementation, kept here as the reference for equality and timing."""
+    total_expenses = sum(expense.amount for expense in expenses)
+    suggestions = []
+    recent_expenses = [e for e in expenses if datetime.strptime(e.date, "%Y-%m-%d %H:%M:%S") >= datetime(2025, 6, 1)]
+    if recent_expenses:
+        high_expense = max(recent_expenses, key=lambda x: x.amount)
+        if high_expense.amount > 5000:
+            suggestions.append(ExpenseSuggestionResponse(
+                suggestion=f"Your highest recent expense was BDT {high_expense.amount:.2f} on {high_expense.title} "
+                f"in the {high_expense.category} category. Consider reducing discretionary spending in this area "
+                f"to save approximately BDT{high_expense.amount * 0.2:.2f} monthly."
+            ))
+    category_totals = {}
+    for expense in expenses:
+        category_totals[expense.category] = category_totals.get(expense.category, 0) + expense.amount
+    dominant_category = max(category_totals.items(), key=lambda x: x[1])[0]
+    if category_totals[dominant_category] / total_expenses > 0.3:
+        suggestions.append(ExpenseSuggestionResponse(
+            suggestion=f"Your spending is heavily weighted toward {dominant_category} ({(category_totals[dominant_category] / total_expenses * 100):.1f}%). "
+            f"Review and adjust your budget to balance spending across categories."
+        ))
+    utilities_total = sum(e.amount for e in expenses if e.category == "Utilities")
+    if utilities_total > 4000 and len(expenses) > 10:
+        potential_savings = utilities_total * 0.15
+        suggestions.append(ExpenseSuggestionResponse(
+            suggestion=f"Your utility expenses total BDT{utilities_total:.2f}. Consider energy-saving measures "
+            f"to save up to BDT{potential_savings:.2f} by optimizing electricity, gas and water usage."
+        ))
+    if not suggestions:
+        suggestions.append(ExpenseSuggestionResponse(
+            suggestion="Your expense patterns are stable. Continue monitoring to maintain financial health."
+        ))
+    return ExpenseSuggestions(suggestions=suggestions)
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        # Every run starts cold, with no timestamps parsed by an earlier run
+        for expense in args[0] if isinstance(args[0], list) else ():
+            vars(expense).pop("_parsed_date", None)
+        gc.collect()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'expenses':>9} {'legacy (s)':>11} {'records (s)':>12} {'summary (s)':>12} {'auto (s)':>10} {'speedup':>8}")
+    for size in sizes:
+        expenses = make_expenses(size)
+        expected = legacy_suggestions(expenses)
+        cutoff = datetime(2025, 6, 1)
+        records = ExpenseRecords.from_models(expenses)
+        assert ExpenseService.get_expense_suggestions(expenses) == expected, "suggestions differ"
+        repeat = 1 if size >= 1_000_000 else 3
+        legacy = best_of(legacy_suggestions, expenses, repeat=repeat)
+        build = best_of(ExpenseRecords.from_models, expenses, repeat=repeat)
+        summary = best_of(expense_engine.summarize_expenses, records, cutoff, repeat=repeat)
+        auto = best_of(ExpenseService.get_expense_suggestions, expenses, repeat=repeat)
+        print(f"{size:>9} {legacy:>11.4f} {build:>12.4f} {summary:>12.4f} {auto:>10.4f} {legacy / auto:>7.1f}x")
+        del expenses
+
+
+if __name__ == "__main__":
+    # The legacy reference hard-codes a 2025-06-01 cutoff, i.e. an as-of date in July 2025
+    with clock.pinned(datetime(2025, 7, 13)):
+        main([int(arg) for arg in sys.argv[1:]] or [100, 1_000, 10_000, 100_000, 1_000_000])
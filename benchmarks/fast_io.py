@@ -0,0 +1,96 @@
+"""
+Request validation and response serialization with the app.fast_io path on and off.
+
+"echo" rows run a bare route that validates a List[Model] body and returns it as List[Model], so they time
+only the I/O path; the other rows are the real endpoints end to end (response cache off). Each response is
+checked to decode to the same JSON in both modes.
+
+Usage: python -m benchmarks.fast_io [--sizes 10000 100000] [--repeat 3] [--json PATH]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+from typing import List
+import httpx
+from fastapi import FastAPI
+from app import fast_io
+from app.cache import response_cache
+from app.models.expense import Expense
+from app.models.loan import Loan
+from benchmarks.generators import AS_OF, GENERATORS
+from benchmarks.results import write_results
+
+
+def echo_app() -> FastAPI:
+    echo = FastAPI(default_response_class=fast_io.FastJSONResponse)
+    echo.router.route_class = fast_io.FastIORoute
+
+    @echo.post("/echo/expense", response_model=List[Expense])
+    async def echo_expenses(expenses: List[Expense]):
+        return expenses
+
+    @echo.post("/echo/loan", response_model=List[Loan])
+    async def echo_loans(loans: List[Loan]):
+        return loans
+
+    return echo
+
+
+# name -> (app, path, domain)
+CASES = {
+    "echo expense": ("echo", "/echo/expense", "expense"),
+    "echo loan": ("echo", "/echo/loan", "loan"),
+    "expense suggestions": ("main", "/expense/suggestions/", "expense"),
+    "loan optimize-payments": ("main", "/loan/optimize-payments", "loan"),
+}
+
+
+async def timed_post(client: httpx.AsyncClient, path: str, body: bytes) -> tuple[float, httpx.Response]:
+    gc.collect()
+    started = time.perf_counter()
+    response = await client.post(path, content=body, headers={"content-type": "application/json",
+                                                               "x-as-of": AS_OF.isoformat()})
+    return time.perf_counter() - started, response
+
+
+async def run(sizes: List[int], repeat: int) -> List[dict]:
+    from main import app
+
+    response_cache.backend = None  # every request does the full work
+    apps = {"echo": echo_app(), "main": app}
+    results = []
+    print(f"{'case':<24} {'records':>8} {'default (s)':>12} {'fast (s)':>9} {'speedup':>8}")
+    async with app.router.lifespan_context(app):
+        for name, (app_name, path, domain) in CASES.items():
+            transport = httpx.ASGITransport(app=apps[app_name])
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+                for size in sizes:
+                    body = json.dumps(GENERATORS[domain][1](size, seed=size)).encode()
+                    best, decoded = {}, {}
+                    for mode in (False, True):
+                        fast_io.FAST_IO = mode
+                        await timed_post(client, path, b"[]")  # first-call setup stays out of the timings
+                        timings = []
+                        for _ in range(repeat):
+                            elapsed, response = await timed_post(client, path, body)
+                            response.raise_for_status()
+                            timings.append(elapsed)
+                        best[mode], decoded[mode] = min(timings), response.json()
+                    if decoded[False] != decoded[True]:
+                        raise AssertionError(f"{name}/{size}: responses differ between modes")
+                    speedup = best[False] / best[True]
+                    results.append({"name": f"{name}/{size}", "case": name, "records": size,
+                                    "default_s": best[False], "fast_s": best[True], "speedup": speedup})
+                    print(f"{name:<24} {size:>8} {best[False]:>12.4f} {best[True]:>9.4f} {speedup:>7.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    write_results("fast_io", asyncio.run(run(args.sizes, args.repeat)), args.output)
@@ -0,0 +1,214 @@
+"""
+Seeded synthetic records for every request model, as JSON-ready dicts.
+
+Dates are laid out relative to a fixed as-of instant so generated data is reproducible and
+matches what services see when the clock is pinned to that instant.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Type
+from pydantic import BaseModel
+from app.models.budget import Budget
+from app.models.expense import Expense
+from app.models.income import Income
+from app.models.loan import Loan, LoanStatus, PaymentFrequency
+from app.models.savings import SavingsGoal
+
+AS_OF = datetime(2025, 7, 13, 14, 36)
+
+EXPENSE_CATEGORIES = {"Food": 0.30, "Travel": 0.15, "Utilities": 0.15, "Household": 0.15, "Leisure": 0.15, "Health": 0.10}
+INCOME_SOURCES = {"Salary": 0.6, "Freelance": 0.2, "Investments": 0.1, "Side Business": 0.1}
+INCOME_CATEGORIES = {"Salary": "Employment", "Freelance": "Self-Employment", "Investments": "Passive", "Side Business": "Self-Employment"}
+LENDERS = ["Brac Bank", "DBBL", "City Bank", "EBL", "Prime Bank", "IDLC"]
+BUDGET_TYPES = {"Monthly": 0.6, "Weekly": 0.15, "Annually": 0.25}
+
+
+def history_size(rng: random.Random, median: float, cap: int) -> int:
+    """
+    Records per user: log-normal, so most users have short histories and a few have very long ones.
+    """
+    return max(1, min(cap, int(rng.lognormvariate(math.log(median), 0.8))))
+
+
+def _pick(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _stamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _iso(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def make_incomes(count: int, user_id: int = 1, seed: int = 0, as_of: datetime = AS_OF, days: int = 540) -> List[dict]:
+    rng = random.Random(seed)
+    incomes = []
+    for _ in range(count):
+        source = _pick(rng, INCOME_SOURCES)
+        amount = rng.uniform(30000, 90000) if source == "Salary" else rng.lognormvariate(math.log(8000), 0.7)
+        incomes.append({
+            "amount": round(amount, 2),
+            "source": source,
+            "category": INCOME_CATEGORIES[source],
+            "date": _stamp(as_of - timedelta(days=rng.randint(0, days), minutes=rng.randint(0, 1439))),
+            "user_id": user_id,
+            "notes": None,
+        })
+    return incomes
+
+
+def make_expenses(count: int, user_id: int = 1, seed: int = 0, as_of: datetime = AS_OF) -> List[dict]:
+    rng = random.Random(seed)
+    expenses = []
+    for i in range(count):
+        category = _pick(rng, EXPENSE_CATEGORIES)
+        date = as_of - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 1439))
+        expenses.append({
+            "id": i + 1,
+            "title": f"{category} #{i + 1}",
+            # Heavy right tail: mostly small purchases, occasional large bills
+            "amount": round(rng.lognormvariate(math.log(800), 1.1), 2),
+            "category": category,
+            "date": _stamp(date),
+            "created_at": _stamp(date),
+            "updated_at": _stamp(date),
+            "user_id": user_id,
+        })
+    return expenses
+
+
+def make_loans(count: int, user_id: int = 1, seed: int = 0, as_of: datetime = AS_OF) -> List[dict]:
+    rng = random.Random(seed)
+    loans = []
+    for i in range(count):
+        principal = round(rng.uniform(10000, 500000), 2)
+        frequency = rng.choice(list(PaymentFrequency))
+        number_of_payments = rng.choice([6, 12, 24, 26, 52])
+        remaining_payments = rng.randint(1, number_of_payments)
+        total_paid = round(principal * (1 - remaining_payments / number_of_payments), 2)
+        start = as_of - timedelta(days=rng.randint(0, 300), minutes=rng.randint(0, 1439))
+        payments, balance = [], principal
+        for p in range(number_of_payments - remaining_payments if rng.random() < 0.8 else 0):
+            balance = round(balance * rng.uniform(0.85, 0.98), 2)
+            payments.append({
+                "id": i * 100 + p,
+                "payment_date": _iso(start + timedelta(days=14 * (p + 1))),
+                "amount_paid": 10000,
+                "principal_paid": 9900,
+                "interest_paid": 100,
+                "remaining_balance": balance,
+                "notes": None,
+                "created_at": _stamp(start + timedelta(days=14 * (p + 1))),
+                "loan_id": i + 1,
+            })
+        loans.append({
+            "id": i + 1,
+            "loan_type": rng.choice(["Business Loan", "Personal Loan", "Car Loan", "Home Loan"]),
+            "lender_name": rng.choice(LENDERS),
+            "principal_amount": principal,
+            "total_payable": round(principal * 1.12, 2),
+            "total_paid": total_paid,
+            "due": rng.choice([0.0, round(principal - total_paid, 2)]),
+            "interest_rate": rng.choice([6.5, 9.0, 11.0, 12.0, 18.5]),
+            "number_of_payments": number_of_payments,
+            "remaining_payments": remaining_payments,
+            "start_date": _iso(start),
+            "end_date": _iso(start + timedelta(days=365)),
+            "next_payment_date": None,
+            "payment_frequency": frequency.value,
+            "status": LoanStatus.ACTIVE.value,
+            "notes": None,
+            "created_at": _stamp(start),
+            "updated_at": _stamp(start),
+            "user_id": user_id,
+            "payments": payments or None,
+        })
+    return loans
+
+
+def make_goals(count: int, user_id: int = 1, seed: int = 0, as_of: datetime = AS_OF) -> List[dict]:
+    rng = random.Random(seed)
+    goals = []
+    for i in range(count):
+        target = round(rng.uniform(20000, 1000000), 2)
+        start = as_of - timedelta(days=rng.randint(30, 900))
+        entries, saved = [], 0.0
+        for e in range(history_size(rng, 12, 120)):
+            saved = round(saved + rng.uniform(500, target / 20), 2)
+            moment = start + timedelta(days=7 * e + rng.randint(0, 6))
+            entries.append({
+                "id": i * 1000 + e,
+                "amount": round(rng.uniform(500, target / 20), 2),
+                "current_amount": saved,
+                "entry_date": _stamp(moment),
+                "created_at": _stamp(moment),
+                "updated_at": _stamp(moment),
+                "goal_id": i + 1,
+            })
+        goals.append({
+            "id": i + 1,
+            "title": f"Goal {i + 1}",
+            "target_amount": target,
+            "current_amount": min(saved, target),
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": (as_of + timedelta(days=rng.randint(-30, 720))).strftime("%Y-%m-%d") if rng.random() < 0.9 else None,
+            "status": "In Progress" if rng.random() < 0.8 else "Completed",
+            "goal_entries": entries,
+        })
+    return goals
+
+
+def make_budgets(count: int, user_id: int = 1, seed: int = 0, as_of: datetime = AS_OF) -> List[dict]:
+    rng = random.Random(seed)
+    budgets = []
+    for i in range(count):
+        kind = _pick(rng, BUDGET_TYPES)
+        total = round(rng.uniform(5000, 200000), 2)
+        start = as_of - timedelta(days=rng.randint(0, 365))
+        events = [
+            {
+                "id": i * 100 + e,
+                "title": f"Spend {e + 1}",
+                "amount": round(rng.uniform(100, total / 10), 2),
+                "date": _stamp(start + timedelta(days=rng.randint(0, 30))),
+                "created_at": _stamp(start),
+                "budget_id": i + 1,
+            }
+            for e in range(history_size(rng, 4, 60))
+        ]
+        budgets.append({
+            "id": i + 1,
+            "title": rng.choice(["Groceries", "Emergency Savings", "Travel", "Rent", "Savings Plan", "Utilities"]),
+            "total_amount": total,
+            "remaining": round(total * rng.random(), 2),
+            "type": kind,
+            "start_date": _stamp(start),
+            # Annual budgets are sometimes stored with the epoch placeholder end date
+            "end_date": "1970-01-01 06:00:00" if kind == "Annually" and rng.random() < 0.2 else _stamp(start + timedelta(days=30)),
+            "created_at": _stamp(start),
+            "updated_at": _stamp(start),
+            "user_id": user_id,
+            "subEvents": events,
+        })
+    return budgets
+
+
+# domain -> (model, generator)
+GENERATORS: Dict[str, tuple[Type[BaseModel], Callable[..., List[dict]]]] = {
+    "income": (Income, make_incomes),
+    "expense": (Expense, make_expenses),
+    "loan": (Loan, make_loans),
+    "savings": (SavingsGoal, make_goals),
+    "budget": (Budget, make_budgets),
+}
+
+
+def make_records(domain: str, count: int, seed: int = 0, as_of: datetime = AS_OF) -> list:
+    """
+    `count` validated model instances for a domain.
+    """
+    model, generate = GENERATORS[domain]
+    return [model.model_validate(item) for item in generate(count, seed=seed, as_of=as_of)]
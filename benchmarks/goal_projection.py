@@ -0,0 +1,87 @@
+"""
+Goal projection throughput against goal count: the former per-goal LinearRegression loop in
+predict_monthly_savings, the batched replacement, and the full projection (including trend fits).
+
+Usage: python -m benchmarks.goal_projection [--sizes 100 1000 10000 100000] [--legacy-max 10000] [--json PATH]
+"""
+import argparse
+import gc
+import time
+import numpy as np
+from app import clock, warmup
+from app.models.savings import SavingsGoal
+from app.services.goal_projection import project_goals
+from app.services.savings import predict_monthly_savings
+from benchmarks.generators import AS_OF, make_goals
+from benchmarks.results import write_results
+
+
+def legacy_predict_monthly_savings(goals):
+    """
+    predict_monthly_savings as it was: one single-sample LinearRegression fit per goal.
+    """
+    LinearRegression = warmup.load("sklearn.linear_model").LinearRegression
+    suggestions = []
+    current_date = clock.now()
+    for goal in goals:
+        if goal.end_dt is None or goal.status != "In Progress":
+            continue
+        remaining = goal.target_amount - goal.current_amount
+        try:
+            days_left = (goal.end_dt - current_date).days
+            if days_left <= 0:
+                continue
+            model = LinearRegression().fit(np.array([[days_left]]).reshape(-1, 1), np.array([remaining]))
+            monthly_savings = model.predict([[30]])[0] / 30
+            if monthly_savings > 0:
+                suggestions.append(f"Increase monthly savings for {goal.title} by {monthly_savings:.2f} BDT")
+        except ValueError:
+            continue
+    return suggestions
+
+
+def best_of(fn, goals, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn(goals)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(sizes: list[int], legacy_max: int, repeat: int, output: str) -> None:
+    cases = {
+        "legacy LinearRegression": legacy_predict_monthly_savings,
+        "batched suggestions": predict_monthly_savings,
+        "batched projections": lambda goals: project_goals(goals, clock.now()),
+    }
+    legacy_predict_monthly_savings([SavingsGoal.model_validate(g) for g in make_goals(5)])  # sklearn import
+    results = []
+    print(f"{'case':<26} {'goals':>8} {'best (s)':>10} {'goals/s':>12}")
+    for size in sizes:
+        goals = [SavingsGoal.model_validate(g) for g in make_goals(size, seed=size)]
+        for goal in goals:
+            goal.end_dt  # parse up front, so every case starts from the same warm models
+        expected = legacy_predict_monthly_savings(goals) if size <= legacy_max else None
+        if expected is not None and predict_monthly_savings(goals) != expected:
+            raise AssertionError(f"{size} goals: batched suggestions differ from the legacy ones")
+        for name, fn in cases.items():
+            if fn is legacy_predict_monthly_savings and size > legacy_max:
+                continue
+            best = best_of(fn, goals, repeat)
+            results.append({"name": f"{name}/{size}", "case": name, "goals": size, "best_s": best,
+                            "goals_per_s": size / best})
+            print(f"{name:<26} {size:>8} {best:>10.4f} {size / best:>12.0f}")
+    write_results("goal_projection", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="largest goal count to run the legacy loop on")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    with clock.pinned(AS_OF):
+        main(args.sizes, args.legacy_max, args.repeat, args.output)
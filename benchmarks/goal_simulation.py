@@ -0,0 +1,53 @@
+"""
+Monte Carlo goal simulation throughput: simulated paths per second and peak memory against goal count,
+with the default chunk size and with a small one to show the memory bound.
+
+Usage: python -m benchmarks.goal_simulation [--sizes 10 100 1000] [--paths 10000] [--small-chunk-mb 4] [--json PATH]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from app.models.savings import SavingsGoal
+from app.services.goal_simulation import SIMULATION_CHUNK_BYTES, simulate_goals
+from benchmarks.generators import AS_OF, make_goals
+from benchmarks.results import write_results
+
+
+def measure(goals, paths: int, chunk_bytes: int):
+    """
+    Seconds and peak traced megabytes of one simulate_goals call, and the number of goals it simulated.
+    """
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    simulations = simulate_goals(goals, AS_OF, paths, 0, chunk_bytes=chunk_bytes)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return elapsed, peak, sum(1 for simulation in simulations if simulation.paths)
+
+
+def main(sizes, paths: int, small_chunk: int, output: str) -> None:
+    results = []
+    print(f"{'goals':>6} {'chunk':>7} {'seconds':>8} {'paths/s':>11} {'peak MB':>8}")
+    for size in sizes:
+        goals = [SavingsGoal(**goal) for goal in make_goals(size, seed=size)]
+        for label, chunk_bytes in (("default", SIMULATION_CHUNK_BYTES), ("small", small_chunk)):
+            elapsed, peak, simulated = measure(goals, paths, chunk_bytes)
+            rate = simulated * paths / elapsed
+            results.append({"name": f"goal_simulation/{size}/{label}", "goals": size, "simulated_goals": simulated,
+                            "paths": paths, "chunk_bytes": chunk_bytes, "seconds": elapsed, "paths_per_s": rate,
+                            "peak_mb": peak})
+            print(f"{size:>6} {chunk_bytes / 2**20:>5.0f}MB {elapsed:>8.3f} {rate:>11,.0f} {peak:>8.1f}")
+    write_results("goal_simulation", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--paths", type=int, default=10_000)
+    parser.add_argument("--small-chunk-mb", type=float, default=4)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.sizes, args.paths, int(args.small_chunk_mb * 2**20), args.output)
@@ -0,0 +1,84 @@
+"""
+Income suggestions against years of history: the former per-entry month grouping, the full suggestions on
+records (totals plus the monthly series and its rolling statistics), building the monthly and weekly series
+from scratch, and appending one new month of income to a series built from the rest.
+
+Usage: python -m benchmarks.income_series [--years 1 10 30] [--per-month 100] [--repeat 5] [--json PATH]
+"""
+import argparse
+import gc
+import time
+from typing import Callable, List
+from app import clock
+from app.models.income import Income
+from app.models.records import IncomeRecords
+from app.services.income import IncomeService
+from app.services.income_series import IncomeSeries, periods_of
+from benchmarks.generators import AS_OF, make_incomes
+from benchmarks.results import write_results
+
+
+def legacy_monthly_low(incomes: List[Income]):
+    """
+    The former income boost check: incomes grouped into a dict by month string, then the lowest month.
+    """
+    monthly_income = {}
+    for income in incomes:
+        month = income.date.split(" ")[0][:7]
+        monthly_income[month] = monthly_income.get(month, 0) + income.amount
+    min_month = min(monthly_income, key=monthly_income.get)
+    return min_month, monthly_income[min_month] < sum(monthly_income.values()) / len(monthly_income) * 0.5
+
+
+def best(run: Callable, repeat: int) -> float:
+    seconds = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - started)
+    return seconds
+
+
+def main(years: List[int], per_month: int, repeat: int, output: str) -> None:
+    results = []
+    print(f"{'years':>6} {'incomes':>8} {'legacy':>9} {'suggest':>9} {'monthly':>9} {'weekly':>9} "
+          f"{'append':>9}   (ms)")
+    with clock.pinned(AS_OF):
+        for span in years:
+            incomes = [Income(**income) for income in
+                       make_incomes(span * 12 * per_month, seed=span, days=span * 365)]
+            records = IncomeRecords.from_models(incomes)
+            # The newest month arrives after the rest of the history
+            periods = periods_of(records.date)
+            newest = periods == periods.max()
+            history = IncomeRecords.from_models([income for income, new in zip(incomes, newest) if not new])
+
+            month = (periods[newest], records.source[newest], records.sources, records.amount[newest])
+
+            def append():
+                series = IncomeSeries.from_records(history)
+                started = time.perf_counter()
+                series.extend(*month)
+                return time.perf_counter() - started
+
+            row = {
+                "legacy_s": best(lambda: legacy_monthly_low(incomes), repeat),
+                "suggestions_s": best(lambda: IncomeService.get_income_suggestions(records), repeat),
+                "monthly_s": best(lambda: IncomeSeries.from_records(records), repeat),
+                "weekly_s": best(lambda: IncomeSeries.from_records(records, "W"), repeat),
+                "append_s": min(append() for _ in range(repeat)),
+            }
+            results.append({"name": f"income_series/{span}", "years": span, "incomes": len(incomes), **row})
+            print(f"{span:>6} {len(incomes):>8} " + " ".join(f"{seconds * 1000:>9.3f}" for seconds in row.values()))
+    write_results("income_series", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--per-month", type=int, default=100, help="incomes per month of history")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.years, args.per_month, args.repeat, args.output)
@@ -0,0 +1,80 @@
+"""
+Compare the scalar and vectorized loan optimizers.
+
+Usage: python -m benchmarks.loan_optimizer [sizes...]
+"""
+import gc
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from app.models.loan import Loan, LoanPayment, PaymentFrequency, LoanStatus
+from app.services.loan import generate_payment_optimization
+from app.services.loan_batch import generate_payment_optimization_batch
+
+
+def make_loans(count: int, seed: int = 42) -> list[Loan]:
+    rng = random.Random(seed)
+    now = datetime.now()
+    frequencies = list(PaymentFrequency)
+    loans = []
+    for i in range(count):
+        principal = round(rng.uniform(10000, 500000), 2)
+        number_of_payments = rng.choice([6, 12, 24, 26, 52])
+        remaining_payments = rng.randint(1, number_of_payments)
+        total_paid = round(principal * (1 - remaining_payments / number_of_payments), 2)
+        start = now - timedelta(days=rng.randint(0, 300))
+        payments = []
+        balance = principal
+        for p in range(rng.randint(0, 6)):
+            balance = round(balance * rng.uniform(0.85, 0.98), 2)
+            payments.append(LoanPayment(
+                id=i * 10 + p,
+                payment_date=(start + timedelta(days=14 * (p + 1))).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                amount_paid=10000,
+                principal_paid=9900,
+                interest_paid=100,
+                remaining_balance=balance,
+                loan_id=i,
+            ))
+        loans.append(Loan(
+            id=i,
+            loan_type="Business Loan",
+            lender_name=f"Lender {i % 17}",
+            principal_amount=principal,
+            total_payable=round(principal * 1.12, 2),
+            total_paid=total_paid,
+            due=rng.choice([0.0, round(principal - total_paid, 2)]),
+            interest_rate=rng.choice([6.5, 9.0, 11.0, 12.0, 18.5]),
+            number_of_payments=number_of_payments,
+            remaining_payments=remaining_payments,
+            start_date=start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            payment_frequency=rng.choice(frequencies),
+            status=LoanStatus.ACTIVE,
+            payments=payments or None,
+        ))
+    return loans
+
+
+def best_of(fn, *args, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'loans':>8} {'scalar (s)':>12} {'batch (s)':>12} {'speedup':>8}")
+    for size in sizes:
+        loans = make_loans(size)
+        assert generate_payment_optimization(loans) == generate_payment_optimization_batch(loans), "outputs differ"
+        scalar = best_of(generate_payment_optimization, loans)
+        batch = best_of(generate_payment_optimization_batch, loans)
+        print(f"{size:>8} {scalar:>12.4f} {batch:>12.4f} {scalar / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,39 @@
+"""
+Measure the per-request cost of the metrics middleware, route wrapper and service timers.
+
+Usage: python -m benchmarks.metrics_overhead [requests]
+"""
+import sys
+import time
+from fastapi.testclient import TestClient
+from app import metrics
+from main import app
+
+INCOMES = [
+    {"amount": 5000 + i, "source": "Salary", "category": "Employment", "date": f"2025-{i % 12 + 1:02d}-01 10:00:00", "user_id": 1}
+    for i in range(50)
+]
+
+
+def per_request(client: TestClient, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        client.post("/income/suggestions/", json=INCOMES)
+    return (time.perf_counter() - started) / count
+
+
+def main(count: int) -> None:
+    with TestClient(app) as client:
+        per_request(client, 50)  # warm up
+        results = {}
+        for enabled in (False, True, False, True):
+            metrics.METRICS_ENABLED = enabled
+            results.setdefault(enabled, []).append(per_request(client, count))
+    off, on = min(results[False]), min(results[True])
+    print(f"metrics off: {off * 1e6:8.1f} us/request")
+    print(f"metrics on:  {on * 1e6:8.1f} us/request")
+    print(f"overhead:    {(on - off) * 1e6:8.1f} us/request ({(on - off) / off * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
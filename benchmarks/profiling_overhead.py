@@ -0,0 +1,68 @@
+"""
+Cost of the app.profiling hooks: per service call when no request is profiled, and per request for
+/savings/suggestions/ and /expense/suggestions/ unprofiled against profiled (response cache off).
+
+Usage: python -m benchmarks.profiling_overhead [--size 2000] [--requests 30] [--json PATH]
+"""
+import argparse
+import time
+import timeit
+from fastapi.testclient import TestClient
+from app import metrics, profiling
+from app.cache import response_cache
+from benchmarks.generators import AS_OF, make_expenses, make_goals
+from benchmarks.results import write_results
+
+TOKEN = "benchmark"
+
+
+def plain(x):
+    return x
+
+
+timed_plain = metrics.timed("benchmark")(plain)
+
+
+def per_call_ns(fn, number: int = 200_000) -> float:
+    return min(timeit.repeat(lambda: fn(1), number=number, repeat=5)) / number * 1e9
+
+
+def per_request(client: TestClient, path: str, body: list, headers: dict, count: int) -> float:
+    best = float("inf")
+    for _ in range(count):
+        started = time.perf_counter()
+        client.post(path, json=body, headers=headers).raise_for_status()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(size: int, count: int, output: str) -> None:
+    results = []
+    metrics.METRICS_ENABLED = False  # isolate the profiling check
+    raw, wrapped = per_call_ns(plain), per_call_ns(timed_plain)
+    metrics.METRICS_ENABLED = True
+    print(f"service call, profiling off: {wrapped - raw:.0f} ns over an undecorated call ({raw:.0f} ns)")
+    results.append({"name": "timed_call_off", "overhead_ns": wrapped - raw, "raw_ns": raw})
+
+    from main import app
+    profiling.PROFILE_TOKEN = TOKEN
+    response_cache.backend = None
+    headers = {"x-as-of": AS_OF.isoformat()}
+    cases = {"/savings/suggestions/": make_goals(size, seed=size), "/expense/suggestions/": make_expenses(size, seed=size)}
+    print(f"{'route':<24} {'records':>8} {'off (s)':>9} {'profiled (s)':>13} {'ratio':>7}")
+    with TestClient(app) as client:
+        for path, body in cases.items():
+            off = per_request(client, path, body, headers, count)
+            on = per_request(client, path, body, {**headers, profiling.PROFILE_HEADER: TOKEN}, count)
+            results.append({"name": f"request{path}", "records": size, "off_s": off, "profiled_s": on, "ratio": on / off})
+            print(f"{path:<24} {size:>8} {off:>9.4f} {on:>13.4f} {on / off:>6.2f}x")
+    write_results("profiling_overhead", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.size, args.requests, args.output)
@@ -0,0 +1,93 @@
+"""
+Compact records against validated models for large expense and income requests: the body validated into a
+list of models (the analyses then build their records from them) or straight into records a chunk at a time,
+then analysed. Reports seconds per phase, the memory held by the validated payload and the peak traced memory
+of the whole request. Suggestions are checked to be identical.
+
+Usage: python -m benchmarks.records [--sizes 10000 100000] [--repeat 3] [--json PATH]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import List
+from pydantic import TypeAdapter
+from app import clock
+from app.models.expense import Expense
+from app.models.income import Income
+from app.models.records import ExpenseRecords, IncomeRecords
+from app.services.expense import ExpenseService
+from app.services.income import IncomeService
+from app.services.savings import suggest_expense_cuts_for
+from benchmarks.generators import AS_OF, make_expenses, make_incomes
+from benchmarks.results import write_results
+
+# domain -> (generator, model, records, analysis)
+DOMAINS = {
+    "expense": (make_expenses, Expense, ExpenseRecords, ExpenseService.get_expense_suggestions),
+    "expense_cuts": (make_expenses, Expense, ExpenseRecords, suggest_expense_cuts_for),
+    "income": (make_incomes, Income, IncomeRecords, IncomeService.get_income_suggestions),
+}
+
+
+def request(validate, analyse, body: bytes):
+    """
+    Validate and analyse one body: (result, validate seconds, analyse seconds).
+    """
+    started = time.perf_counter()
+    payload = validate(body)
+    validated = time.perf_counter()
+    result = analyse(payload)
+    return result, validated - started, time.perf_counter() - validated
+
+
+def traced(validate, analyse, body: bytes):
+    """
+    Megabytes held by the validated payload and peak megabytes over the whole request.
+    """
+    gc.collect()
+    tracemalloc.start()
+    payload = validate(body)
+    held = tracemalloc.get_traced_memory()[0]
+    analyse(payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return held / 2**20, peak / 2**20
+
+
+def main(sizes: List[int], repeat: int, output: str) -> None:
+    results = []
+    print(f"{'domain':>13} {'records':>8} {'payload':>8} {'validate (s)':>13} {'analyse (s)':>12} "
+          f"{'held MB':>8} {'peak MB':>8}")
+    with clock.pinned(AS_OF):
+        for domain, (generate, model, records, analyse) in DOMAINS.items():
+            adapter = TypeAdapter(List[model])
+            paths = {"models": adapter.validate_json, "records": records.validate_json}
+            for size in sizes:
+                body = json.dumps(generate(size, seed=size)).encode()
+                expected = None
+                for label, validate in paths.items():
+                    best = (float("inf"), float("inf"))
+                    for _ in range(repeat):
+                        gc.collect()
+                        result, validate_s, analyse_s = request(validate, analyse, body)
+                        best = min(best, (validate_s, analyse_s), key=sum)
+                    expected = result if expected is None else expected
+                    assert result == expected, f"{domain}: {label} suggestions differ"
+                    held, peak = traced(validate, analyse, body)
+                    results.append({"name": f"records/{domain}/{size}/{label}", "domain": domain, "records": size,
+                                    "payload": label, "validate_s": best[0], "analyse_s": best[1],
+                                    "held_mb": held, "peak_mb": peak})
+                    print(f"{domain:>13} {size:>8} {label:>8} {best[0]:>13.4f} {best[1]:>12.4f} "
+                          f"{held:>8.1f} {peak:>8.1f}")
+    write_results("records", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.sizes, args.repeat, args.output)
@@ -0,0 +1,139 @@
+"""
+End-to-end replay: send recorded or generated JSONL traffic at the ASGI app in-process and report
+throughput and latency percentiles per route.
+
+Each traffic line is {"method": "POST", "path": "/expense/suggestions/", "body": [...], "headers": {...}}.
+
+Usage: python -m benchmarks.replay [--traffic FILE | --requests 500 --record FILE] [--concurrency 8] [--json PATH]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+import httpx
+from benchmarks.generators import AS_OF, GENERATORS, history_size
+from benchmarks.results import latency_summary, write_results
+
+# path -> (domain, share of traffic, median records per request, cap)
+TRAFFIC_MIX = {
+    "/income/suggestions/": ("income", 0.25, 40, 2000),
+    "/expense/suggestions/": ("expense", 0.25, 150, 10000),
+    "/budget/suggestions/": ("budget", 0.15, 6, 200),
+    "/loan/optimize-payments": ("loan", 0.15, 2, 40),
+    "/loan/payment-scenarios": ("loan", 0.05, 2, 40),
+    "/savings/suggestions/": ("savings", 0.15, 3, 50),
+}
+
+
+def generate_traffic(count: int, seed: int = 0) -> List[dict]:
+    """
+    A reproducible request mix; each request is one user's history sized from a log-normal distribution.
+    """
+    rng = random.Random(seed)
+    paths = list(TRAFFIC_MIX)
+    weights = [TRAFFIC_MIX[path][1] for path in paths]
+    traffic = []
+    for i in range(count):
+        path = rng.choices(paths, weights=weights)[0]
+        domain, _, median, cap = TRAFFIC_MIX[path]
+        generate = GENERATORS[domain][1]
+        body = generate(history_size(rng, median, cap), seed=seed * 1_000_003 + i, as_of=AS_OF)
+        traffic.append({"method": "POST", "path": path, "body": body, "headers": {"X-As-Of": AS_OF.isoformat()}})
+    return traffic
+
+
+def load_traffic(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_traffic(traffic: List[dict], path: str) -> None:
+    with open(path, "w") as f:
+        for entry in traffic:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+async def _send(client: httpx.AsyncClient, entry: dict) -> httpx.Response:
+    return await client.request(entry.get("method", "POST"), entry["path"], json=entry.get("body"),
+                                headers=entry.get("headers"), params=entry.get("query"))
+
+
+async def replay(traffic: List[dict], concurrency: int) -> tuple[float, Dict[str, List[float]], Dict[str, Counter]]:
+    """
+    Closed-loop replay with `concurrency` clients. A 503 from a saturated analysis pool is retried after a short
+    backoff, as a real client would; latency runs from the first attempt and retries are counted as "503-retry".
+    """
+    from main import app  # imported here so generating or recording traffic does not start the app
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    queue: asyncio.Queue = asyncio.Queue()
+    for entry in traffic:
+        queue.put_nowait(entry)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            entry = queue.get_nowait()
+            started = time.perf_counter()
+            response = await _send(client, entry)
+            while response.status_code == 503:
+                statuses[entry["path"]]["503-retry"] += 1
+                await asyncio.sleep(0.05)
+                response = await _send(client, entry)
+            latencies[entry["path"]].append(time.perf_counter() - started)
+            statuses[entry["path"]][response.status_code] += 1
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=300) as client:
+            # One request per route first, so lazy imports are not attributed to the measured traffic
+            seen = {}
+            for entry in traffic:
+                seen.setdefault(entry["path"], entry)
+            for entry in seen.values():
+                await _send(client, {**entry, "body": entry.get("body", [])[:1]})
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses
+
+
+def report(elapsed: float, latencies: Dict[str, List[float]], statuses: Dict[str, Counter], concurrency: int) -> List[dict]:
+    everything = [value for values in latencies.values() for value in values]
+    results = []
+    print(f"{'route':<28} {'requests':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  statuses")
+    for path in sorted(latencies) + ["all"]:
+        values = everything if path == "all" else latencies[path]
+        codes = sum(statuses.values(), Counter()) if path == "all" else statuses[path]
+        summary = latency_summary(values)
+        results.append({"name": f"replay{path}" if path != "all" else "replay/all", "route": path,
+                        "concurrency": concurrency, **summary, "statuses": {str(k): v for k, v in codes.items()}})
+        print(f"{path:<28} {summary['count']:>8} {summary['mean_ms']:>8.1f} {summary['p50_ms']:>8.1f} "
+              f"{summary['p95_ms']:>8.1f} {summary['p99_ms']:>8.1f} {summary['max_ms']:>8.1f}  {dict(codes)}")
+    throughput = len(everything) / elapsed
+    results.append({"name": "replay/throughput", "concurrency": concurrency, "requests": len(everything),
+                    "elapsed_s": elapsed, "requests_per_s": throughput})
+    print(f"{len(everything)} requests in {elapsed:.2f} s at concurrency {concurrency}: {throughput:.1f} req/s (latencies in ms)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--traffic", help="JSONL file of recorded requests to replay")
+    parser.add_argument("--requests", type=int, default=500, help="generated requests when no traffic file is given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", help="write the generated traffic here and exit")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+
+    traffic = load_traffic(args.traffic) if args.traffic else generate_traffic(args.requests, args.seed)
+    if args.record:
+        save_traffic(traffic, args.record)
+        print(f"{len(traffic)} requests written to {args.record}")
+    else:
+        elapsed, latencies, statuses = asyncio.run(replay(traffic, args.concurrency))
+        write_results("replay", report(elapsed, latencies, statuses, args.concurrency), args.output)
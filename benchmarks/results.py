@@ -0,0 +1,85 @@
+"""
+Machine-readable benchmark results, and a comparison of two result files.
+
+Usage: python -m benchmarks.results BASELINE.json CANDIDATE.json [threshold]
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] if values else float("nan")
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """
+    Count, mean and tail percentiles of a list of durations, in milliseconds.
+    """
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else float("nan"),
+        **{f"p{int(q * 100)}_ms": percentile(latencies, q) * 1000 for q in (0.5, 0.9, 0.95, 0.99)},
+        "max_ms": max(latencies) * 1000 if latencies else float("nan"),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "env": {k: v for k, v in os.environ.items() if k.startswith(("ANALYSIS_", "RESPONSE_CACHE", "METRICS_", "SCIENTIFIC_", "APP_"))},
+    }
+
+
+def write_results(suite: str, results: List[dict], path: Optional[str]) -> None:
+    """
+    Write {"suite", "environment", "results"} as JSON. Each result has a unique "name" used to match runs.
+    """
+    if not path:
+        return
+    with open(path, "w") as f:
+        json.dump({"suite": suite, "environment": environment(), "results": results}, f, indent=2)
+    print(f"results written to {path}")
+
+
+def compare(baseline_path: str, candidate_path: str, threshold: float = 0.10) -> int:
+    """
+    Print per-benchmark ratios of every *_s / *_ms metric and return the number of regressions beyond threshold.
+    """
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"{'benchmark':<48} {'metric':<10} {'baseline':>12} {'candidate':>12} {'ratio':>7}")
+    for name, new in candidate.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for metric, value in new.items():
+            if not metric.endswith(("_s", "_ms")) or not isinstance(old.get(metric), (int, float)) or not old[metric]:
+                continue
+            ratio = value / old[metric]
+            flag = " !" if ratio > 1 + threshold else ""
+            regressions += bool(flag)
+            print(f"{name:<48} {metric:<10} {old[metric]:>12.4f} {value:>12.4f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__.strip())
+    sys.exit(1 if compare(sys.argv[1], sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 0.10) else 0)
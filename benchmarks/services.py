@@ -0,0 +1,83 @@
+"""
+In-process micro-benchmarks for every analysis service function on generated data.
+
+Usage: python -m benchmarks.services [--sizes 100 1000 10000] [--repeat 5] [--only NAME ...] [--json PATH]
+"""
+import argparse
+import gc
+import statistics
+import time
+from app import clock
+from app.services.amortization import DEFAULT_EXTRA_PERCENTS, rank_payment_scenarios
+from app.services.budget import BudgetService
+from app.services.expense import ExpenseService
+from app.services.forecasting import forecaster
+from app.services.income import IncomeService
+from app.services.loan import generate_payment_optimization
+from app.services.loan_batch import generate_payment_optimization_batch
+from app.services.savings import forecast_savings_growth, predict_monthly_savings, suggest_expense_cuts_for
+from benchmarks.generators import AS_OF, GENERATORS
+from benchmarks.results import write_results
+
+
+def _cold():
+    # Each run starts without memoised work from the previous one
+    forecaster.clear()
+
+
+# name -> (domain, call)
+SERVICES = {
+    "income.get_income_suggestions": ("income", IncomeService.get_income_suggestions),
+    "expense.get_expense_suggestions": ("expense", ExpenseService.get_expense_suggestions),
+    "budget.get_budget_suggestions": ("budget", BudgetService.get_budget_suggestions),
+    "loan.generate_payment_optimization": ("loan", generate_payment_optimization),
+    "loan.generate_payment_optimization_batch": ("loan", generate_payment_optimization_batch),
+    "loan.rank_payment_scenarios": ("loan", lambda loans: rank_payment_scenarios(loans, DEFAULT_EXTRA_PERCENTS)),
+    "savings.predict_monthly_savings": ("savings", predict_monthly_savings),
+    "savings.suggest_expense_cuts_for": ("expense", suggest_expense_cuts_for),
+    "savings.forecast_savings_growth": ("savings", forecast_savings_growth),
+}
+
+
+def measure(call, model, payload: list[dict], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        records = [model.model_validate(item) for item in payload]  # fresh models, as in a new request
+        _cold()
+        gc.collect()
+        started = time.perf_counter()
+        call(records)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main(sizes: list[int], repeat: int, only: list[str], output: str) -> None:
+    results = []
+    datasets = {}
+    print(f"{'service':<44} {'records':>8} {'best (s)':>10} {'median (s)':>11} {'us/record':>10}")
+    for name, (domain, call) in SERVICES.items():
+        if only and not any(part in name for part in only):
+            continue
+        model, generate = GENERATORS[domain]
+        call([model.model_validate(item) for item in generate(5)])  # lazy imports and first-call setup stay out of the timings
+        for size in sizes:
+            if (domain, size) not in datasets:
+                datasets[(domain, size)] = generate(size, seed=size)
+            timings = measure(call, model, datasets[(domain, size)], repeat)
+            best, median = min(timings), statistics.median(timings)
+            results.append({"name": f"{name}/{size}", "service": name, "records": size,
+                            "best_s": best, "median_s": median, "per_record_us": best / size * 1e6})
+            print(f"{name:<44} {size:>8} {best:>10.4f} {median:>11.4f} {best / size * 1e6:>10.1f}")
+    write_results("services", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", default=[], help="substrings of service names to run")
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    # Generated data is laid out around AS_OF, so services evaluate it at that instant
+    with clock.pinned(AS_OF):
+        main(args.sizes, args.repeat, args.only, args.output)
@@ -0,0 +1,57 @@
+"""
+Goal projections from the feature store against the same goals posted: each user's goals are ingested, then
+GET /users/{id}/savings/projections and POST /savings/projections are timed end to end in process. The
+projections are checked to be identical.
+
+Usage: python -m benchmarks.stored_projections [--goals 10 100 1000] [--repeat 3] [--json PATH]
+"""
+import argparse
+import gc
+import time
+from typing import List
+from fastapi.testclient import TestClient
+from app.cache import response_cache
+from benchmarks.generators import AS_OF, make_goals
+from benchmarks.results import write_results
+
+HEADERS = {"x-as-of": AS_OF.isoformat()}
+
+
+def timed_call(call, repeat: int):
+    seconds, response = float("inf"), None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        response = call()
+        response.raise_for_status()
+        seconds = min(seconds, time.perf_counter() - started)
+    return seconds, response.json()
+
+
+def main(sizes: List[int], repeat: int, output: str) -> None:
+    from main import app
+    response_cache.backend = None
+    results = []
+    print(f"{'goals':>6} {'posted (s)':>11} {'stored (s)':>11}")
+    with TestClient(app) as client:
+        for user_id, size in enumerate(sizes, start=int(time.time())):
+            goals = make_goals(size, user_id=user_id, seed=size)
+            client.post(f"/users/{user_id}/savings-goals", json=goals).raise_for_status()
+            posted_s, posted = timed_call(lambda: client.post("/savings/projections", json=goals, headers=HEADERS), repeat)
+            stored_s, stored = timed_call(
+                lambda: client.get(f"/users/{user_id}/savings/projections", headers=HEADERS), repeat
+            )
+            assert stored == posted, f"{size} goals: stored projections differ from the posted ones"
+            results.append({"name": f"stored_projections/{size}", "goals": size,
+                            "posted_s": posted_s, "stored_s": stored_s})
+            print(f"{size:>6} {posted_s:>11.4f} {stored_s:>11.4f}")
+    write_results("stored_projections", results, output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--goals", type=int, nargs="+", default=[10, 100, 1_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    main(args.goals, args.repeat, args.output)
@@ -0,0 +1,90 @@
+"""
+One /suggestions/all request against the five per-domain requests the frontend makes today (income, expense,
+loan, savings and budget), end to end in process with the response cache off. "+rtt" columns add the
+simulated network round-trip time once per request.
+
+Usage: python -m benchmarks.suggestions_all [--sizes 100 1000 10000] [--rtt-ms 50] [--repeat 3] [--json PATH]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import time
+from typing import List
+import httpx
+from app.cache import response_cache
+from benchmarks.generators import AS_OF, make_budgets, make_expenses, make_goals, make_incomes, make_loans
+from benchmarks.results import write_results
+
+HEADERS = {"content-type": "application/json", "x-as-of": AS_OF.isoformat()}
+
+
+def make_snapshot(size: int) -> dict:
+    """
+    A user with `size` incomes and expenses, and a tenth as many loans, goals and budgets.
+    """
+    few = max(size // 10, 2)
+    return {
+        "user_id": 1, "incomes": make_incomes(size, seed=size), "expenses": make_expenses(size, seed=size),
+        "loans": make_loans(few, seed=size), "goals": make_goals(few, seed=size), "budgets": make_budgets(few, seed=size),
+    }
+
+
+def separate_requests(snapshot: dict) -> List[tuple]:
+    return [
+        ("/income/suggestions/", json.dumps(snapshot["incomes"]).encode()),
+        ("/expense/suggestions/", json.dumps(snapshot["expenses"]).encode()),
+        ("/loan/optimize-payments", json.dumps(snapshot["loans"]).encode()),
+        ("/savings/suggestions/", json.dumps(snapshot["goals"]).encode()),
+        ("/budget/suggestions/", json.dumps(snapshot["budgets"]).encode()),
+    ]
+
+
+async def timed_requests(client: httpx.AsyncClient, requests: List[tuple]) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    for path, body in requests:
+        response = await client.post(path, content=body, headers=HEADERS)
+        if response.status_code not in (200, 404):  # savings answers 404 when it has nothing to suggest
+            response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def run(sizes: List[int], rtt: float, repeat: int) -> List[dict]:
+    from main import app
+    response_cache.backend = None  # every request does the full work
+    results = []
+    print(f"{'records':>8} {'separate (s)':>13} {'combined (s)':>13} {'speedup':>8} "
+          f"{'separate+rtt':>13} {'combined+rtt':>13} {'speedup':>8}")
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            for size in sizes:
+                snapshot = make_snapshot(size)
+                cases = {
+                    "separate": separate_requests(snapshot),
+                    "combined": [("/suggestions/all", json.dumps(snapshot).encode())],
+                }
+                best = {}
+                for name, requests in cases.items():
+                    await timed_requests(client, requests)  # first-call setup stays out of the timings
+                    best[name] = min([await timed_requests(client, requests) for _ in range(repeat)])
+                with_rtt = {name: best[name] + len(cases[name]) * rtt for name in cases}
+                speedup, speedup_rtt = best["separate"] / best["combined"], with_rtt["separate"] / with_rtt["combined"]
+                results.append({"name": f"suggestions_all/{size}", "records": size, "separate_s": best["separate"],
+                                "combined_s": best["combined"], "speedup": speedup, "rtt_s": rtt,
+                                "separate_rtt_s": with_rtt["separate"], "combined_rtt_s": with_rtt["combined"],
+                                "speedup_rtt": speedup_rtt})
+                print(f"{size:>8} {best['separate']:>13.4f} {best['combined']:>13.4f} {speedup:>7.2f}x "
+                      f"{with_rtt['separate']:>13.4f} {with_rtt['combined']:>13.4f} {speedup_rtt:>7.2f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="simulated network round trip per request")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", dest="output", help="write machine-readable results here")
+    args = parser.parse_args()
+    write_results("suggestions_all", asyncio.run(run(args.sizes, args.rtt_ms / 1000, args.repeat)), args.output)
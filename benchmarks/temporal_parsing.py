@@ -0,0 +1,77 @@
+"""
+Per-request timestamp parsing: the per-service idioms used before the shared temporal layer, against the
+layer's scalar properties (first read parses, later reads hit the instance cache) and column parser.
+
+Usage: python -m benchmarks.temporal_parsing [sizes...]
+"""
+import gc
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from app.models.temporal import column, parsed_key
+from benchmarks.generators import make_records
+
+# name -> (domain, date field, records to parse, legacy idiom on the raw strings, shared layer)
+CASES = {
+    "expense.date (loop)": (
+        "expense", "date", lambda records: records,
+        lambda records: [datetime.strptime(r.date, "%Y-%m-%d %H:%M:%S") for r in records],
+        lambda records: [r.date_dt for r in records],
+    ),
+    "expense.date (column)": (
+        "expense", "date", lambda records: records,
+        lambda records: pd.to_datetime(pd.Series([r.date for r in records], dtype=object), format="%Y-%m-%d %H:%M:%S").to_numpy(),
+        lambda records: column(records, "date"),
+    ),
+    "income.date (month keys)": (
+        "income", "date", lambda records: records,
+        lambda records: [r.date.split(" ")[0][:7] for r in records],
+        lambda records: column(records, "date").astype("datetime64[M]").astype(np.int64).tolist(),
+    ),
+    "loan.payment_date (loop)": (
+        "loan", "payment_date", lambda loans: [p for loan in loans for p in loan.payments or ()],
+        lambda payments: [datetime.fromisoformat(p.payment_date.replace("Z", "").replace("+00:00", "")) for p in payments],
+        lambda payments: [p.payment_dt for p in payments],
+    ),
+    "loan.payment_date (column)": (
+        "loan", "payment_date", lambda loans: [p for loan in loans for p in loan.payments or ()],
+        lambda payments: np.array([p.payment_date.replace("Z", "").replace("+00:00", "") for p in payments], dtype="datetime64[us]"),
+        lambda payments: column(payments, "payment_date"),
+    ),
+    "savings.entry_date (months)": (
+        "savings", "entry_date", lambda goals: [e for goal in goals for e in goal.goal_entries],
+        lambda entries: np.array([e.entry_date[:10] for e in entries], dtype="datetime64[D]").astype("datetime64[M]"),
+        lambda entries: column(entries, "entry_date").astype("datetime64[M]"),
+    ),
+}
+
+
+def timed(fn, records) -> float:
+    gc.collect()
+    started = time.perf_counter()
+    fn(records)
+    return time.perf_counter() - started
+
+
+def main(sizes: list[int]) -> None:
+    print(f"{'case':<30} {'records':>9} {'legacy (s)':>11} {'first (s)':>10} {'again (s)':>10} {'two reads':>10}")
+    for name, (domain, field, select, legacy, shared) in CASES.items():
+        key = parsed_key(field)
+        for size in sizes:
+            records = select(make_records(domain, size, seed=size))
+            legacy_s = min(timed(legacy, records) for _ in range(3))
+            first = []
+            for _ in range(3):
+                for record in records:
+                    vars(record).pop(key, None)
+                first.append(timed(shared, records))
+            again = min(timed(shared, records) for _ in range(3))
+            # Two analyses reading the same field in one request: legacy parses twice, the shared layer once
+            ratio = 2 * legacy_s / (min(first) + again)
+            print(f"{name:<30} {len(records):>9} {legacy_s:>11.4f} {min(first):>10.4f} {again:>10.4f} {ratio:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 50_000])
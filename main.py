@@ -1,22 +1,54 @@
-from fastapi import FastAPI, HTTPException
+from app import warmup
+import os
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Union
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from app import metrics, clock, fast_io, feature_store, jobs, profiling
+from app.executor import pool, run_analysis
+from app.cache import response_cache
 #
 from app.models.income import Income, IncomeSuggestionResponse, IncomeSuggestions
-from app.models.loan import Loan, LoanSuggestion
+from app.models.loan import Loan, LoanPayment, LoanSuggestion, LoanScenarioRanking, PortfolioPlan
 from app.models.expense import Expense, ExpenseSuggestions
-from app.models.savings import SavingsGoal
+from app.models.records import CompactExpenses, CompactIncomes
+from app.models.savings import GoalEntry, GoalProjection, GoalSimulation, SavingsGoal, SavingsSuggestionRequest
 from app.models.budget import Budget, BudgetSuggestion
+from app.models.snapshot import AllSuggestions, UserSnapshot
+from app.models.job import JobStatus
 from app.services.income import IncomeService
-from app.services.expense import ExpenseService
-from app.services.savings import predict_monthly_savings, suggest_expense_cuts, forecast_savings_growth
-from app.services.loan import generate_payment_optimization
+from app.services.expense import ExpenseService, recent_cutoff
+from app.services.savings import generate_savings_suggestions, generate_savings_suggestions_for, suggest_expense_cuts_for
+from app.services.goal_projection import project_goals
+from app.services.goal_simulation import simulate_goals, DEFAULT_PATHS, DEFAULT_HORIZON_MONTHS
+from app.services.loan_batch import generate_payment_optimization_batch, six_month_window_start
+from app.services.amortization import rank_payment_scenarios, DEFAULT_EXTRA_PERCENTS
+from app.services.debt_portfolio import plan_debt_repayment, STRATEGIES
 from app.services.budget import BudgetService
+from app.services.bulk import stream_bulk_suggestions, DuplexStreamingResponse
+from app.services import columnar
+from app.services.snapshot import suggest_all
 
 
 
-app = FastAPI(title="Loan Management API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.on_startup()
+    feature_store.init_store()
+    jobs.scheduler.start()
+    yield
+    await jobs.scheduler.stop()
+    pool.shutdown()
+
+
+app = FastAPI(title="Loan Management API", version="1.0.0", lifespan=lifespan,
+              default_response_class=fast_io.FastJSONResponse)
+# Timed routes with the one-pass body validation and typed-response encoding of app.fast_io
+app.router.route_class = fast_io.FastIORoute
 
 # Enable CORS
 origins = [
@@ -35,21 +67,81 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Keyed by route template, so /jobs/{job_id} is one entry however many jobs are polled
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    warmup.record_request(f"{request.method} {route}", time.perf_counter() - started)
+    return response
+
+
+# Pins the as-of clock from the X-As-Of header or as_of query parameter
+app.add_middleware(clock.AsOfMiddleware)
+
+# Per-request profiles for requests with the profiling token or picked by sampling
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Outermost, so its timings include the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+
 @app.post("/loan/optimize-payments", response_model=List[LoanSuggestion])
 async def optimize_payments(loans: List[Loan]):
     """
     Analyze the last 6 months of loan data and provide payment optimization suggestions.
     """
-    suggestions = generate_payment_optimization(loans)
+    # The six-month window moves daily with the as-of clock, so it is part of the cache key
+    window = six_month_window_start(clock.now()).date().isoformat()
+    suggestions = await response_cache.get_or_compute(
+        "loan/optimize-payments", loans, lambda: run_analysis(generate_payment_optimization_batch, loans), window
+    )
     return suggestions
 
+
+@app.post("/loan/payment-scenarios", response_model=List[LoanScenarioRanking])
+async def payment_scenarios(loans: List[Loan], top: int = Query(3, ge=1, le=len(DEFAULT_EXTRA_PERCENTS)),
+                            rank_by: str = "interest_saved"):
+    """
+    Rank +5% to +50% extra-payment scenarios per active loan using full amortization math.
+    """
+    try:
+        return await response_cache.get_or_compute(
+            "loan/payment-scenarios", loans,
+            lambda: run_analysis(rank_payment_scenarios, loans, DEFAULT_EXTRA_PERCENTS, top, rank_by), top, rank_by
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/loan/portfolio-plan", response_model=PortfolioPlan)
+async def portfolio_plan(loans: List[Loan], monthly_budget: float, schedule: bool = True):
+    """
+    Split a monthly budget across all active loans under the avalanche, snowball and optimal strategies.
+    """
+    # Payoff dates count months from today
+    today = clock.now().date().isoformat()
+    try:
+        return await response_cache.get_or_compute(
+            "loan/portfolio-plan", loans,
+            lambda: run_analysis(plan_debt_repayment, loans, monthly_budget, STRATEGIES, schedule),
+            monthly_budget, schedule, today
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # New income diversification suggestion endpoint
 
 
 @app.post("/income/suggestions/", response_model=IncomeSuggestions)
-async def get_income_suggestions(incomes: list[Income]):
+async def get_income_suggestions(incomes: CompactIncomes):
+    # Only months before the current one are scored, so the current month is part of the cache key
     try:
-        suggestions = IncomeService.get_income_suggestions(incomes)
+        suggestions = await response_cache.get_or_compute(
+            "income/suggestions", incomes, lambda: run_analysis(IncomeService.get_income_suggestions, incomes),
+            f"{clock.now():%Y-%m}"
+        )
         return suggestions
     except HTTPException as e:
         raise e
@@ -59,9 +151,12 @@ async def get_income_suggestions(incomes: list[Income]):
 
 
 @app.post("/expense/suggestions/", response_model=ExpenseSuggestions)
-async def get_expense_suggestions(expenses: List[Expense]):
+async def get_expense_suggestions(expenses: CompactExpenses):
     try:
-        suggestions = ExpenseService.get_expense_suggestions(expenses)
+        suggestions = await response_cache.get_or_compute(
+            "expense/suggestions", expenses, lambda: run_analysis(ExpenseService.get_expense_suggestions, expenses),
+            recent_cutoff(clock.now()).date().isoformat()
+        )
         return suggestions
     except HTTPException as e:
         raise e
@@ -71,24 +166,323 @@ async def get_expense_suggestions(expenses: List[Expense]):
 
 
 @app.post("/savings/suggestions/")
-async def get_suggestions(goals: List[SavingsGoal]):
-    suggestions = []
-    monthly_savings = predict_monthly_savings(goals)
-    if monthly_savings:
-        suggestions.extend(monthly_savings)
-    expense_cuts = suggest_expense_cuts(goals)
-    if expense_cuts:
-        suggestions.extend(expense_cuts)
-    automated_savings = forecast_savings_growth(goals)
-    if automated_savings:
-        suggestions.extend(automated_savings)
-    if not suggestions:
+async def get_suggestions(payload: Union[List[SavingsGoal], SavingsSuggestionRequest], user_id: Optional[int] = None):
+    """
+    The body is the goals, or {"goals": [...], "expenses": [...]} to have expense cuts clustered from those
+    expenses. Otherwise, with a user_id, expense cuts come from clustering that user's stored spending.
+    """
+    goals, expenses = (payload.goals, payload.expenses) if isinstance(payload, SavingsSuggestionRequest) else (payload, [])
+    if user_id is not None and not expenses:
+        # Stored spending changes with every ingest, so these responses are not cached
+        spending = await run_in_threadpool(feature_store.load_spend_items, user_id)
+        suggestions = await run_analysis(generate_savings_suggestions, goals, spending, None, user_id)
+    else:
+        # Days left to each goal depend on the exact instant, so only a pinned as-of gives repeatable keys
+        suggestions = await response_cache.get_or_compute_as_of(
+            "savings/suggestions", payload, lambda: run_analysis(generate_savings_suggestions_for, goals, expenses, user_id)
+        )
+    if not goals and not suggestions:
         raise HTTPException(status_code=404, detail="No suggestions available")
     return {"suggestions": suggestions}
 
+@app.post("/savings/expense-cuts")
+async def expense_cuts(expenses: CompactExpenses):
+    """
+    Ranked monthly cut suggestions from clustering the given expenses into spending tiers.
+    """
+    suggestions = await response_cache.get_or_compute(
+        "savings/expense-cuts", expenses, lambda: run_analysis(suggest_expense_cuts_for, expenses)
+    )
+    return {"suggestions": suggestions}
+
+@app.post("/savings/projections", response_model=List[GoalProjection])
+async def goal_projections(goals: List[SavingsGoal]):
+    """
+    Required monthly contribution, trend-based completion date and shortfall for every in-progress goal.
+    """
+    now = clock.now()
+    return await response_cache.get_or_compute_as_of(
+        "savings/projections", goals, lambda: run_analysis(project_goals, goals, now)
+    )
+
+@app.post("/savings/simulations", response_model=List[GoalSimulation])
+async def goal_simulations(goals: List[SavingsGoal], paths: int = DEFAULT_PATHS, seed: Optional[int] = None,
+                           horizon_months: int = DEFAULT_HORIZON_MONTHS):
+    """
+    Monte Carlo probability of reaching each in-progress goal by its end date, with 10th, 50th and 90th
+    percentile completion dates. Pass a seed for repeatable results.
+    """
+    now = clock.now()
+    compute = lambda: run_analysis(simulate_goals, goals, now, paths, seed, horizon_months)
+    try:
+        if seed is None:
+            # Unseeded runs draw fresh paths every time, so there is nothing to cache
+            return await compute()
+        return await response_cache.get_or_compute_as_of(
+            "savings/simulations", goals, compute, paths, seed, horizon_months
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/budget/suggestions/", response_model=List[BudgetSuggestion])
 async def fetch_suggestions(budgets: List[Budget]):
-    return BudgetService.get_budget_suggestions(budgets)
+    return await response_cache.get_or_compute(
+        "budget/suggestions", budgets, lambda: run_analysis(BudgetService.get_budget_suggestions, budgets)
+    )
+
+@app.post("/suggestions/all", response_model=AllSuggestions)
+async def all_suggestions(snapshot: UserSnapshot):
+    """
+    Income, expense, loan, savings and budget suggestions plus cross-domain advice for one user in one round
+    trip. Domains without records are null; a domain that fails is reported under "errors".
+    """
+    if snapshot.user_id is not None:
+        for records in (snapshot.incomes, snapshot.expenses, snapshot.loans, snapshot.budgets):
+            _check_owner(snapshot.user_id, records)
+    now = clock.now()
+    return await response_cache.get_or_compute_as_of(
+        "suggestions/all", snapshot, lambda: suggest_all(snapshot, now)
+    )
+
+@app.post("/bulk/suggestions")
+async def bulk_suggestions(request: Request):
+    """
+    NDJSON in, NDJSON out. Each input line is an income, expense, budget or loan record with an extra
+    "domain" field; records must be grouped by user_id. One result line is streamed per (user_id, domain)
+    group, followed by a summary line. The whole stream is evaluated at one as-of instant.
+    """
+    return DuplexStreamingResponse(stream_bulk_suggestions(request.stream()), media_type="application/x-ndjson")
+
+@app.post("/columnar/suggestions")
+async def columnar_suggestions(request: Request, table: Optional[str] = None):
+    """
+    Loan and expense suggestions for flat tables instead of nested JSON. The body is one table named by
+    ?table= (loans, payments or expenses) or a zip archive of such tables, as CSV, or Parquet / Arrow IPC
+    when pyarrow is installed. NDJSON out, with the /bulk/suggestions result lines and a summary line.
+    """
+    path = await columnar.spool(request.stream())
+    try:
+        lines = await run_analysis(columnar.analyse_upload, path, request.headers.get("content-type", ""), table)
+    except columnar.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.unlink(path)
+    return Response(b"".join(fast_io.dumps(line) + b"\n" for line in lines), media_type="application/x-ndjson")
+
+# Feature store: ingest new records per user, then get suggestions from the stored aggregates by user_id
+
+
+def _check_owner(user_id: int, records: list) -> None:
+    for record in records:
+        owner = getattr(record, "user_id", None)
+        if owner is not None and owner != user_id:
+            raise HTTPException(status_code=400, detail=f"Record belongs to user {owner}, not {user_id}")
+
+
+def _ingest(ingest, user_id: int, records: list) -> dict:
+    _check_owner(user_id, records)
+    try:
+        ingested = ingest(user_id, records)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"user_id": user_id, "received": len(records), "ingested": ingested}
+
+
+@app.post("/users/{user_id}/incomes")
+def ingest_incomes(user_id: int, incomes: List[Income]):
+    return _ingest(feature_store.ingest_incomes, user_id, incomes)
+
+
+@app.post("/users/{user_id}/expenses")
+def ingest_expenses(user_id: int, expenses: List[Expense]):
+    """
+    Append expenses; ids already ingested for this user are skipped, so retries are safe.
+    """
+    return _ingest(feature_store.ingest_expenses, user_id, expenses)
+
+
+@app.post("/users/{user_id}/loans")
+def ingest_loans(user_id: int, loans: List[Loan]):
+    """
+    Store or replace loan snapshots, together with any payments they carry.
+    """
+    return _ingest(feature_store.ingest_loans, user_id, loans)
+
+
+@app.post("/users/{user_id}/loan-payments")
+def ingest_loan_payments(user_id: int, payments: List[LoanPayment]):
+    return _ingest(feature_store.ingest_loan_payments, user_id, payments)
+
+
+@app.post("/users/{user_id}/savings-goals")
+def ingest_goals(user_id: int, goals: List[SavingsGoal]):
+    """
+    Store or replace goal snapshots, together with any entries they carry.
+    """
+    return _ingest(feature_store.ingest_goals, user_id, goals)
+
+
+@app.post("/users/{user_id}/goal-entries")
+def ingest_goal_entries(user_id: int, entries: List[GoalEntry]):
+    """
+    Append entries to stored goals; each new entry is a deposit that raises its goal's current amount.
+    """
+    return _ingest(feature_store.ingest_goal_entries, user_id, entries)
+
+
+@app.get("/users/{user_id}/income/suggestions", response_model=IncomeSuggestions)
+async def stored_income_suggestions(user_id: int):
+    totals = await run_in_threadpool(feature_store.load_income_totals, user_id, clock.now())
+    return await run_analysis(IncomeService.suggestions_from_totals, totals)
+
+
+@app.get("/users/{user_id}/expense/suggestions", response_model=ExpenseSuggestions)
+async def stored_expense_suggestions(user_id: int):
+    summary = await run_in_threadpool(feature_store.load_expense_summary, user_id, recent_cutoff(clock.now()))
+    return await run_analysis(ExpenseService.suggestions_from_summary, summary)
+
+
+@app.get("/users/{user_id}/loan/optimize-payments", response_model=List[LoanSuggestion])
+async def stored_optimize_payments(user_id: int):
+    loans = await run_in_threadpool(feature_store.load_loans, user_id, six_month_window_start(clock.now()))
+    return await run_analysis(generate_payment_optimization_batch, loans)
+
+
+@app.get("/users/{user_id}/savings/suggestions")
+async def stored_savings_suggestions(user_id: int):
+    goals = await run_in_threadpool(feature_store.load_goals, user_id)
+    spending = await run_in_threadpool(feature_store.load_spend_items, user_id)
+    suggestions = await run_analysis(generate_savings_suggestions, goals, spending, None, user_id)
+    if not goals and not suggestions:
+        raise HTTPException(status_code=404, detail="No suggestions available")
+    return {"suggestions": suggestions}
+
+
+@app.get("/users/{user_id}/savings/projections", response_model=List[GoalProjection])
+async def stored_goal_projections(user_id: int):
+    goals = await run_in_threadpool(feature_store.load_goals, user_id)
+    return await run_analysis(project_goals, goals, clock.now())
+
+
+# Background jobs: large batches are analysed in chunks; poll the job, then page through its results
+
+
+async def _submit_job(kind: str, records: list, chunk_size: int) -> JobStatus:
+    try:
+        status = await run_in_threadpool(jobs.submit_job, kind, records, chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    jobs.scheduler.wake()
+    return status
+
+
+@app.post("/jobs/loan/optimize-payments", response_model=JobStatus, status_code=202)
+async def submit_loan_optimization_job(loans: List[Loan], chunk_size: int = jobs.JOB_CHUNK_SIZE):
+    """
+    Run /loan/optimize-payments over a large batch in the background; results are LoanSuggestion objects.
+    """
+    return await _submit_job("loan/optimize-payments", loans, chunk_size)
+
+
+@app.post("/jobs/savings/suggestions", response_model=JobStatus, status_code=202)
+async def submit_savings_job(goals: List[SavingsGoal], chunk_size: int = jobs.JOB_CHUNK_SIZE):
+    """
+    Run /savings/suggestions/ over a large batch in the background; results are suggestion strings, in
+    endpoint order within each chunk.
+    """
+    return await _submit_job("savings/suggestions", goals, chunk_size)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    try:
+        return jobs.job_status(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str, offset: int = 0, limit: int = 100):
+    """
+    A page of results, available as soon as each chunk finishes.
+    """
+    if offset < 0 or not 1 <= limit <= jobs.JOB_RESULTS_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit between 1 and {jobs.JOB_RESULTS_PAGE_MAX}")
+    try:
+        return Response(jobs.job_results(job_id, offset, limit), media_type="application/json")
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobStatus)
+def cancel_job(job_id: str):
+    """
+    Stop a queued or running job at its next chunk; results stored so far stay available.
+    """
+    try:
+        return jobs.cancel_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+# Profiles of recent requests, for holders of the profiling token
+
+
+def _profile(request: Request, profile_id: Optional[str] = None):
+    if not profiling.authorized(request.headers.get(profiling.PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="A valid X-Profile-Token header is required")
+    if profile_id is None:
+        return None
+    try:
+        return profiling.store.get(profile_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    """
+    Recently profiled requests, newest first, with wall time per phase and per service function.
+    """
+    _profile(request)
+    return profiling.store.list()
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(request: Request, profile_id: str):
+    return _profile(request, profile_id).summary()
+
+
+@app.get("/profiles/{profile_id}/pstats")
+async def download_pstats(request: Request, profile_id: str, part: Optional[str] = None):
+    """
+    The profile as a pstats file, for one phase or service function (`part`) or all of them merged.
+    """
+    session = _profile(request, profile_id)
+    try:
+        data = await run_in_threadpool(session.pstats_dump, part)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    name = f"{profile_id}-{part}.pstats" if part else f"{profile_id}.pstats"
+    return Response(data, media_type="application/octet-stream",
+                    headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+@app.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def download_collapsed(request: Request, profile_id: str, part: Optional[str] = None):
+    """
+    The profile as collapsed stacks in microseconds, for flamegraph.pl or speedscope.
+    """
+    session = _profile(request, profile_id)
+    try:
+        return PlainTextResponse(await run_in_threadpool(session.collapsed, part))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
 
 @app.get("/health")
 async def health_check():
@@ -96,3 +490,27 @@ async def health_check():
     Health check endpoint to verify the API is running.
     """
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    In-process request, phase, service and payload metrics in Prometheus text format.
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Response cache backend, entry count and size. Hit/miss counters are on /metrics.
+    """
+    return response_cache.stats()
+
+
+@app.get("/health/startup")
+async def startup_check():
+    """
+    Cold-start metrics: scientific stack import times, time to ready and first-request latency per route.
+    """
+    return warmup.startup_metrics()